@@ -0,0 +1,135 @@
+import threading
+
+import numpy as np
+
+
+# Начальная ёмкость массивов, дальше растёт удвоением
+INITIAL_CAPACITY = 1024
+
+
+class Fleet:
+    """
+    Хранилище состояния парка: горячие числовые поля всех автомобилей
+    лежат в массивах NumPy, а объект Car хранит только номер своей строки.
+
+    Атрибуты:
+    - speed (ndarray): Скорость, км/ч.
+    - x, y (ndarray): Координаты.
+    - start_time (ndarray): Время начала поездки (nan, если поездки нет).
+    - running (ndarray): Признак поездки.
+    - cars (list): Объекты автомобилей по номеру строки.
+    - by_id (dict): Автомобили по уникальному идентификатору.
+    - ids_by_brand (dict): Идентификаторы автомобилей по марке (в нижнем регистре).
+    """
+    def __init__(self, capacity=INITIAL_CAPACITY, seed=None):
+        self.size = 0
+        self.cars = []
+        self.by_id = {}
+        self.ids_by_brand = {}
+        self.lock = threading.Lock()
+        self.rng = np.random.default_rng(seed)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.speed = np.zeros(capacity, dtype=np.int32)
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        self.start_time = np.full(capacity, np.nan, dtype=np.float64)
+        self.running = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        size = self.size
+        old = (self.speed, self.x, self.y, self.start_time, self.running)
+        self._allocate(max(self.capacity * 2, INITIAL_CAPACITY))
+        for new, array in zip((self.speed, self.x, self.y, self.start_time, self.running), old):
+            new[:size] = array[:size]
+
+    def add(self, car):
+        """
+        Выделяет строку под автомобиль и добавляет его в индексы.
+
+        Аргументы:
+        - car (Car): Объект автомобиля.
+
+        Возвращает:
+        - int: Номер строки в массивах.
+        """
+        with self.lock:
+            if car.id in self.by_id:
+                raise ValueError(f"Идентификатор {car.id} уже занят.")
+            if self.size == self.capacity:
+                self._grow()
+            index = self.size
+            self.size += 1
+            self.cars.append(car)
+            self.by_id[car.id] = car
+            self.ids_by_brand.setdefault(car.brand.lower(), []).append(car.id)
+            return index
+
+    def new_id(self, prefix):
+        """
+        Свободный идентификатор вида <prefix>-N.
+
+        Аргументы:
+        - prefix (str): Префикс идентификатора (марка в нижнем регистре).
+
+        Возвращает:
+        - str: Идентификатор, которого ещё нет в парке.
+        """
+        with self.lock:
+            number = len(self.ids_by_brand.get(prefix, ())) + 1
+            while f"{prefix}-{number}" in self.by_id:
+                number += 1
+            return f"{prefix}-{number}"
+
+    def get(self, id):
+        """
+        Автомобиль по идентификатору.
+
+        Аргументы:
+        - id (str): Идентификатор автомобиля.
+
+        Возвращает:
+        - Car | None: Автомобиль или None, если не найден.
+        """
+        return self.by_id.get(id)
+
+    def find_by_brand(self, brand):
+        """
+        Автомобили указанной марки.
+
+        Аргументы:
+        - brand (str): Марка автомобиля (без учёта регистра).
+
+        Возвращает:
+        - list: Список автомобилей.
+        """
+        return [self.by_id[id] for id in self.ids_by_brand.get(brand.lower(), ())]
+
+    def running_indexes(self):
+        return np.flatnonzero(self.running[:self.size])
+
+    def step(self):
+        """
+        Продвигает все едущие автомобили на один такт одной векторной
+        операцией: случайная скорость и смещение координат.
+
+        Возвращает:
+        - ndarray: Номера строк едущих автомобилей.
+        """
+        with self.lock:
+            indexes = self.running_indexes()
+            count = len(indexes)
+            if count:
+                self.speed[indexes] = self.rng.integers(10, 101, count)
+                self.x[indexes] += self.rng.uniform(-2, 2, count)
+                self.y[indexes] += self.rng.uniform(-2, 2, count)
+            return indexes
+
+    def __len__(self):
+        return self.size
+
+
+# Парк по умолчанию, в него попадают все создаваемые автомобили
+fleet = Fleet()
@@ -1,14 +1,19 @@
 from flask import Flask, jsonify, request
 from pathlib import Path
 import json
-import random
 import time
-import requests
 import os
 import threading
+import numpy as np
 from werkzeug.exceptions import HTTPException
+from runtime.http_client import client as http_client
+
+from .fleet import fleet as default_fleet
+from .simulator import FleetSimulator
 
 MANAGMENT_URL = 'http://receiver-car:6070'
+# Идентификатор запроса системы управления, возвращается вместе с ответом
+CORRELATION_HEADER = 'X-Correlation-Id'
 
 HOST = '0.0.0.0'
 PORT = 8000
@@ -17,29 +22,63 @@ app = Flask(__name__)
 
 data = None
 flag = True
+# Поиск по марке сообщается в журнал один раз
+legacy_lookup_logged = False
 
 
 class Car:
     """
     Класс, представляющий автомобиль.
 
+    Скорость, координаты и признак поездки хранятся в массивах парка
+    (см. fleet.py), сам объект хранит только номер своей строки.
+
     Атрибуты:
+    - id (str): Уникальный идентификатор автомобиля.
     - brand (str): Марка автомобиля.
     - has_air_conditioner (bool): Наличие кондиционера.
     - has_heater (bool): Наличие обогревателя.
     - has_navigator (bool): Наличие навигатора.
     """
-    def __init__(self, brand, has_air_conditioner=False, has_heater=False, has_navigator=False):
-        self.speed = 0
-        self.coordinates = (0, 0)
+    __slots__ = ('fleet', 'index', 'id', 'brand', 'has_air_conditioner', 'has_heater',
+                 'has_navigator', 'occupied_by', 'tariff')
+
+    def __init__(self, brand, has_air_conditioner=False, has_heater=False, has_navigator=False,
+                 id=None, fleet=default_fleet):
+        self.fleet = fleet
+        self.id = id if id is not None else fleet.new_id(brand.lower())
         self.occupied_by = None
-        self.start_time = None
         self.brand = brand
         self.has_air_conditioner = has_air_conditioner
         self.has_heater = has_heater
         self.has_navigator = has_navigator
-        self.is_running = False
         self.tariff = None
+        self.index = fleet.add(self)
+
+    @property
+    def speed(self):
+        return int(self.fleet.speed[self.index])
+
+    @speed.setter
+    def speed(self, value):
+        self.fleet.speed[self.index] = value
+
+    @property
+    def coordinates(self):
+        return float(self.fleet.x[self.index]), float(self.fleet.y[self.index])
+
+    @coordinates.setter
+    def coordinates(self, value):
+        self.fleet.x[self.index], self.fleet.y[self.index] = value
+
+    @property
+    def is_running(self):
+        return bool(self.fleet.running[self.index])
+
+    @property
+    def start_time(self):
+        start_time = self.fleet.start_time[self.index]
+        return None if np.isnan(start_time) else float(start_time)
 
     def start(self):
         """
@@ -48,12 +87,12 @@ class Car:
         Возвращает:
         - str: Сообщение о начале поездки.
         """
-        if not self.is_running:
-            self.is_running = True
-            self.start_time = time.time()
-            return f"{self.brand} поездка началась."
-        else:
-            return f"{self.brand} поездка ещё идет."
+        with self.fleet.lock:
+            if not self.fleet.running[self.index]:
+                self.fleet.running[self.index] = True
+                self.fleet.start_time[self.index] = time.time()
+                return f"{self.brand} поездка началась."
+        return f"{self.brand} поездка ещё идет."
 
     def stop(self):
         """
@@ -62,27 +101,31 @@ class Car:
         Возвращает:
         - str: Сообщение о завершении поездки.
         """
-        if self.is_running:
-            self.is_running = False
-            self.speed = 0
-            self.occupied_by = None
-            return f"{self.brand} поездка завершена."
-        else:
-            return f"{self.brand} на парковке."
+        with self.fleet.lock:
+            if self.fleet.running[self.index]:
+                self.fleet.running[self.index] = False
+                self.fleet.speed[self.index] = 0
+                self.occupied_by = None
+                return f"{self.brand} поездка завершена."
+        return f"{self.brand} на парковке."
 
     def get_status(self):
         """
-        Возвращает текущий статус автомобиля.
+        Возвращает текущий статус автомобиля. Словарь собирается только
+        при сериализации, в такте симуляции меняются лишь массивы парка.
 
         Возвращает:
         - dict: Словарь с информацией о статусе автомобиля.
         """
+        is_running = self.is_running
+        start_time = self.start_time
         elapsed_time = 0
-        if self.start_time is not None and self.is_running:
-            elapsed_time = round(time.time() - self.start_time, 2)  # Время в секундах
+        if start_time is not None and is_running:
+            elapsed_time = round(time.time() - start_time, 2)  # Время в секундах
         return {
+            "id": self.id,
             "brand": self.brand,
-            "is_running": self.is_running,
+            "is_running": is_running,
             "speed": self.speed,
             "coordinates": self.coordinates,
             "occupied_by": self.occupied_by,
@@ -90,7 +133,7 @@ class Car:
             "has_air_conditioner": self.has_air_conditioner,
             "has_heater": self.has_heater,
             "has_navigator": self.has_navigator,
-            "tariff ": self.tariff
+            "tariff": self.tariff
         }
 
     def update_coordinates(self, x, y):
@@ -135,46 +178,30 @@ class Car:
         return f"{self.brand} арендован {self.occupied_by}."
 
 
-def simulate_drive(car):
-    """
-    Симулирует движение автомобиля.
-
-    Аргументы:
-    - car (Car): Объект автомобиля.
-    """
-    try:
-        while car.is_running:
-            new_speed = random.randint(10, 100)
-            car.set_speed(new_speed)
-
-            x_change = random.uniform(-2, 2)
-            y_change = random.uniform(-2, 2)
-            current_coordinates = car.coordinates
-            new_coordinates = (current_coordinates[0] + x_change, current_coordinates[1] + y_change)
-            car.update_coordinates(*new_coordinates)
-
-            print(f"{car.brand} Скорость: {car.speed:.2f} км/ч, Координаты: {car.coordinates}")
-            status = car.get_status()
-            requests.post(f'{MANAGMENT_URL}/telemetry/{car.brand}', json={'status': status})
-            time.sleep(1)
-    except Exception as e:
-        print(f"Ошибка при симуляции движения: {e}")
-
-
 def load_cars_from_json(file_path):
     """
     Загружает список автомобилей из JSON файла.
 
+    Автомобили с явным id добавляются первыми, чтобы сгенерированные
+    идентификаторы не заняли их. Автомобиль с повторяющимся id пропускается.
+
     Аргументы:
     - file_path (str): Путь к JSON файлу.
 
     Возвращает:
-    - list: Список объектов Car.
+    - list: Список объектов Car в порядке файла.
     """
     try:
         with open(file_path, 'r') as file:
             cars_data = json.load(file)
-            return [Car(**car) for car in cars_data]
+        order = sorted(range(len(cars_data)), key=lambda number: cars_data[number].get('id') is None)
+        loaded = {}
+        for number in order:
+            try:
+                loaded[number] = Car(**cars_data[number])
+            except ValueError as e:
+                print(f"Автомобиль {cars_data[number]} пропущен: {e}")
+        return [loaded[number] for number in sorted(loaded)]
     except FileNotFoundError:
         print(f"Файл {file_path} не найден.")
         return []
@@ -183,9 +210,56 @@ def load_cars_from_json(file_path):
         return []
 
 
+def find_car(key, free=False):
+    """
+    Находит автомобиль по идентификатору.
+
+    Поиск по марке оставлен для старых клиентов, передающих марку вместо
+    идентификатора: при нескольких автомобилях марки выбирается первый
+    (свободный, если free). Если free и автомобиль с этим идентификатором
+    уже занят, выбирается свободный автомобиль той же марки.
+
+    Аргументы:
+    - key (str): Идентификатор или марка автомобиля.
+    - free (bool): Искать свободный автомобиль.
+
+    Возвращает:
+    - Car | None: Автомобиль или None, если не найден.
+    """
+    global legacy_lookup_logged
+
+    car = default_fleet.get(key)
+    if car is not None:
+        if not free or (car.occupied_by is None and not car.is_running):
+            return car
+        key = car.brand
+    elif not legacy_lookup_logged:
+        legacy_lookup_logged = True
+        print(f"Автомобиль {key} ищется по марке (устаревший запрос).")
+
+    for id in default_fleet.ids_by_brand.get(key.lower(), ()):
+        car = default_fleet.get(id)
+        if not free or (car.occupied_by is None and not car.is_running):
+            return car
+    return None
+
+
+def correlation_headers():
+    """
+    Возвращает заголовок с идентификатором запроса системы управления.
+
+    Возвращает:
+    - dict: Заголовки для ответа в receiver-car.
+    """
+    correlation_id = request.headers.get(CORRELATION_HEADER)
+    return {CORRELATION_HEADER: correlation_id} if correlation_id else {}
+
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 # Загружаем список автомобилей из файла
 cars = load_cars_from_json(f'{BASE_DIR}/data/cars.json')
+# Один планировщик продвигает все едущие автомобили
+simulator = FleetSimulator(MANAGMENT_URL, default_fleet)
 
 
 @app.route('/car/status/all', methods=['GET'])
@@ -198,7 +272,8 @@ def get_all_car_statuses():
     """
     try:
         statuses = [car.get_status() for car in cars]
-        requests.post(f'{MANAGMENT_URL}/car/status/all', json={'cars': statuses})
+        http_client.post(f'{MANAGMENT_URL}/car/status/all', json={'cars': statuses},
+                         headers=correlation_headers())
         return jsonify(statuses)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -210,18 +285,16 @@ def start_car(brand):
     Запускает поездку указанного автомобиля.
 
     Аргументы:
-    - brand (str): Марка автомобиля.
+    - brand (str): Идентификатор автомобиля (марка - для старых клиентов).
 
     Возвращает:
     - JSON: Сообщение о начале поездки.
     """
     try:
-        car = next((car for car in cars if car.brand.lower() == brand.lower()), None)
+        car = find_car(brand)
         assert car is not None, "Автомобиль не найден."
 
         message = car.start()
-        thread = threading.Thread(target=simulate_drive, args=(car,))
-        thread.start()
         return jsonify({"message": message})
     except AssertionError as e:
         return jsonify({"error": str(e)}), 404
@@ -235,17 +308,17 @@ def stop_car(brand):
     Останавливает поездку указанного автомобиля.
 
     Аргументы:
-    - brand (str): Марка автомобиля.
+    - brand (str): Идентификатор автомобиля (марка - для старых клиентов).
 
     Возвращает:
     - JSON: Сообщение о завершении поездки.
     """
     try:
-        car = next((car for car in cars if car.brand.lower() == brand.lower()), None)
+        car = find_car(brand)
         assert car is not None, "Автомобиль не найден."
 
         status = car.get_status()
-        response = requests.post(f'{MANAGMENT_URL}/return/{car.occupied_by}', json={'status': status})
+        response = http_client.post(f'{MANAGMENT_URL}/return/{car.occupied_by}', json={'status': status})
         assert response.status_code == 200, "Ошибка при возврате автомобиля."
 
         message = car.stop()
@@ -262,13 +335,13 @@ def emergency(brand):
     Останавливает поездку указанного автомобиля в экстренном режиме.
 
     Аргументы:
-    - brand (str): Марка автомобиля.
+    - brand (str): Идентификатор автомобиля (марка - для старых клиентов).
 
     Возвращает:
     - JSON: Сообщение о завершении поездки.
     """
     try:
-        car = next((car for car in cars if car.brand.lower() == brand.lower()), None)
+        car = find_car(brand)
         assert car is not None, "Автомобиль не найден."
 
         message = car.stop()
@@ -285,17 +358,19 @@ def get_car_status(brand):
     Возвращает статус указанного автомобиля.
 
     Аргументы:
-    - brand (str): Марка автомобиля.
+    - brand (str): Идентификатор автомобиля (марка - для старых клиентов).
 
     Возвращает:
     - JSON: Статус автомобиля.
     """
     try:
-        car = next((car for car in cars if car.brand.lower() == brand.lower()), None)
+        # Статус запрашивается при выборе машины: по марке выдаётся свободная
+        car = find_car(brand, free=True)
         assert car is not None, "Автомобиль не найден."
 
         status = car.get_status()
-        requests.post(f'{MANAGMENT_URL}/car/status', json={'status': status})
+        http_client.post(f'{MANAGMENT_URL}/car/status', json={'status': status},
+                         headers=correlation_headers())
         return jsonify(status)
     except AssertionError as e:
         return jsonify({"error": str(e)}), 404
@@ -338,19 +413,20 @@ def occupy_car(person):
     global data
     global flag
     try:
-        requests.post(f'{MANAGMENT_URL}/access/{person}')
+        http_client.post(f'{MANAGMENT_URL}/access/{person}')
         while flag:
             time.sleep(1)
         if data['access']:
-            brand = data['car']
-            car = next((car for car in cars if car.brand.lower() == brand.lower()), None)
+            # Автомобиль выбран при запросе статуса (car_id), если он уже
+            # занят или не передан - берётся свободный автомобиль той же марки
+            car = find_car(data.get('car_id') or data['car'], free=True)
             assert car is not None, "Автомобиль не найден."
             assert person is not None, "Не указан клиент."
 
             tariff = data['tariff']
             message = car.occupy(person, tariff)
             flag = True
-            return jsonify({"access": True, "car": car.brand, "message": message})
+            return jsonify({"access": True, "car": car.id, "brand": car.brand, "message": message})
         else:
             return jsonify({"access": False, "message": "Доступ до автомобиля не разрешен."}), 404
     except AssertionError as e:
@@ -379,9 +455,10 @@ def handle_exception(e):
 
 def start_web():
     """
-    Запускает веб-сервер в отдельном потоке.
+    Запускает симулятор и веб-сервер в отдельных потоках.
     """
     try:
+        simulator.start()
         threading.Thread(target=lambda: app.run(
             host=HOST, port=PORT, debug=True, use_reloader=False
         )).start()
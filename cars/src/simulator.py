@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import queue
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from runtime.http_client import client as http_client
+
+
+# Длительность такта симуляции в секундах
+TICK = float(os.getenv('SIMULATOR_TICK', 1.0))
+# Максимум одновременно отправляемых пакетов телеметрии
+MAX_IN_FLIGHT = int(os.getenv('SIMULATOR_MAX_IN_FLIGHT', 8))
+# Сколько образцов телеметрии отправляется одним запросом
+BATCH_SIZE = int(os.getenv('SIMULATOR_BATCH_SIZE', 1000))
+# Транспорт телеметрии: stream - один долгоживущий поток NDJSON,
+# batch - отдельный запрос на каждую пачку
+TRANSPORT = os.getenv('SIMULATOR_TRANSPORT', 'stream')
+# Сколько тактов может ждать отправки в потоке, дальше такт блокируется
+STREAM_BUFFER = 4
+RECONNECT_DELAY = 1.0
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Раз во сколько тактов печатать сводку
+REPORT_EVERY = 10
+
+
+def encode_samples(fleet, indexes, now):
+    """
+    Кодирует такт в компактный NDJSON: строка [id, brand, trip_time, speed, x, y,
+    occupied_by, has_air_conditioner, has_heater, has_navigator, tariff]
+    на автомобиль и пустая строка в конце такта.
+
+    Аргументы:
+    - fleet (Fleet): Парк автомобилей.
+    - indexes (ndarray): Номера строк едущих автомобилей.
+    - now (float): Текущее время.
+
+    Возвращает:
+    - bytes: Тело для потока телеметрии.
+    """
+    cars = fleet.cars
+    trip_times = (now - fleet.start_time[indexes]).round(2).tolist()
+    lines = [
+        json.dumps([car.id, car.brand, trip_time, speed, x, y, car.occupied_by,
+                    car.has_air_conditioner, car.has_heater, car.has_navigator, car.tariff])
+        for car, trip_time, speed, x, y in zip(
+            (cars[index] for index in indexes.tolist()), trip_times, fleet.speed[indexes].tolist(),
+            fleet.x[indexes].tolist(), fleet.y[indexes].tolist())
+    ]
+    lines.append('')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class TelemetryStream:
+    """
+    Долгоживущий поток телеметрии в receiver-car (chunked NDJSON).
+
+    Такты ставятся в ограниченный буфер: если receiver-car перестаёт читать
+    поток (очередь к Kafka переполнена), буфер заполняется и put блокирует
+    симулятор. При обрыве соединения поток переоткрывается.
+
+    Атрибуты:
+    - url (str): Адрес приёма телеметрии.
+    - client (HttpClient): Общий HTTP-клиент.
+    """
+    def __init__(self, url, client=http_client, buffer=STREAM_BUFFER):
+        self.url = url
+        self._client = client
+        self._chunks = queue.Queue(maxsize=buffer)
+        self._closed = False
+
+    def put(self, chunk):
+        self._chunks.put(chunk)
+
+    def close(self):
+        """
+        Завершает поток после отправки накопленных тактов.
+        """
+        self._closed = True
+        self._chunks.put(None)
+
+    def _body(self):
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def run(self):
+        while not self._closed:
+            try:
+                # Поток живёт долго: таймаут только на подключение
+                response = self._client.post(
+                    f'{self.url}/telemetry/stream', data=self._body(),
+                    headers={'Content-Type': NDJSON_MIMETYPE},
+                    timeout=(self._client.timeout[0], None),
+                    endpoint='POST telemetry/stream')
+                print(f"Поток телеметрии закрыт: {response.status_code} {response.text.strip()}")
+            except Exception as e:
+                print(f"Поток телеметрии прерван: {e}")
+            if not self._closed:
+                time.sleep(RECONNECT_DELAY)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+
+class FleetSimulator:
+    """
+    Симулятор парка: один планировщик продвигает все едущие автомобили
+    каждый такт и отправляет телеметрию пачками через пул фиксированного
+    размера.
+
+    Атрибуты:
+    - url (str): Адрес приёма телеметрии.
+    - fleet (Fleet): Парк автомобилей.
+    - tick (float): Длительность такта в секундах.
+    - max_in_flight (int): Максимум одновременных запросов телеметрии.
+    - batch_size (int): Образцов телеметрии в одном запросе.
+    - transport (str): stream или batch.
+    """
+    def __init__(self, url, fleet, tick=TICK, max_in_flight=MAX_IN_FLIGHT,
+                 batch_size=BATCH_SIZE, transport=TRANSPORT):
+        self.url = url
+        self.fleet = fleet
+        self.tick = tick
+        self.batch_size = batch_size
+        self.transport = transport
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._stream = TelemetryStream(url)
+
+    def send(self, statuses):
+        """
+        Отправляет пачку образцов телеметрии одним запросом.
+
+        Аргументы:
+        - statuses (list): Статусы автомобилей.
+        """
+        try:
+            http_client.post(f'{self.url}/telemetry', json=statuses)
+        except Exception as e:
+            print(f"Ошибка при отправке телеметрии ({len(statuses)} образцов): {e}")
+        finally:
+            self._slots.release()
+
+    def step(self):
+        """
+        Выполняет один такт симуляции.
+
+        Возвращает:
+        - int: Количество едущих автомобилей.
+        """
+        indexes = self.fleet.step()
+        if self.transport == 'stream':
+            if len(indexes):
+                self._stream.put(encode_samples(self.fleet, indexes, time.time()))
+            return len(indexes)
+
+        cars = self.fleet.cars
+        for start in range(0, len(indexes), self.batch_size):
+            statuses = [cars[index].get_status()
+                        for index in indexes[start:start + self.batch_size]]
+            # Ограничение числа запросов в полёте: ждём освобождения слота
+            self._slots.acquire()
+            self._executor.submit(self.send, statuses)
+        return len(indexes)
+
+    def run(self):
+        """
+        Цикл симуляции с фиксированным шагом по времени.
+        """
+        ticks = 0
+        next_tick = time.monotonic()
+        while True:
+            try:
+                count = self.step()
+            except Exception as e:
+                print(f"Ошибка при симуляции движения: {e}")
+                count = 0
+
+            ticks += 1
+            next_tick += self.tick
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Такт не уложился во время, не пытаемся догонять
+                next_tick = time.monotonic()
+
+            if ticks % REPORT_EVERY == 0 and count:
+                print(f"Симуляция: {count} автомобилей в пути, "
+                      f"отставание такта {max(-delay, 0):.2f} с")
+
+    def start(self):
+        """
+        Запускает планировщик симуляции в отдельном потоке.
+        """
+        if self.transport == 'stream':
+            self._stream.start()
+        threading.Thread(target=self.run, daemon=True).start()
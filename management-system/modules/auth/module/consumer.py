@@ -1,9 +1,8 @@
 import os
 import json
-import threading
 
 from uuid import uuid4
-from confluent_kafka import Consumer, OFFSET_BEGINNING
+from runtime.consumer import ConsumerRuntime, field_key
 
 from .producer import proceed_to_deliver
 
@@ -32,41 +31,8 @@ def handle_event(id, details_str):
     return send_to_sender_car(id, details)
 
 
-def consumer_job(args, config):
-    consumer = Consumer(config)
-
-    def reset_offset(verifier_consumer, partitions):
-        if not args.reset:
-            return
-
-        for p in partitions:
-            p.offset = OFFSET_BEGINNING
-        verifier_consumer.assign(partitions)
-
-    topic = MODULE_NAME
-    consumer.subscribe([topic], on_assign=reset_offset)
-
-    try:
-        while True:
-            msg = consumer.poll(1.0)
-            if msg is None:
-                pass
-            elif msg.error():
-                print(f"[error] {msg.error()}")
-            else:
-                try:
-                    id = msg.key().decode('utf-8')
-                    details_str = msg.value().decode('utf-8')
-                    handle_event(id, details_str)
-                except Exception as e:
-                    print(f"[error] Malformed event received from " \
-                          f"topic {topic}: {msg.value()}. {e}")
-    except KeyboardInterrupt:
-        pass
-
-    finally:
-        consumer.close()
-
-def start_consumer(args, config):
+def start_consumer(args, config, settings):
     print(f'{MODULE_NAME}_consumer started')
-    threading.Thread(target=lambda: consumer_job(args, config)).start()
\ No newline at end of file
+    # Команды одной машины (или одного клиента) передаются по порядку
+    ConsumerRuntime(args, config, MODULE_NAME, handle_event, settings,
+                    key=field_key("car", "name")).start()
@@ -3,10 +3,10 @@ import time
 import json
 import threading
 import multiprocessing
-import requests
 from uuid import uuid4
 from flask import Flask, request, jsonify, abort
 from werkzeug.exceptions import HTTPException
+from runtime.http_client import client as http_client
 
 
 # Константы
@@ -57,7 +57,7 @@ def confirm_prepayment(name):
 @app.route('/confirm_payment/<string:name>', methods=['POST'])
 def confirm_payment(name):
     print(f'Потверждена оплата: {request.json}')
-    response = requests.get(f'{PAYMENT_URL}/invoices/{request.json['id']}/receipt')
+    response = http_client.get(f'{PAYMENT_URL}/invoices/{request.json['id']}/receipt')
     if response.status_code == 200:
         receipt = response.json()['receipt']
         details_to_send = {"operation": "confirm_payment", "receipt": receipt, "name": name}
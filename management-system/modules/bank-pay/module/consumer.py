@@ -1,15 +1,16 @@
 import os
 import json
-import threading
-import requests
 import multiprocessing
-from confluent_kafka import Consumer, OFFSET_BEGINNING
+from runtime.consumer import ConsumerRuntime, handle_each
+from runtime.http_client import client as http_client
 
 from .producer import proceed_to_deliver
 
 PAYMENT_URL = 'http://payment_system:8000'
 _response_queue: multiprocessing.Queue = None
 MODULE_NAME = os.getenv("MODULE_NAME")
+# Операции, для которых в payment-system создаётся счёт или предоплата
+PAYMENT_KINDS = {"get_payment_id": "invoice", "get_prepayment_id": "prepayment"}
 
 
 def send_to_profile_client(id, details):
@@ -17,22 +18,65 @@ def send_to_profile_client(id, details):
     proceed_to_deliver(id, details)
 
 
-def create_payment(data):
-    name = data[0]
-    amount = data[1]
-    response = requests.post(f'{PAYMENT_URL}/clients', json={'name': name})
-    if response.status_code == 200 or 201:
-        response = requests.post(f'{PAYMENT_URL}/invoices', json={'client_id': response.json()[0]['id'], 'amount': amount})
-        return response.json()
+def payment_item(id, details):
+    """ Элемент запроса /bulk. Ключ идемпотентности - id события, повторная
+    доставка события не создаёт второй счёт или предоплату. """
+    data = details["data"]
+    return {"client_name": data[0], "amount": data[1],
+            "kind": PAYMENT_KINDS[details["operation"]], "idempotency_key": id}
 
 
-def create_prepayment(data):
-    name = data[0]
-    amount = data[1]
-    response = requests.post(f'{PAYMENT_URL}/clients', json={'name': name})
-    if response.status_code == 200 or 201:
-        response = requests.post(f'{PAYMENT_URL}/clients/{response.json()[0]['id']}/prepayment', json={'amount': amount})
-        return response.json()
+def client_key(id, details_str):
+    """ Ключ упорядочивания: имя клиента из data[0] платёжных операций,
+    иначе поле name, иначе ключ сообщения. """
+    details = json.loads(details_str)
+    data = details.get("data")
+    if details.get("operation") in PAYMENT_KINDS and isinstance(data, list) and data:
+        return str(data[0])
+    return str(details.get("name") or id)
+
+
+def create_bulk(items):
+    response = http_client.post(f'{PAYMENT_URL}/bulk', json={'items': items})
+    response.raise_for_status()
+    results = response.json()['items']
+    for result in results:
+        result.pop("kind")
+    return results
+
+
+def handle_batch(events):
+    """ Счета и предоплаты пачки создаются одним запросом /bulk, остальные
+    события обрабатываются по одному. Если пачка не прошла, события
+    повторяются по одному. """
+    payments, others = [], []
+    for id, details_str in events:
+        try:
+            details = json.loads(details_str)
+            if details.get("operation") not in PAYMENT_KINDS:
+                others.append((id, details_str))
+                continue
+            payments.append((id, details_str, details, payment_item(id, details)))
+        except Exception as e:
+            print(f"[error] Malformed event received from "
+                  f"topic {MODULE_NAME}: {details_str}. {e}")
+
+    handle_each(handle_event, others, MODULE_NAME)
+    if not payments:
+        return
+
+    print(f"[info] creating {len(payments)} payments with one bulk request")
+    try:
+        results = create_bulk([item for _, _, _, item in payments])
+    except Exception as e:
+        print(f"[error] bulk of {len(payments)} payments failed, "
+              f"retrying one by one. {e}")
+        return handle_each(handle_event, [(id, details_str) for id, details_str, _, _ in payments],
+                           MODULE_NAME)
+
+    for (id, _, details, _), result in zip(payments, results):
+        details["data"] = result
+        send_to_profile_client(id, details)
 
 
 def handle_event(id, details_str):
@@ -48,56 +92,15 @@ def handle_event(id, details_str):
     print(f"[info] handling event {id}, "
           f"{source}->{deliver_to}: {operation}")
 
-    if operation == "get_prepayment_id":
-        details["data"] = create_prepayment(data)
-        return send_to_profile_client(id, details)
-    elif operation == "get_payment_id":
-        details["data"] = create_payment(data)
+    if operation in PAYMENT_KINDS:
+        details["data"] = create_bulk([payment_item(id, details)])[0]
         return send_to_profile_client(id, details)
 
-def consumer_job(args, config):
-    consumer = Consumer(config)
-
-    def reset_offset(verifier_consumer, partitions):
-        if not args.reset:
-            return
-
-        for p in partitions:
-            p.offset = OFFSET_BEGINNING
-        verifier_consumer.assign(partitions)
-
-    topic = MODULE_NAME
-    consumer.subscribe([topic], on_assign=reset_offset)
-
-    try:
-        while True:
-            msg = consumer.poll(1.0)
-
-            if msg is None:
-                pass
-
-            elif msg.error():
-                print(f"[error] {msg.error()}")
-
-            else:
-                try:
-                    id = msg.key().decode('utf-8')
-                    details_str = msg.value().decode('utf-8')
-                    handle_event(id, details_str)
-                except Exception as e:
-                    print(f"[error] Malformed event received from " \
-                          f"topic {topic}: {msg.value()}. {e}")
 
-    except KeyboardInterrupt:
-        pass
-
-    finally:
-        consumer.close()
-
-
-def start_consumer(args, config, response_queue):
+def start_consumer(args, config, response_queue, settings):
     global _response_queue
     _response_queue = response_queue
     print(f'{MODULE_NAME}_consumer started')
-
-    threading.Thread(target=lambda: consumer_job(args, config)).start()
\ No newline at end of file
+    ConsumerRuntime(args, config, MODULE_NAME, handle_event, settings,
+                    handle_batch=handle_batch,
+                    key=client_key).start()
@@ -1,6 +1,4 @@
 import os
-import time
-import json
 import threading
 import multiprocessing
 
@@ -8,6 +6,8 @@ from uuid import uuid4
 from flask import Flask, request, jsonify, abort
 from werkzeug.exceptions import HTTPException
 
+from .pending import pending_requests
+
 
 # Константы
 HOST: str = "0.0.0.0"
@@ -16,58 +16,50 @@ MODULE_NAME: str = os.getenv("MODULE_NAME")
 MAX_WAIT_TIME: int = 30
 
 
-# Очереди задач и ответов
+# Очередь задач
 _requests_queue: multiprocessing.Queue = None
-_response_queue: multiprocessing.Queue = None
 
 
 app = Flask(__name__)
 
 
-def send_to_profile_client(details):
-    if not details:
-        abort(400)
-
+def submit(details):
+    """ Отправляет запрос в profile-client и регистрирует ожидание ответа. """
     details["deliver_to"] = "profile-client"
     details["source"] = MODULE_NAME
     details["id"] = uuid4().__str__()
 
+    pending_requests.register(details["id"])
     try:
         _requests_queue.put(details)
-        print(f"{MODULE_NAME} update event: {details}")
-    except Exception as e:
-        print("[COM-MOBILE_DEBUG] malformed request", e)
-        abort(400)
-
+    except Exception:
+        pending_requests.discard(details["id"])
+        raise
 
-def wait_response():
-    """ Ожидает завершение выполнения задачи. """
-    start_time = time.time()
-    while 1:
-        if time.time() - start_time > MAX_WAIT_TIME:
-            break
+    print(f"{MODULE_NAME} update event: {details}")
+    return details["id"]
 
-        try:
-            response = _response_queue.get(timeout=MAX_WAIT_TIME)
-        except Exception as e:
-            print("[COM-MOBILE_DEBUG] timeout...", e)
-            continue
 
-        if not isinstance(response, dict):
-            print("[COM-MOBILE_DEBUG] not a dict...")
-            continue
+def send_to_profile_client(details):
+    if not details:
+        abort(400)
 
-        data = response.get('data')
-        if response.get('deliver_to') != 'com-mobile' or not data:
-            print("[COM-MOBILE_DEBUG] something strange...")
-            continue
+    try:
+        return submit(details)
+    except Exception as e:
+        print("[COM-MOBILE_DEBUG] malformed request", e)
+        abort(400)
 
-        print("[COM-MOBILE_DEBUG] response", response)
-        return data
 
-    print("[COM-MOBILE_DEBUG] OUT OF TIME...")
+def wait_response(id, timeout=MAX_WAIT_TIME):
+    """ Ожидает ответ на запрос с идентификатором id. """
+    response = pending_requests.wait(id, timeout)
+    if response is None:
+        print(f"[COM-MOBILE_DEBUG] OUT OF TIME... {id}")
+        return None
 
-    return None
+    print("[COM-MOBILE_DEBUG] response", response)
+    return response.get('data')
 
 
 # List all avaible cars
@@ -76,8 +68,8 @@ def get_all_cars():
     details_to_send = {
         "operation": "get_cars"
     }
-    send_to_profile_client(details_to_send)
-    data = wait_response()
+    id = send_to_profile_client(details_to_send)
+    data = wait_response(id)
     return jsonify(data)
 
 
@@ -87,8 +79,8 @@ def get_tariff():
     details_to_send = {
         "operation": "get_tariff"
     }
-    send_to_profile_client(details_to_send)
-    data = wait_response()
+    id = send_to_profile_client(details_to_send)
+    data = wait_response(id)
     return jsonify(data)
 
 
@@ -103,8 +95,8 @@ def select_car(brand):
         "operation": "select_car",
         "data": [name, experience, tariff, brand]
     }
-    send_to_profile_client(details_to_send)
-    data = wait_response()
+    id = send_to_profile_client(details_to_send)
+    data = wait_response(id)
     return jsonify(data)
 
 
@@ -117,12 +109,14 @@ def handle_exception(e):
     }), e.code
 
 
-def start_web(requests_queue, response_queue):
+def set_requests_queue(requests_queue):
     global _requests_queue
-    global _response_queue
 
     _requests_queue = requests_queue
-    _response_queue = response_queue
+
+
+def start_web(requests_queue):
+    set_requests_queue(requests_queue)
 
     threading.Thread(target=lambda: app.run(
         host=HOST, port=PORT, debug=True, use_reloader=False
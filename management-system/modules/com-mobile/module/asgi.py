@@ -0,0 +1,142 @@
+import re
+import json
+import threading
+import multiprocessing
+
+import uvicorn
+
+from .api import HOST, PORT, MAX_WAIT_TIME, submit, set_requests_queue
+from .pending import pending_requests
+
+
+# Асинхронный режим шлюза: те же маршруты, что и в api.py, но ожидание
+# ответа из Kafka не занимает поток — запросы ждут в одном цикле событий.
+
+
+def cars_details(match, body):
+    return {"operation": "get_cars"}
+
+
+def tariff_details(match, body):
+    return {"operation": "get_tariff"}
+
+
+def select_car_details(match, body):
+    if not isinstance(body, dict):
+        return None
+
+    return {
+        "operation": "select_car",
+        "data": [body.get('client_name'), body.get('experience'),
+                 body.get('tariff'), match.group('brand')]
+    }
+
+
+ROUTES = (
+    ("GET", re.compile(r"^/cars$"), cars_details),
+    ("GET", re.compile(r"^/tariff$"), tariff_details),
+    ("POST", re.compile(r"^/select/car/(?P<brand>[^/]+)$"), select_car_details),
+)
+
+ERRORS = {
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+}
+
+
+async def read_json(receive):
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+async def respond(send, status, payload):
+    body = (json.dumps(payload) + "\n").encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def respond_error(send, status):
+    # Формат совпадает с обработчиком ошибок Flask в api.py
+    await respond(send, status, {"status": status, "name": ERRORS[status]})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def resolve(method, path):
+    """ Поиск маршрута, возвращает (обработчик, совпадение, код ошибки). """
+    allowed = False
+    for route_method, pattern, build in ROUTES:
+        match = pattern.match(path)
+        if match is None:
+            continue
+        if route_method == method:
+            return build, match, None
+        allowed = True
+
+    return None, None, 405 if allowed else 404
+
+
+async def app(scope, receive, send):
+    """ ASGI-приложение шлюза мобильного клиента. """
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    if scope["type"] != "http":
+        return
+
+    build, match, error = resolve(scope["method"], scope["path"])
+    if error:
+        return await respond_error(send, error)
+
+    body = await read_json(receive) if scope["method"] == "POST" else None
+    details = build(match, body)
+    if not details:
+        return await respond_error(send, 400)
+
+    try:
+        id = submit(details)
+    except Exception as e:
+        print("[COM-MOBILE_DEBUG] malformed request", e)
+        return await respond_error(send, 400)
+
+    response = await pending_requests.wait_async(id, MAX_WAIT_TIME)
+    if response is None:
+        print(f"[COM-MOBILE_DEBUG] OUT OF TIME... {id}")
+        return await respond(send, 200, None)
+
+    print("[COM-MOBILE_DEBUG] response", response)
+    await respond(send, 200, response.get('data'))
+
+
+def start_asgi(requests_queue: multiprocessing.Queue):
+    set_requests_queue(requests_queue)
+
+    threading.Thread(target=lambda: uvicorn.run(
+        app, host=HOST, port=PORT, lifespan="on", backlog=4096,
+        access_log=False
+    )).start()
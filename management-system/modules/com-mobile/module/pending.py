@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+from concurrent.futures import Future, InvalidStateError, TimeoutError
+
+
+class PendingRequests:
+    """ Таблица ожидающих ответа запросов по идентификатору события.
+
+    API регистрирует запрос до отправки события, консьюмер завершает его
+    по полю id ответа, а запись удаляется после ожидания (с ответом или по
+    таймауту). Ответы на неизвестные или просроченные запросы отбрасываются.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: dict = {}
+
+    def register(self, id) -> Future:
+        future = Future()
+        with self._lock:
+            self._futures[id] = future
+        return future
+
+    def discard(self, id):
+        with self._lock:
+            self._futures.pop(id, None)
+
+    def complete(self, id, details) -> bool:
+        """ Передаёт ответ ожидающему запросу, False для «осиротевших». """
+        with self._lock:
+            future = self._futures.get(id)
+
+        if future is None:
+            return False
+
+        try:
+            future.set_result(details)
+        except InvalidStateError:
+            # Повторный ответ на уже завершённый запрос
+            return False
+        return True
+
+    def wait(self, id, timeout):
+        """ Ожидает ответ не дольше timeout секунд, иначе возвращает None. """
+        with self._lock:
+            future = self._futures.get(id)
+
+        if future is None:
+            return None
+
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            return None
+        finally:
+            self.discard(id)
+
+    async def wait_async(self, id, timeout):
+        """ То же, что wait, но без блокировки потока: ответ ожидается в
+        цикле событий, консьюмер завершает future из своего потока. """
+        with self._lock:
+            future = self._futures.get(id)
+
+        if future is None:
+            return None
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.discard(id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._futures)
+
+
+pending_requests = PendingRequests()
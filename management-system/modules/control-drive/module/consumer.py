@@ -1,18 +1,24 @@
 import os
 import json
-import threading
 
 from uuid import uuid4
-from confluent_kafka import Consumer, OFFSET_BEGINNING
+from runtime.consumer import ConsumerRuntime, field_key
 
 from .producer import proceed_to_deliver
+from .rules import RULES_FILE, load_rules
 
 MODULE_NAME: str = os.getenv("MODULE_NAME")
 
-def check_speed_and_coor(speed, coordinates):
-    if speed > 200:
-        return "stop"
-    
+# Правила компилируются один раз при старте консьюмера
+_rules = None
+
+
+def get_rules():
+    global _rules
+    if _rules is None:
+        _rules = load_rules(RULES_FILE)
+    return _rules
+
 
 def send_to_manage_drive(id, details):
     details["deliver_to"] = "manage-drive"
@@ -22,6 +28,31 @@ def send_to_sender_car(id, details):
     details["deliver_to"] = "sender-car"
     proceed_to_deliver(id, details)
 
+def handle_telemetry_batch(id, details):
+    """ Пачка телеметрии: правила проверяются сразу для всей пачки, машины
+    с нарушениями останавливаются по одной, остальные образцы уходят в
+    manage-drive одной пачкой. """
+    samples = details.get("data") or []
+    hits = get_rules().evaluate(samples)
+
+    passed = []
+    for number, data in enumerate(samples):
+        reason = hits.get(number)
+        if reason:
+            stop_id = uuid4().__str__()
+            send_to_sender_car(stop_id, {"id": stop_id,
+                                         "data": data,
+                                         "operation": "stop",
+                                         "reason": reason,
+                                         "car": data.get('id') or data.get('brand')})
+        else:
+            passed.append(data)
+
+    if passed:
+        details["data"] = passed
+        send_to_manage_drive(id, details)
+
+
 def handle_event(id, details_str):
     """ Обработчик входящих в модуль задач. """
     details = json.loads(details_str)
@@ -34,53 +65,28 @@ def handle_event(id, details_str):
     print(f"[info] handling event {id}, "
           f"{source}->{deliver_to}: {operation}")
 
-    if operation != "telemetry":
+    if operation == "telemetry_batch":
+        return handle_telemetry_batch(id, details)
+    elif operation != "telemetry":
+        if operation == "return":
+            # Поездка закончена, окно телеметрии машины больше не нужно
+            get_rules().release((data or {}).get("status") or {})
         return send_to_manage_drive(id, details)
     else:
-        speed = data.get('speed')
-        coordinates = data.get('coordinates')
-        command = check_speed_and_coor(speed, coordinates)
-        if command == "stop":
+        reason = get_rules().evaluate([data]).get(0)
+        if reason:
             details["operation"] = "stop"
+            details["reason"] = reason
             return send_to_sender_car(id, details)
         else:
             return send_to_manage_drive(id, details)
 
-def consumer_job(args, config):
-    consumer = Consumer(config)
-
-    def reset_offset(verifier_consumer, partitions):
-        if not args.reset:
-            return
-
-        for p in partitions:
-            p.offset = OFFSET_BEGINNING
-        verifier_consumer.assign(partitions)
-
-    topic = MODULE_NAME
-    consumer.subscribe([topic], on_assign=reset_offset)
-
-    try:
-        while True:
-            msg = consumer.poll(1.0)
-            if msg is None:
-                pass
-            elif msg.error():
-                print(f"[error] {msg.error()}")
-            else:
-                try:
-                    id = msg.key().decode('utf-8')
-                    details_str = msg.value().decode('utf-8')
-                    handle_event(id, details_str)
-                except Exception as e:
-                    print(f"[error] Malformed event received from " \
-                          f"topic {topic}: {msg.value()}. {e}")
-    except KeyboardInterrupt:
-        pass
-
-    finally:
-        consumer.close()
-
-def start_consumer(args, config):
+
+def start_consumer(args, config, settings):
     print(f'{MODULE_NAME}_consumer started')
-    threading.Thread(target=lambda: consumer_job(args, config)).start()
\ No newline at end of file
+
+    global _rules
+    _rules = load_rules(settings.get("rules", RULES_FILE))
+
+    ConsumerRuntime(args, config, MODULE_NAME, handle_event, settings,
+                    key=field_key("car")).start()
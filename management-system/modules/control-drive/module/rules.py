@@ -0,0 +1,206 @@
+import json
+
+import numpy as np
+
+from .windows import DEFAULT_WINDOW_SIZE, DEFAULT_ACCEL_SPIKE, TelemetryWindows
+
+
+# Файл правил по умолчанию (относительно каталога модуля), переопределяется
+# параметром rules в секции [control-drive.runtime]
+RULES_FILE: str = "config/rules.json"
+# Размер ячейки сетки пространственного индекса по умолчанию
+DEFAULT_CELL_SIZE: float = 10.0
+
+
+class Geofence:
+    """ Многоугольник геозоны: въезд запрещён (max_speed не задан) или
+    внутри действует ограничение скорости. """
+
+    def __init__(self, name, polygon, max_speed=None):
+        vertices = np.asarray(polygon, dtype=np.float64)
+        if vertices.ndim != 2 or vertices.shape[0] < 3 or vertices.shape[1] != 2:
+            raise ValueError(f"geofence {name}: polygon needs at least 3 [x, y] points")
+
+        self.name = name
+        self.max_speed = None if max_speed is None else float(max_speed)
+        self.x1, self.y1 = vertices[:, 0], vertices[:, 1]
+        self.x2, self.y2 = np.roll(self.x1, -1), np.roll(self.y1, -1)
+        self.bbox = (self.x1.min(), self.y1.min(), self.x1.max(), self.y1.max())
+
+    def contains(self, xs, ys) -> np.ndarray:
+        """ Векторная проверка точек на попадание внутрь (метод лучей). """
+        min_x, min_y, max_x, max_y = self.bbox
+        inside = np.zeros(len(xs), dtype=bool)
+        candidates = np.flatnonzero((xs >= min_x) & (xs <= max_x) &
+                                    (ys >= min_y) & (ys <= max_y))
+        if not len(candidates):
+            return inside
+
+        px = xs[candidates, None]
+        py = ys[candidates, None]
+        crosses = (self.y1 > py) != (self.y2 > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            at_x = self.x1 + (py - self.y1) * (self.x2 - self.x1) / (self.y2 - self.y1)
+        hits = crosses & (px < at_x)
+        inside[candidates] = hits.sum(axis=1) % 2 == 1
+        return inside
+
+
+class GridIndex:
+    """ Равномерная сетка: ячейка -> геозоны, пересекающие её по bbox.
+
+    Точка проверяется только против геозон своей ячейки, поэтому стоимость
+    не растёт с общим числом геозон.
+    """
+
+    def __init__(self, geofences, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells: dict = {}
+        for number, fence in enumerate(geofences):
+            min_x, min_y, max_x, max_y = fence.bbox
+            for cx in range(self._cell(min_x), self._cell(max_x) + 1):
+                for cy in range(self._cell(min_y), self._cell(max_y) + 1):
+                    self.cells.setdefault((cx, cy), []).append(number)
+
+    def _cell(self, value) -> int:
+        return int(np.floor(value / self.cell_size))
+
+    def group(self, xs, ys):
+        """ Группирует точки по ячейкам, в которых есть геозоны.
+
+        Возвращает пары (номера геозон, номера точек).
+        """
+        # Образцы без координат в геозоны не попадают
+        located = np.flatnonzero(np.isfinite(xs) & np.isfinite(ys))
+        if not self.cells or not len(located):
+            return
+
+        # Ячейка кодируется одним числом, чтобы группировать одномерно
+        cx = np.floor(xs[located] / self.cell_size).astype(np.int64)
+        cy = np.floor(ys[located] / self.cell_size).astype(np.int64)
+        cells = (cx << 32) + (cy & 0xFFFFFFFF)
+        unique, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+        order = located[np.argsort(inverse, kind="stable")]
+        bounds = np.cumsum(counts)
+        for number, cell in enumerate(unique.tolist()):
+            fences = self.cells.get((cell >> 32, (cell & 0xFFFFFFFF) - ((cell & 0x80000000) << 1)))
+            if fences:
+                yield fences, order[bounds[number] - counts[number]:bounds[number]]
+
+
+class RuleEngine:
+    """ Правила проверки телеметрии, скомпилированные из конфигурации.
+
+    Правила:
+    - speed_limit: общее ограничение скорости;
+    - max_trip_time: максимальная длительность поездки в секундах;
+    - geofences: запретные зоны и зоны с ограничением скорости;
+    - windows: правила по скользящим окнам машин (sustained_overspeed -
+      скорость выше speed дольше duration секунд, max_accel_spikes - число
+      рывков ускорения в окне).
+
+    С правилами по окнам проверка хранит состояние: каждый образец
+    добавляется в окно своей машины.
+    """
+
+    def __init__(self, rules):
+        self.speed_limit = rules.get("speed_limit")
+        self.max_trip_time = rules.get("max_trip_time")
+        self.geofences = []
+        for number, fence in enumerate(rules.get("geofences", ())):
+            try:
+                self.geofences.append(Geofence(fence["name"], fence["polygon"],
+                                               fence.get("max_speed")))
+            except (KeyError, TypeError, ValueError) as e:
+                # Ошибка в одной геозоне не отключает остальные правила
+                print(f"[error] geofence #{number} skipped: {e}")
+        self.index = GridIndex(self.geofences, rules.get("grid_cell_size", DEFAULT_CELL_SIZE))
+
+        windows = rules.get("windows")
+        self.windows = None
+        if windows:
+            self.windows = TelemetryWindows(windows.get("size", DEFAULT_WINDOW_SIZE),
+                                            windows.get("accel_spike", DEFAULT_ACCEL_SPIKE))
+            self.sustained_overspeed = windows.get("sustained_overspeed")
+            self.max_accel_spikes = windows.get("max_accel_spikes")
+
+    def evaluate(self, samples) -> dict:
+        """ Проверяет пачку образцов телеметрии.
+
+        Возвращает словарь: номер образца -> причина остановки. Образцы без
+        нарушений в него не попадают.
+        """
+        count = len(samples)
+        if not count:
+            return {}
+
+        speeds = np.fromiter((sample.get("speed") or 0 for sample in samples),
+                             dtype=np.float64, count=count)
+        trip_times = np.fromiter((sample.get("trip_time") or 0 for sample in samples),
+                                 dtype=np.float64, count=count)
+        coordinates = np.array([sample.get("coordinates") or (np.nan, np.nan)
+                                for sample in samples], dtype=np.float64).reshape(count, 2)
+        xs, ys = coordinates[:, 0], coordinates[:, 1]
+
+        hits: dict = {}
+        if self.speed_limit is not None:
+            for number in np.flatnonzero(speeds > self.speed_limit).tolist():
+                hits.setdefault(number, "speed_limit")
+        if self.max_trip_time is not None:
+            for number in np.flatnonzero(trip_times > self.max_trip_time).tolist():
+                hits.setdefault(number, "max_trip_time")
+
+        for fences, points in self.index.group(xs, ys):
+            for fence_number in fences:
+                fence = self.geofences[fence_number]
+                inside = fence.contains(xs[points], ys[points])
+                if fence.max_speed is not None:
+                    inside &= speeds[points] > fence.max_speed
+                for number in points[inside].tolist():
+                    hits.setdefault(number, f"geofence:{fence.name}")
+
+        if self.windows is not None:
+            self.evaluate_windows(samples, trip_times, speeds, xs, ys, hits)
+        return hits
+
+    def evaluate_windows(self, samples, trip_times, speeds, xs, ys, hits):
+        located = np.flatnonzero(np.isfinite(xs) & np.isfinite(ys))
+        if not len(located):
+            return
+
+        cars = [car_key(samples[number]) for number in located.tolist()]
+        sustained, spiking = self.windows.update(cars, trip_times[located], speeds[located],
+                                                 xs[located], ys[located], check=self.check_windows)
+
+        if sustained is not None:
+            for number in located[sustained].tolist():
+                hits.setdefault(number, "sustained_overspeed")
+        if spiking is not None:
+            for number in located[spiking].tolist():
+                hits.setdefault(number, "accel_spikes")
+
+        # Остановленная машина начнёт следующую поездку с пустым окном
+        self.windows.release(*(car_key(samples[number]) for number in hits))
+
+    def check_windows(self, rows):
+        """ Правила по окнам, вызывается из update под блокировкой окон. """
+        sustained = spiking = None
+        if self.sustained_overspeed:
+            sustained = self.windows.sustained_above(rows, self.sustained_overspeed["speed"],
+                                                     self.sustained_overspeed["duration"])
+        if self.max_accel_spikes is not None:
+            spiking = self.windows.aggregates(rows)["spikes"] >= self.max_accel_spikes
+        return sustained, spiking
+
+    def release(self, sample):
+        if self.windows is not None:
+            self.windows.release(car_key(sample))
+
+
+def car_key(sample) -> str:
+    return sample.get("id") or sample.get("brand")
+
+
+def load_rules(path=RULES_FILE) -> RuleEngine:
+    with open(path) as rules_file:
+        return RuleEngine(json.load(rules_file))
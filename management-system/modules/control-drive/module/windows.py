@@ -0,0 +1,181 @@
+import threading
+
+import numpy as np
+
+
+# Значения по умолчанию для секции "windows" файла правил
+DEFAULT_WINDOW_SIZE: int = 32
+# Порог ускорения (км/ч за секунду), выше которого изменение скорости
+# считается рывком
+DEFAULT_ACCEL_SPIKE: float = 30.0
+INITIAL_CAPACITY: int = 1024
+
+
+class TelemetryWindows:
+    """ Скользящие окна телеметрии по машинам.
+
+    Для каждой машины хранится кольцевой буфер последних size образцов
+    (время, скорость, координаты) в общих массивах float32, поэтому память
+    на машину фиксирована. Сумма скоростей, пройденное расстояние и число
+    рывков ускорения обновляются инкрементально: новый образец прибавляется,
+    вытесненный из буфера вычитается. Время образца - trip_time, с началом
+    новой поездки окно машины сбрасывается.
+    """
+
+    def __init__(self, size=DEFAULT_WINDOW_SIZE, accel_spike=DEFAULT_ACCEL_SPIKE,
+                 capacity=INITIAL_CAPACITY):
+        self.size = size
+        self.accel_spike = accel_spike
+        self.rows: dict = {}
+        self._free: list = []
+        self._lock = threading.Lock()
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        shape = (capacity, self.size)
+        self.time = np.zeros(shape, dtype=np.float32)
+        self.speed = np.zeros(shape, dtype=np.float32)
+        self.x = np.zeros(shape, dtype=np.float32)
+        self.y = np.zeros(shape, dtype=np.float32)
+        self.step = np.zeros(shape, dtype=np.float32)
+        self.spike = np.zeros(shape, dtype=np.bool_)
+        self.head = np.zeros(capacity, dtype=np.int32)
+        self.count = np.zeros(capacity, dtype=np.int32)
+        self.speed_sum = np.zeros(capacity, dtype=np.float64)
+        self.distance = np.zeros(capacity, dtype=np.float64)
+        self.spikes = np.zeros(capacity, dtype=np.int32)
+
+    def _grow(self):
+        old = (self.time, self.speed, self.x, self.y, self.step, self.spike,
+               self.head, self.count, self.speed_sum, self.distance, self.spikes)
+        self._allocate(self.capacity * 2)
+        new = (self.time, self.speed, self.x, self.y, self.step, self.spike,
+               self.head, self.count, self.speed_sum, self.distance, self.spikes)
+        for array, previous in zip(new, old):
+            array[:len(previous)] = previous
+
+    def _reset(self, rows):
+        for array in (self.time, self.speed, self.x, self.y, self.step, self.spike):
+            array[rows] = 0
+        for array in (self.head, self.count, self.speed_sum, self.distance, self.spikes):
+            array[rows] = 0
+
+    def _row(self, car) -> int:
+        row = self.rows.get(car)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = len(self.rows)
+                if row == self.capacity:
+                    self._grow()
+            self.rows[car] = row
+        return row
+
+    def release(self, *cars):
+        """ Освобождает окна машин (поездка закончена или машина остановлена). """
+        with self._lock:
+            rows = [row for row in (self.rows.pop(car, None) for car in cars)
+                    if row is not None]
+            if rows:
+                self._reset(rows)
+                self._free.extend(rows)
+
+    def _append(self, rows, t, v, x, y):
+        """ Добавляет по одному образцу в окна различных машин. """
+        size = self.size
+        v = v.astype(np.float32)
+        count = self.count[rows]
+        previous = (self.head[rows] - 1) % size
+
+        # Время пошло назад - началась новая поездка
+        restarted = (count > 0) & (t < self.time[rows, previous])
+        if restarted.any():
+            self._reset(rows[restarted])
+            count = self.count[rows]
+
+        has_previous = count > 0
+        dt = t - self.time[rows, previous]
+        dv = v - self.speed[rows, previous]
+        step = np.where(has_previous,
+                        np.hypot(x - self.x[rows, previous], y - self.y[rows, previous]),
+                        0).astype(np.float32)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            spike = has_previous & (dt > 0) & (np.abs(dv / dt) > self.accel_spike)
+
+        position = self.head[rows]
+        full = count == size
+        self.speed_sum[rows] -= np.where(full, self.speed[rows, position], 0)
+        self.distance[rows] -= np.where(full, self.step[rows, position], 0)
+        self.spikes[rows] -= np.where(full, self.spike[rows, position], 0)
+
+        self.time[rows, position] = t
+        self.speed[rows, position] = v
+        self.x[rows, position] = x
+        self.y[rows, position] = y
+        self.step[rows, position] = step
+        self.spike[rows, position] = spike
+
+        self.speed_sum[rows] += v
+        self.distance[rows] += step
+        self.spikes[rows] += spike
+        self.head[rows] = (position + 1) % size
+        self.count[rows] = np.minimum(count + 1, size)
+
+    def update(self, cars, times, speeds, xs, ys, check=None):
+        """ Добавляет пачку образцов, возвращает номера строк машин пачки.
+
+        Образцы одной машины в пачке добавляются по порядку: за проход
+        берётся по одному образцу каждой машины.
+
+        Окна меняют и другие обработчики (release, переиспользование и
+        перенос строк), поэтому читать их после update небезопасно. Если
+        задан check, он вызывается с номерами строк под той же блокировкой,
+        и update возвращает его результат вместо номеров строк.
+        """
+        with self._lock:
+            rows = np.fromiter((self._row(car) for car in cars), dtype=np.int64, count=len(cars))
+            if len(set(cars)) == len(cars):
+                self._append(rows, times, speeds, xs, ys)
+            else:
+                remaining = np.arange(len(rows))
+                while len(remaining):
+                    _, first = np.unique(rows[remaining], return_index=True)
+                    chosen = remaining[np.sort(first)]
+                    self._append(rows[chosen], times[chosen], speeds[chosen], xs[chosen], ys[chosen])
+                    remaining = np.setdiff1d(remaining, chosen, assume_unique=True)
+            return rows if check is None else check(rows)
+
+    def aggregates(self, rows) -> dict:
+        """ Агрегаты окон: средняя и максимальная скорость, пройденное
+        расстояние, число рывков и охват окна по времени. При работе
+        нескольких обработчиков вызывается из check в update. """
+        count = self.count[rows]
+        valid = np.arange(self.size) < count[:, None]
+        times = self.time[rows]
+        latest = times[np.arange(len(rows)), (self.head[rows] - 1) % self.size]
+        oldest = np.where(valid, times, np.inf).min(axis=1)
+        # Шаг и рывок самого старого образца относятся к уже вытесненному
+        # предыдущему образцу и в окно не входят
+        first = np.where(count == self.size, self.head[rows], 0)
+        return {
+            "average_speed": self.speed_sum[rows] / np.maximum(count, 1),
+            "max_speed": np.where(valid, self.speed[rows], 0).max(axis=1),
+            "distance": self.distance[rows] - self.step[rows, first],
+            "spikes": self.spikes[rows] - self.spike[rows, first],
+            "span": np.where(count > 0, latest - oldest, 0),
+        }
+
+    def sustained_above(self, rows, speed, duration) -> np.ndarray:
+        """ Скорость держалась выше speed на всём отрезке последних
+        duration секунд (и окно этот отрезок покрывает). """
+        count = self.count[rows]
+        valid = np.arange(self.size) < count[:, None]
+        times = self.time[rows]
+        latest = times[np.arange(len(rows)), (self.head[rows] - 1) % self.size]
+        oldest = np.where(valid, times, np.inf).min(axis=1)
+
+        recent = valid & (times >= (latest - duration)[:, None])
+        over = np.where(recent, self.speed[rows] > speed, True).all(axis=1)
+        return over & (count > 0) & (latest - oldest >= duration)
@@ -0,0 +1,124 @@
+import itertools
+import threading
+
+
+# Как часто (в секундах) снимок свободных машин сверяется с машинами в фоне.
+# Запросы get_cars от сверки не зависят: снимок не устаревает
+REFRESH_INTERVAL: float = 60.0
+
+
+def car_key(status) -> str:
+    return status.get("id") or status.get("brand")
+
+
+class FreeCars:
+    """ Материализованное множество свободных машин.
+
+    Полный снимок приходит ответом answer_cars, дальше множество
+    обновляется по событиям: телеметрия и подтверждённый доступ убирают
+    машину из свободных, возврат машины добавляет её обратно. Только пока
+    снимка нет (холодный старт), get_cars обслуживается опросом машин;
+    после этого снимок лишь сверяется с машинами в фоне.
+
+    Телеметрия и возврат обрабатываются разными обработчиками и могут
+    прийти в любом порядке. Для каждой машины запоминается момент
+    последнего возврата и последней выдачи; после возврата телеметрия
+    машины не учитывается, пока машину не выдадут снова. Моменты - номера
+    событий по порядку, а не время: время двух событий может совпасть.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._free: dict = {}
+        self._by_brand: dict = {}
+        self._returned_at: dict = {}
+        self._reserved_at: dict = {}
+        self._clock = itertools.count()
+        self._loaded = False
+
+    def _add(self, key, brand):
+        self._free[key] = brand
+        self._by_brand.setdefault(brand, set()).add(key)
+
+    def _remove(self, key):
+        brand = self._free.pop(key, None)
+        if brand is not None:
+            keys = self._by_brand[brand]
+            keys.discard(key)
+            if not keys:
+                del self._by_brand[brand]
+
+    def is_warm(self) -> bool:
+        with self._lock:
+            return self._loaded
+
+    def mark(self) -> int:
+        """ Момент запроса снимка для фоновой сверки. """
+        with self._lock:
+            return next(self._clock)
+
+    def load(self, statuses, since=None):
+        """ Полный снимок статусов машин (answer_cars).
+
+        since - момент запроса снимка (mark). Машины, выданные или
+        возвращённые после него, снимок мог не застать: для них остаётся
+        состояние, собранное по событиям.
+        """
+        with self._lock:
+            touched = set()
+            if since is not None:
+                for marks in (self._reserved_at, self._returned_at):
+                    touched.update(key for key, at in marks.items() if at > since)
+            previous = dict(self._free)
+
+            self._free.clear()
+            self._by_brand.clear()
+            for status in statuses:
+                key = car_key(status)
+                if key in touched:
+                    continue
+                if status.get("occupied_by") is None and not status.get("is_running"):
+                    self._add(key, status["brand"])
+            for key in touched:
+                if key in previous:
+                    self._add(key, previous[key])
+            self._loaded = True
+
+    def occupied(self, statuses):
+        """ Машины в поездке (телеметрия). Образцы, прочитанные после
+        возврата машины, но до её новой выдачи, пропускаются. """
+        with self._lock:
+            for status in statuses:
+                key = car_key(status)
+                returned_at = self._returned_at.get(key)
+                if returned_at is not None and returned_at > self._reserved_at.get(key, -1):
+                    continue
+                self._remove(key)
+
+    def reserve(self, brand, car_id=None):
+        """ Занимает машину: car_id, если он известен (машина уже выбрана,
+        повторное занятие ничего не меняет), иначе любую свободную машину
+        марки. Возвращает ключ машины или None, если свободных машин марки
+        нет. """
+        with self._lock:
+            key = car_id
+            if key is None:
+                key = min(self._by_brand.get(brand) or (), default=None)
+            if key is not None:
+                self._remove(key)
+                self._reserved_at[key] = next(self._clock)
+            return key
+
+    def returned(self, status):
+        with self._lock:
+            key = car_key(status)
+            self._add(key, status["brand"])
+            self._returned_at[key] = next(self._clock)
+
+    def brands(self) -> list:
+        """ Марки свободных машин, по одной на машину. """
+        with self._lock:
+            return list(self._free.values())
+
+
+free_cars = FreeCars()
@@ -1,15 +1,24 @@
 import os
 import json
+import time
 import threading
 
 from uuid import uuid4
-from confluent_kafka import Consumer, OFFSET_BEGINNING
+from runtime.consumer import ConsumerRuntime, field_key
 
+from .availability import REFRESH_INTERVAL, free_cars
 from .producer import proceed_to_deliver
+from .tsstore import STORE_PATH, TelemetryStore
 
 
 MODULE_NAME: str = os.getenv("MODULE_NAME")
 
+# Хранилище телеметрии открывается при старте консьюмера
+_store: TelemetryStore = None
+
+# Фоновые сверки снимка свободных машин: id события -> момент запроса
+_resyncs: dict = {}
+
 
 def send_to_verify(id, details):
     details["deliver_to"] = "verify"
@@ -21,6 +30,21 @@ def send_to_profile_client(id, details):
     proceed_to_deliver(id, details)
 
 
+def request_resync():
+    """ Запрашивает полный снимок машин для сверки, не от имени клиента. """
+    id = str(uuid4())
+    _resyncs[id] = free_cars.mark()
+    send_to_verify(id, {"id": id, "operation": "get_cars"})
+
+
+def resync_job(interval):
+    while True:
+        time.sleep(interval)
+        # Холодный старт обслуживает первый же get_cars
+        if free_cars.is_warm():
+            request_resync()
+
+
 def handle_event(id, details_str):
     """ Обработчик входящих в модуль задач. """
     details = json.loads(details_str)
@@ -34,61 +58,64 @@ def handle_event(id, details_str):
           f"{source}->{deliver_to}: {operation}")
 
     if operation == "get_cars":
+        if free_cars.is_warm():
+            # Ответ из памяти, без опроса машин
+            details["operation"] = "answer_cars"
+            details["data"] = free_cars.brands()
+            return send_to_profile_client(id, details)
         return send_to_verify(id, details)
     elif operation == "answer_cars":
-        details["data"] = [car['brand'] for car in data if car['occupied_by'] is None]
+        since = _resyncs.pop(id, None)
+        if since is not None:
+            # Ответ на фоновую сверку, клиент его не ждёт
+            return free_cars.load(data, since)
+        free_cars.load(data)
+        details["data"] = free_cars.brands()
         return send_to_profile_client(id, details)
     elif operation == "get_status":
+        # Машина выбирается здесь: статус, предоплата и доступ относятся к
+        # одной машине. Без снимка машину по марке выбирает cars
+        car_id = free_cars.reserve(data) if free_cars.is_warm() else None
+        if car_id is not None:
+            details["data"] = details["car"] = car_id
         return send_to_verify(id, details)
     elif operation == "answer_status":
         return send_to_profile_client(id, details)
     elif operation == "access":
         return send_to_profile_client(id, details)
     elif operation == "confirm_access":
+        access = details.get("access")
+        if access and access.get("access"):
+            # Машина выбрана при запросе статуса, cars занимает именно её
+            car_id = free_cars.reserve(access.get("car"), access.get("car_id"))
+            if car_id is not None:
+                access["car_id"] = car_id
         return send_to_verify(id, details)
     elif operation == "return":
+        free_cars.returned(data["status"])
         return send_to_profile_client(id, details)
+    elif operation == "telemetry_batch":
+        free_cars.occupied(data)
+        _store.append(data)
+        speeds = [sample.get('speed') or 0 for sample in data]
+        print(f"[info] telemetry batch {id}: {len(data)} samples, "
+              f"max speed {max(speeds, default=0):.2f} км/ч")
     elif operation == "telemetry":
+        free_cars.occupied([data])
+        _store.append([data])
         speed = data.get('speed')
         coordinates = data.get('coordinates')
         print(f"{details["car"]} Скорость: {speed:.2f} км/ч, Координаты: {coordinates}")
 
 
-def consumer_job(args, config):
-    consumer = Consumer(config)
-
-    def reset_offset(verifier_consumer, partitions):
-        if not args.reset:
-            return
-
-        for p in partitions:
-            p.offset = OFFSET_BEGINNING
-        verifier_consumer.assign(partitions)
-
-    topic = MODULE_NAME
-    consumer.subscribe([topic], on_assign=reset_offset)
-
-    try:
-        while True:
-            msg = consumer.poll(1.0)
-            if msg is None:
-                pass
-            elif msg.error():
-                print(f"[error] {msg.error()}")
-            else:
-                try:
-                    id = msg.key().decode('utf-8')
-                    details_str = msg.value().decode('utf-8')
-                    handle_event(id, details_str)
-                except Exception as e:
-                    print(f"[error] Malformed event received from " \
-                          f"topic {topic}: {msg.value()}. {e}")
-    except KeyboardInterrupt:
-        pass
-
-    finally:
-        consumer.close()
-
-def start_consumer(args, config):
+def start_consumer(args, config, settings):
     print(f'{MODULE_NAME}_consumer started')
-    threading.Thread(target=lambda: consumer_job(args, config)).start()
\ No newline at end of file
+
+    global _store
+    _store = TelemetryStore(settings.get("tsstore.path", STORE_PATH))
+
+    interval = float(settings.get("resync.interval", REFRESH_INTERVAL))
+    threading.Thread(target=resync_job, args=(interval,), daemon=True).start()
+
+    ConsumerRuntime(args, config, MODULE_NAME, handle_event, settings,
+                    key=field_key("car", "name")).start()
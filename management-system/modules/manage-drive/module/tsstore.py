@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import threading
+
+import numpy as np
+
+
+# Каталог хранилища по умолчанию, переопределяется параметром tsstore.path
+# в секции [manage-drive.runtime]
+STORE_PATH: str = "telemetry"
+# Строк в одном файле-сегменте и в одном блоке временного индекса
+SEGMENT_ROWS: int = 1 << 20
+BLOCK_ROWS: int = 4096
+# Как часто сохраняются счётчики строк и справочник машин
+FLUSH_INTERVAL: float = 5.0
+# За сколько секунд до момента запроса ищется последнее положение машины
+BBOX_LOOKBACK: float = 5.0
+
+SAMPLE_DTYPE = np.dtype([
+    ("car", np.uint32),
+    ("t", np.float64),
+    ("speed", np.float32),
+    ("x", np.float32),
+    ("y", np.float32),
+])
+
+
+class Segment:
+    """ Сегмент фиксированной ёмкости: по файлу на колонку (segment-N.t,
+    segment-N.x, ...), каждый отображён в память.
+
+    Временной индекс - минимум и максимум времени по блокам из BLOCK_ROWS
+    строк, запрос читает колонку времени только в блоках, пересекающих
+    интервал, остальные колонки - только для подходящих строк.
+    """
+
+    def __init__(self, path, rows=0, capacity=SEGMENT_ROWS):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.capacity = capacity
+        self.columns = {}
+        for column in SAMPLE_DTYPE.names:
+            column_path = f"{path}.{column}"
+            mode = "r+" if os.path.exists(column_path) else "w+"
+            self.columns[column] = np.memmap(column_path, dtype=SAMPLE_DTYPE[column],
+                                             mode=mode, shape=(capacity,))
+        self.rows = 0
+        blocks = -(-capacity // BLOCK_ROWS)
+        self.block_min = np.full(blocks, np.inf)
+        self.block_max = np.full(blocks, -np.inf)
+        if rows:
+            self._index(0, rows)
+            self.rows = rows
+
+    @property
+    def full(self) -> bool:
+        return self.rows == self.capacity
+
+    @property
+    def t_min(self) -> float:
+        return self.block_min.min()
+
+    @property
+    def t_max(self) -> float:
+        return self.block_max.max()
+
+    def _index(self, start, stop):
+        times = self.columns["t"]
+        first, last = start // BLOCK_ROWS, (stop - 1) // BLOCK_ROWS
+        for block in range(first, last + 1):
+            lo, hi = max(start, block * BLOCK_ROWS), min(stop, (block + 1) * BLOCK_ROWS)
+            self.block_min[block] = min(self.block_min[block], times[lo:hi].min())
+            self.block_max[block] = max(self.block_max[block], times[lo:hi].max())
+
+    def append(self, samples) -> int:
+        """ Дописывает сколько поместится, возвращает число записанных строк. """
+        count = min(len(samples), self.capacity - self.rows)
+        if count:
+            for column, values in self.columns.items():
+                values[self.rows:self.rows + count] = samples[column][:count]
+            self._index(self.rows, self.rows + count)
+            self.rows += count
+        return count
+
+    def scan(self, t1, t2, car=None):
+        """ Строки с t1 <= t <= t2 (и машиной car, если задана). """
+        blocks = np.flatnonzero((self.block_min <= t2) & (self.block_max >= t1))
+        selected = []
+        for block in blocks.tolist():
+            lo, hi = block * BLOCK_ROWS, min((block + 1) * BLOCK_ROWS, self.rows)
+            times = self.columns["t"][lo:hi]
+            mask = (times >= t1) & (times <= t2)
+            if car is not None:
+                mask &= self.columns["car"][lo:hi] == car
+            selected.append(lo + np.flatnonzero(mask))
+
+        rows = np.concatenate(selected) if selected else np.empty(0, dtype=np.int64)
+        result = np.empty(len(rows), dtype=SAMPLE_DTYPE)
+        for column, values in self.columns.items():
+            result[column] = values[rows]
+        return result
+
+    def flush(self):
+        for values in self.columns.values():
+            values.flush()
+
+
+class TelemetryStore:
+    """ Колоночное хранилище телеметрии только на дозапись.
+
+    Образцы пишутся пачками в сегменты, отображённые в память; машины
+    кодируются номерами из справочника cars.json, число строк каждого
+    сегмента хранится в index.json. Запросы: траектория машины за интервал
+    и машины в прямоугольнике на момент времени.
+    """
+
+    def __init__(self, path=STORE_PATH, segment_rows=SEGMENT_ROWS):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.segment_rows = segment_rows
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+        self.cars = self._read("cars.json", [])
+        self.car_numbers = {car: number for number, car in enumerate(self.cars)}
+        self.segments = [Segment(os.path.join(path, segment["name"]), segment["rows"],
+                                 segment_rows)
+                         for segment in self._read("index.json", [])]
+
+    def _read(self, name, default):
+        try:
+            with open(os.path.join(self.path, name)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return default
+
+    def _write(self, name, value):
+        # Запись через временный файл, чтобы при сбое не остался обрезанный JSON
+        target = os.path.join(self.path, name)
+        with open(target + ".tmp", "w") as file:
+            json.dump(value, file)
+        os.replace(target + ".tmp", target)
+
+    def _car_number(self, car) -> int:
+        number = self.car_numbers.get(car)
+        if number is None:
+            number = len(self.cars)
+            self.cars.append(car)
+            self.car_numbers[car] = number
+        return number
+
+    def _active(self) -> Segment:
+        if not self.segments or self.segments[-1].full:
+            if self.segments:
+                self.segments[-1].flush()
+            name = f"segment-{len(self.segments):06d}"
+            self.segments.append(Segment(os.path.join(self.path, name), 0, self.segment_rows))
+        return self.segments[-1]
+
+    def append(self, samples, now=None):
+        """ Записывает пачку статусов машин с временем получения now. """
+        if not samples:
+            return
+
+        now = time.time() if now is None else now
+        rows = np.zeros(len(samples), dtype=SAMPLE_DTYPE)
+        coordinates = np.array([sample.get("coordinates") or (np.nan, np.nan)
+                                for sample in samples], dtype=np.float32).reshape(-1, 2)
+        rows["t"] = now
+        rows["speed"] = [sample.get("speed") or 0 for sample in samples]
+        rows["x"] = coordinates[:, 0]
+        rows["y"] = coordinates[:, 1]
+
+        with self._lock:
+            rows["car"] = [self._car_number(sample.get("id") or sample.get("brand"))
+                           for sample in samples]
+            written = 0
+            while written < len(rows):
+                written += self._active().append(rows[written:])
+
+            if time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+                self._flush()
+
+    def _flush(self):
+        for segment in self.segments[-1:]:
+            segment.flush()
+        self._write("cars.json", self.cars)
+        self._write("index.json", [{"name": segment.name, "rows": segment.rows}
+                                   for segment in self.segments])
+        self._flushed_at = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _scan(self, t1, t2, car=None):
+        with self._lock:
+            segments = [segment for segment in self.segments
+                        if segment.rows and segment.t_min <= t2 and segment.t_max >= t1]
+            parts = [segment.scan(t1, t2, car) for segment in segments]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=SAMPLE_DTYPE)
+
+    def trajectory(self, car, t1, t2) -> np.ndarray:
+        """ Траектория машины за [t1, t2]: строки (t, speed, x, y) по времени. """
+        number = self.car_numbers.get(car)
+        if number is None:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+
+        rows = self._scan(t1, t2, number)
+        return rows[np.argsort(rows["t"], kind="stable")]
+
+    def in_bbox(self, min_x, min_y, max_x, max_y, t, lookback=BBOX_LOOKBACK) -> dict:
+        """ Машины в прямоугольнике на момент t: последнее положение каждой
+        машины за lookback секунд до t. Возвращает {машина: (t, speed, x, y)}. """
+        rows = self._scan(t - lookback, t)
+        if not len(rows):
+            return {}
+
+        # Последний образец каждой машины
+        rows = rows[np.lexsort((rows["t"], rows["car"]))]
+        last = np.append(rows["car"][1:] != rows["car"][:-1], True)
+        rows = rows[last]
+        inside = ((rows["x"] >= min_x) & (rows["x"] <= max_x) &
+                  (rows["y"] >= min_y) & (rows["y"] <= max_y))
+        return {self.cars[row["car"]]: (float(row["t"]), float(row["speed"]),
+                                        float(row["x"]), float(row["y"]))
+                for row in rows[inside]}
@@ -1,69 +1,62 @@
 import os
 import json
-import threading
 
-from confluent_kafka import Consumer, OFFSET_BEGINNING
+from runtime.consumer import ConsumerRuntime
 
 from .policies import check_operation
-from .producer import proceed_to_deliver
+from .producer import proceed_to_deliver, proceed_to_deliver_batch
 
 
 MODULE_NAME = os.getenv('MODULE_NAME')
 
+# Значение по умолчанию для секции [monitor.runtime] в config.ini
+DEFAULT_ROUTING: str = 'single'
 
-def handle_event(id, details_str):
-    details = json.loads(details_str)
-
-    print(f"[info] handling event {id}, " \
-          f"{details['source']}->{details['deliver_to']}: " \
-          f"{details['operation']}")
-
-    if check_operation(id, details):
-        return proceed_to_deliver(id, details)
 
+def report_unauthorized(id, details):
     print(f"[error] !!!! policies check failed, delivery unauthorized !!! " \
           f"id: {id}, {details['source']}->{details['deliver_to']}: " \
           f"{details['operation']}")
     print(f"[error] suspicious event details: {details}")
 
 
-def consumer_job(args, config):
-    consumer = Consumer(config)
+def handle_event(id, details_str):
+    details = json.loads(details_str)
 
-    def reset_offset(verifier_consumer, partitions):
-        if not args.reset:
-            return
+    print(f"[info] handling event {id}, " \
+          f"{details['source']}->{details['deliver_to']}: " \
+          f"{details['operation']}")
 
-        for p in partitions:
-            p.offset = OFFSET_BEGINNING
-        verifier_consumer.assign(partitions)
+    if check_operation(id, details):
+        return proceed_to_deliver(id, details)
 
-    topic = MODULE_NAME
-    consumer.subscribe([topic], on_assign=reset_offset)
+    report_unauthorized(id, details)
 
-    try:
-        while True:
-            msg = consumer.poll(1.0)
-            if msg is None:
-                pass
 
-            elif msg.error():
-                print(f"[error] {msg.error()}")
+def handle_batch(events):
+    """ Проверка пачки событий и передача разрешённых одной пачкой. """
+    batch = []
+    for id, details_str in events:
+        try:
+            details = json.loads(details_str)
+        except Exception as e:
+            print(f"[error] Malformed event received from " \
+                  f"topic {MODULE_NAME}: {details_str}, {e}")
+            continue
 
-            else:
-                id = msg.key().decode('utf-8')
-                details_str = msg.value().decode('utf-8')
-                handle_event(id, details_str)
+        if check_operation(id, details):
+            batch.append(details)
+        else:
+            report_unauthorized(id, details)
 
-                # except Exception as e:
-                #     print(f"[error] Malformed event received from " \
-                #           f"topic {topic}: {msg.value()}, {e}")
-    except KeyboardInterrupt:
-        pass
-    finally:
-        consumer.close()
+    if batch:
+        print(f"[info] routing batch of {len(batch)}/{len(events)} events")
+        proceed_to_deliver_batch(batch)
 
 
-def start_consumer(args, config):
+def start_consumer(args, config, settings):
     print(f'{MODULE_NAME}_consumer started')
-    threading.Thread(target=lambda: consumer_job(args, config)).start()
\ No newline at end of file
+
+    batched = settings.get('routing', DEFAULT_ROUTING) == 'batch'
+    ConsumerRuntime(args, config, MODULE_NAME, handle_event, settings,
+                    handle_batch=handle_batch if batched else None).start()
@@ -1,4 +1,7 @@
 # Политики безопасности
+#
+# Правило без ключа "operation" разрешает любые операции по маршруту
+# src -> dst, правило с ключом "operation" разрешает только эту операцию.
 policies = (
     {"src": "com-mobile", "dst": "profile-client"},
     {"src": "profile-client", "dst": "com-mobile"},
@@ -15,14 +18,50 @@ policies = (
 )
 
 
+# Маршрут разрешён для любых операций
+ANY_OPERATION = None
+
+
+def compile_policies(rules) -> dict:
+    """ Компиляция таблицы политик в индекс src -> {dst -> операции}.
+
+    Значение ANY_OPERATION означает, что маршрут разрешён целиком,
+    иначе хранится frozenset разрешённых операций.
+    """
+    index: dict = {}
+    for rule in rules:
+        routes = index.setdefault(rule["src"], {})
+        operation = rule.get("operation")
+        dst = rule["dst"]
+
+        if operation is None:
+            routes[dst] = ANY_OPERATION
+        elif dst not in routes or routes[dst] is not ANY_OPERATION:
+            routes[dst] = routes.get(dst, frozenset()) | {operation}
+
+    return index
+
+
+_EMPTY: dict = {}
+_DENIED = frozenset()
+_index: dict = compile_policies(policies)
+
+
+def is_allowed(index, src, dst, operation=None) -> bool:
+    """ Проверка маршрута по скомпилированному индексу за O(1). """
+    allowed = index.get(src, _EMPTY).get(dst, _DENIED)
+    if allowed is ANY_OPERATION:
+        return True
+
+    return operation in allowed
+
+
 def check_operation(id, details) -> bool:
     """ Проверка возможности совершения обращения. """
     src: str = details.get("source")
     dst: str = details.get("deliver_to")
 
-    if not all((src, dst)):
+    if not src or not dst:
         return False
 
-    print(f"[info] checking policies for event {id}, {src}->{dst}")
-
-    return {"src": src, "dst": dst} in policies
+    return is_allowed(_index, src, dst, details.get("operation"))
@@ -1,9 +1,7 @@
 import os
-import json
-import threading
 import multiprocessing
 
-from confluent_kafka import Producer
+from runtime.producer import start_producer as start_event_producer
 
 
 _requests_queue: multiprocessing.Queue = None
@@ -14,26 +12,8 @@ def proceed_to_deliver(id, details):
     _requests_queue.put(details)
 
 
-def producer_job(_, config, requests_queue: multiprocessing.Queue):
-    producer = Producer(config)
-
-    def delivery_callback(err, msg):
-        if err:
-            print('[error] Message failed delivery: {}'.format(err))
-
-    while True:
-        event_details = requests_queue.get()
-        print(event_details)
-        topic = event_details['deliver_to']
-        producer.produce(
-            topic,
-            json.dumps(event_details),
-            event_details['id'],
-            callback=delivery_callback
-        )
-
-        producer.poll(10000)
-        producer.flush()
+def proceed_to_deliver_batch(batch):
+    _requests_queue.put(batch)
 
 
 def start_producer(args, config, requests_queue):
@@ -42,6 +22,5 @@ def start_producer(args, config, requests_queue):
     global _requests_queue
 
     _requests_queue = requests_queue
-    threading.Thread(
-        target=lambda: producer_job(args, config, requests_queue)
-    ).start()
\ No newline at end of file
+    # Топик назначения берётся из поля deliver_to каждого события
+    start_event_producer(config, requests_queue)
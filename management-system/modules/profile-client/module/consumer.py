@@ -1,42 +1,17 @@
 import os
 import json
-import threading
-
-from sqlalchemy import create_engine, Column, Integer, String, Float
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 
 from uuid import uuid4
-from confluent_kafka import Consumer, OFFSET_BEGINNING
+from runtime.consumer import ConsumerRuntime, field_key
 
+from .db import (Client, find_client, find_client_by_car, find_client_by_selection,
+                 initialize_database, session_scope)
 from .producer import proceed_to_deliver
 
-DATABASE_URL = 'sqlite:///clients.db'
-engine = create_engine(DATABASE_URL, echo=True)
-Base = declarative_base()
-
 TARIFF = ["min", "hour"]
 MODULE_NAME: str = os.getenv("MODULE_NAME")
 
 
-# Модель для хранения поездок клиентов
-class Client(Base):
-    __tablename__ = 'clients'
-    id = Column(Integer, primary_key=True)
-    client_name = Column(String(100), nullable=False)
-    experience = Column(Integer, nullable=False)
-    car = Column(String(100))
-    prepayment = Column(Integer)
-    prepayment_status = Column(String(100))
-    tariff = Column(String(100))
-    elapsed_time = Column(Float)
-
-
-def initialize_database():
-    # Создаем таблицы в базе данных
-    Base.metadata.create_all(engine)
-
-
 def send_to_com_mobile(id, details):
     details["deliver_to"] = "com-mobile"
     proceed_to_deliver(id, details)
@@ -80,68 +55,73 @@ def counter_payment(trip_time, tariff, experience):
     return counter
 
 
-def select_car(session, data):
+def select_car(session, id, data):
+    """ Клиент выбрал марку. Конкретная машина известна только из ответа
+    со статусом, поэтому запоминается событие выбора. """
     name = data[0]
     experience = data[1]
     tariff = data[2]
     brand = data[3]
-    query = session.query(Client)
-    client = query.filter_by(client_name=name).one_or_none()
+    client = find_client(session, name)
     if client is None:
         client = Client(client_name=name, experience=experience)
         session.add(client)
-        session.commit()
-    client.car = brand
+    client.selection_id = id
     client.tariff = tariff
-    session.commit()
     return brand
 
 
-def prepayment(session, car):
-    amount = counter_prepayment(car)
-    query = session.query(Client)
-    brand = car['brand']
-    client = query.filter_by(car=brand).one_or_none()
-    if client:
-        client.prepayment = amount
-        name = client.client_name
-        session.commit()
-        return [name, amount]
-    else:
+def prepayment(session, id, car):
+    """ Статус выбранной машины: машина закрепляется за клиентом по её
+    идентификатору. Возвращает None, если машина уже у другого клиента. """
+    client = find_client_by_selection(session, id)
+    if client is None:
+        # Выбор сделан до появления selection_id: в car записана марка
+        client = find_client_by_car(session, car['brand'])
+    if client is None:
         return []
 
+    car_id = car.get('id') or car['brand']
+    holder = find_client_by_car(session, car_id)
+    if holder is not None and holder is not client:
+        # Машина закреплена за другим клиентом (индекс ix_clients_car)
+        print(f"[info] car {car_id} is held by another client, "
+              f"{client.client_name} refused")
+        client.selection_id = None
+        return None
+
+    client.car = car_id
+    client.selection_id = None
+    client.prepayment = counter_prepayment(car)
+    return [client.client_name, client.prepayment]
+
 
 def confirm_prepayment(session, name, status):
-    query = session.query(Client)
-    client = query.filter_by(client_name=name).one_or_none()
+    client = find_client(session, name)
     if client:
         client.prepayment_status = status
-        session.commit()
 
 
 def return_car(session, name, trip_time):
-    query = session.query(Client)
-    client = query.filter_by(client_name=name).one_or_none()
+    client = find_client(session, name)
     if client:
         client.elapsed_time = trip_time
         name = client.client_name
-        session.commit()
         amount = counter_payment(trip_time, client.tariff, client.experience)
         return [name, amount]
 
 
 def access(session, name):
-    query = session.query(Client)
-    client = query.filter_by(client_name=name).one_or_none()
+    client = find_client(session, name)
     if client:
         if client.prepayment_status == 'paid':
             print(f"Доступ разрешен {name} до {client.car}")
-            return {'access': True, 'tariff': client.tariff, 'car': client.car, 'name': name}
+            return {'access': True, 'tariff': client.tariff, 'car': client.car,
+                    'car_id': client.car, 'name': name}
 
 
 def final_receipt(session, receipt, name):
-    query = session.query(Client)
-    client = query.filter_by(client_name=name).one_or_none()
+    client = find_client(session, name)
     if client:
         final_amount = receipt['amount'] + client.prepayment
         created_at = receipt['created_at']
@@ -154,22 +134,20 @@ def final_receipt(session, receipt, name):
             'tarif': client.tariff,
 
         }
-        client.car = ''
+        client.car = None
         client.prepayment = ''
         client.prepayment_status = ''
         client.tariff = ''
         client.elapsed_time = 0
-        session.commit()
         return final_receipt
 
 
-def handle_event(id, details_str):
-    """ Обработчик входящих в модуль задач. """
-    Session = sessionmaker(bind=engine)
-    session = Session()
-
-    details = json.loads(details_str)
+def process_event(session, id, details):
+    """ Обработчик входящих в модуль задач.
 
+    Возвращает функцию отправки и событие, отправка выполняется только
+    после фиксации транзакции.
+    """
     source: str = details.get("source")
     deliver_to: str = details.get("deliver_to")
     data: str = details.get("data")
@@ -180,21 +158,27 @@ def handle_event(id, details_str):
 
     if operation == "get_tariff":
         details["data"] = TARIFF
-        return send_to_com_mobile(id, details)
+        return send_to_com_mobile, details
     elif operation == "get_cars":
-        return send_to_manage_drive(id, details)
+        return send_to_manage_drive, details
     elif operation == "answer_cars":
-        return send_to_com_mobile(id, details)
+        return send_to_com_mobile, details
     elif operation == "select_car":
-        details["data"] = select_car(session, data)
+        details["data"] = select_car(session, id, data)
         details["operation"] = "get_status"
-        return send_to_manage_drive(id, details)
+        return send_to_manage_drive, details
     elif operation == "answer_status":
-        details["data"] = prepayment(session, data)
+        result = prepayment(session, id, data)
+        if result is None:
+            details["data"] = {"access": False, "reason": "car_taken",
+                               "car": data.get("id") or data.get("brand")}
+            details["operation"] = "select_refused"
+            return send_to_com_mobile, details
+        details["data"] = result
         details["operation"] = "get_prepayment_id"
-        return send_to_bank_pay(id, details)
+        return send_to_bank_pay, details
     elif operation == "get_prepayment_id":
-        return send_to_com_mobile(id, details)
+        return send_to_com_mobile, details
     elif operation == "confirm_prepayment":
         name = details.get("name")
         status = details.get("status")
@@ -202,56 +186,61 @@ def handle_event(id, details_str):
     elif operation == "access":
         details["access"] = access(session, details["name"])
         details["operation"] = "confirm_access"
-        return send_to_manage_drive(id, details)
+        return send_to_manage_drive, details
     elif operation == "return":
         details["data"] = return_car(session, details["name"], details["trip_time"])
         details["operation"] = "get_payment_id"
-        return send_to_bank_pay(id, details)
+        return send_to_bank_pay, details
     elif operation == "get_payment_id":
-        return send_to_com_mobile(id, details)
+        return send_to_com_mobile, details
     elif operation == "confirm_payment":
         details["data"] = final_receipt(session, details["receipt"], details["name"])
         details["operation"] = "final_receipt"
-        return send_to_com_mobile(id, details)
+        return send_to_com_mobile, details
 
 
-def consumer_job(args, config):
-    consumer = Consumer(config)
+def process_batch(events):
+    """ Обработка событий пачки в одной транзакции. """
+    outgoing = []
+    with session_scope() as session:
+        for id, details_str in events:
+            details = json.loads(details_str)
+            result = process_event(session, id, details)
+            if result:
+                outgoing.append((id,) + result)
 
-    def reset_offset(verifier_consumer, partitions):
-        if not args.reset:
-            return
+    for id, send, details in outgoing:
+        send(id, details)
 
-        for p in partitions:
-            p.offset = OFFSET_BEGINNING
-        verifier_consumer.assign(partitions)
-
-    topic = MODULE_NAME
-    consumer.subscribe([topic], on_assign=reset_offset)
 
+def handle_batch(events):
+    """ События пачки фиксируются одной транзакцией. Если пачка не
+    прошла, события повторяются по одному, чтобы ошибка одного события
+    не отменила остальные. """
     try:
-        while True:
-            msg = consumer.poll(1.0)
-            if msg is None:
-                pass
-            elif msg.error():
-                print(f"[error] {msg.error()}")
-            else:
-                try:
-                    id = msg.key().decode('utf-8')
-                    details_str = msg.value().decode('utf-8')
-                    handle_event(id, details_str)
-                except Exception as e:
-                    print(f"[error] Malformed event received from " \
-                          f"topic {topic}: {msg.value()}. {e}")
-    except KeyboardInterrupt:
-        pass
-
-    finally:
-        consumer.close()
-
-
-def start_consumer(args, config):
-    initialize_database()
+        return process_batch(events)
+    except Exception as e:
+        if len(events) == 1:
+            raise
+        print(f"[error] batch of {len(events)} events failed, "
+              f"retrying one by one. {e}")
+
+    for event in events:
+        try:
+            process_batch([event])
+        except Exception as e:
+            print(f"[error] Malformed event received from "
+                  f"topic {MODULE_NAME}: {event[1]}. {e}")
+
+
+def handle_event(id, details_str):
+    return process_batch([(id, details_str)])
+
+
+def start_consumer(args, config, settings):
+    initialize_database(echo=settings.get("sql.echo") == "true")
     print(f'{MODULE_NAME}_consumer started')
-    threading.Thread(target=lambda: consumer_job(args, config)).start()
\ No newline at end of file
+    ConsumerRuntime(args, config, MODULE_NAME, handle_event, settings,
+                    handle_batch=handle_batch,
+                    key=field_key("name")).start()
+
@@ -0,0 +1,139 @@
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, Column, Integer, String, Float, Index, text
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
+
+
+DATABASE_URL = 'sqlite:///clients.db'
+engine = create_engine(DATABASE_URL, echo=False)
+Base = declarative_base()
+
+# Одна фабрика сессий на модуль, у каждого потока-обработчика своя сессия
+Session = scoped_session(sessionmaker(bind=engine))
+
+
+# Модель для хранения поездок клиентов
+class Client(Base):
+    __tablename__ = 'clients'
+    id = Column(Integer, primary_key=True)
+    client_name = Column(String(100), nullable=False)
+    experience = Column(Integer, nullable=False)
+    car = Column(String(100))
+    # Событие выбора машины, ответ со статусом машины приходит с тем же id
+    selection_id = Column(String(100))
+    prepayment = Column(Integer)
+    prepayment_status = Column(String(100))
+    tariff = Column(String(100))
+    elapsed_time = Column(Float)
+
+    # Клиент ищется по имени; car - идентификатор машины, машина
+    # закреплена не больше чем за одним клиентом (у клиентов без машины
+    # car IS NULL)
+    __table_args__ = (
+        Index('ix_clients_client_name', 'client_name', unique=True),
+        Index('ix_clients_car', 'car', unique=True,
+              sqlite_where=text('car IS NOT NULL')),
+        Index('ix_clients_selection_id', 'selection_id'),
+    )
+
+
+class DuplicateClientsError(RuntimeError):
+    """ В базе несколько записей одного клиента или одной машины. """
+
+
+def find_duplicates(connection, column) -> dict:
+    """ Значение столбца -> id всех записей с этим значением. """
+    rows = connection.exec_driver_sql(
+        f"SELECT {column}, GROUP_CONCAT(id) FROM clients "
+        f"WHERE {column} IS NOT NULL GROUP BY {column} HAVING COUNT(*) > 1").all()
+    return {value: [int(id) for id in ids.split(',')] for value, ids in rows}
+
+
+def migrate_client_keys(connection):
+    """ Уникальные индексы по имени клиента и текущей машине.
+
+    Дубликаты не удаляются: какая из записей верна, решает оператор.
+    Миграция прерывается с отчётом, версия схемы не меняется.
+    """
+    # Машина возвращённого автомобиля раньше сбрасывалась в пустую строку
+    connection.exec_driver_sql("UPDATE clients SET car = NULL WHERE car = ''")
+
+    report = [f"client {name!r}: records {ids}"
+              for name, ids in find_duplicates(connection, "client_name").items()]
+    report += [f"car {car!r}: held by records {ids}"
+               for car, ids in find_duplicates(connection, "car").items()]
+    if report:
+        for line in report:
+            print(f"[error] duplicate {line}")
+        raise DuplicateClientsError(
+            f"{len(report)} duplicate clients/cars, resolve them before migrating")
+
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_clients_client_name "
+        "ON clients (client_name)")
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_clients_car "
+        "ON clients (car) WHERE car IS NOT NULL")
+
+
+def add_selection_id(connection):
+    """ Событие выбора машины: клиент находится по нему, когда приходит
+    статус выбранной машины. """
+    columns = [row[1] for row in connection.exec_driver_sql("PRAGMA table_info(clients)")]
+    if "selection_id" not in columns:
+        connection.exec_driver_sql("ALTER TABLE clients ADD COLUMN selection_id VARCHAR(100)")
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_clients_selection_id ON clients (selection_id)")
+
+
+# Миграции схемы по порядку, номер версии хранится в PRAGMA user_version
+MIGRATIONS = (
+    migrate_client_keys,
+    add_selection_id,
+)
+
+
+def migrate(connection):
+    version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        print(f"[info] migrating clients database to version {number}")
+        migration(connection)
+        connection.exec_driver_sql(f"PRAGMA user_version = {number}")
+
+
+def initialize_database(echo=False):
+    # Создаем таблицы в базе данных
+    engine.echo = echo
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        migrate(connection)
+
+
+def find_client(session, name):
+    """ Клиент по имени (индекс ix_clients_client_name). """
+    return session.query(Client).filter(Client.client_name == name).one_or_none()
+
+
+def find_client_by_selection(session, selection_id):
+    """ Клиент, ожидающий статус выбранной машины (индекс ix_clients_selection_id). """
+    return session.query(Client).filter(Client.selection_id == selection_id).first()
+
+
+def find_client_by_car(session, car):
+    """ Клиент, за которым сейчас закреплена машина (индекс ix_clients_car). """
+    return session.query(Client).filter(Client.car == car).one_or_none()
+
+
+@contextmanager
+def session_scope():
+    """ Одна транзакция: commit при успехе, rollback при ошибке,
+    сессия закрывается в любом случае. """
+    session = Session()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        Session.remove()
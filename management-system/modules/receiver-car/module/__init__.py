@@ -1,10 +1,16 @@
 import os
+import sys
 
 from argparse import ArgumentParser, FileType
 from configparser import ConfigParser
 from multiprocessing import Queue
 
-from .api import start_web
+# Общие компоненты модулей (каталог shared смонтирован в /shared)
+sys.path.append(os.getenv('SHARED_PATH', '/shared'))
+
+from runtime.consumer import runtime_settings
+
+from .api import REQUESTS_QUEUE_SIZE, start_web
 from .consumer import start_consumer
 from .producer import start_producer
 
@@ -25,12 +31,19 @@ def main():
     config = dict(config_parser['default'])
     config.update(config_parser[MODULE_NAME])
 
-    requests_queue = Queue()
+    producer_config = dict(config)
+    if config_parser.has_section('producer'):
+        producer_config.update(config_parser['producer'])
+
+    settings = runtime_settings(config_parser, MODULE_NAME)
+
+    # Очередь к продюсеру ограничена: приём телеметрии ждёт, а не копит пачки
+    requests_queue = Queue(int(settings.get('queue.size', REQUESTS_QUEUE_SIZE)))
     response_queue = Queue()
 
+    print(f'Running {MODULE_NAME}_producer...')
+    producer = start_producer(args, producer_config, requests_queue)
     print(f'Running {MODULE_NAME}_web...')
-    start_web(requests_queue, response_queue)
+    start_web(requests_queue, response_queue, producer.stats)
     print(f'Running {MODULE_NAME}_consumer...')
-    start_consumer(args, config, response_queue)
-    print(f'Running {MODULE_NAME}_producer...')
-    start_producer(args, config, requests_queue)
\ No newline at end of file
+    start_consumer(args, config, response_queue, settings)
\ No newline at end of file
@@ -5,19 +5,41 @@ import threading
 import multiprocessing
 
 from uuid import uuid4
+from zlib import crc32
 from flask import Flask, request, jsonify, abort
 from werkzeug.exceptions import HTTPException
 
+from runtime.producer import ProducerStats
+
 
 # Константы
 HOST: str = "0.0.0.0"
 PORT: int = int(os.getenv("MODULE_PORT"))
 MODULE_NAME: str = os.getenv("MODULE_NAME")
+# Идентификатор исходного события, переданный машинами в ответе
+CORRELATION_HEADER: str = "X-Correlation-Id"
+# Число пачек, по которым раскладываются образцы телеметрии: образцы одной
+# машины всегда попадают в одну пачку и обрабатываются по порядку
+TELEMETRY_SHARDS: int = int(os.getenv("TELEMETRY_SHARDS", 16))
+NDJSON_MIMETYPE: str = "application/x-ndjson"
+# Потоковый приём: образцов в одной пачке и верхняя граница событий,
+# отправленных в Kafka и ещё не подтверждённых, выше которой чтение потока
+# приостанавливается
+STREAM_BATCH_SIZE: int = 1000
+STREAM_HIGH_WATER: int = int(os.getenv("TELEMETRY_HIGH_WATER", 2000))
+STREAM_PAUSE: float = 0.05
+# Ёмкость очереди к продюсеру: когда она заполнена, put ждёт продюсер
+REQUESTS_QUEUE_SIZE: int = 256
+# Поля компактного образца после [id, brand, trip_time, speed, x, y]
+STREAM_SAMPLE_FIELDS: tuple = ("occupied_by", "has_air_conditioner", "has_heater",
+                               "has_navigator", "tariff")
 
 
 # Очереди задач и ответов
 _requests_queue: multiprocessing.Queue = None
 _response_queue: multiprocessing.Queue = None
+# Счётчики продюсера: по ним видно отставание Kafka
+_producer_stats: ProducerStats = None
 
 
 app = Flask(__name__)
@@ -29,7 +51,7 @@ def send_to_control_drive(details):
 
     details["deliver_to"] = "control-drive"
     details["source"] = MODULE_NAME
-    details["id"] = uuid4().__str__()
+    details["id"] = request.headers.get(CORRELATION_HEADER) or uuid4().__str__()
 
     try:
         _requests_queue.put(details)
@@ -43,13 +65,134 @@ def send_to_control_drive(details):
 @app.route('/telemetry/<string:brand>', methods=['POST'])
 def telemetry(brand):
     data = request.json['status']
+    # Команды и порядок событий привязаны к идентификатору машины
     details_to_send = {"data": data,
                        "operation": "telemetry",
-                       "car": brand}
+                       "car": data.get("id") or brand}
     send_to_control_drive(details_to_send)
     return jsonify("ok")
 
 
+def telemetry_shard(brand) -> str:
+    return f"telemetry-{crc32(brand.encode('utf-8')) % TELEMETRY_SHARDS}"
+
+
+def read_samples():
+    """ Образцы телеметрии из тела запроса: JSON-массив или NDJSON. """
+    if request.mimetype == NDJSON_MIMETYPE:
+        return [json.loads(line) for line in request.stream if line.strip()]
+
+    samples = request.get_json(silent=True)
+    if not isinstance(samples, list):
+        abort(400)
+    return samples
+
+
+def send_telemetry_batch(samples):
+    """ Раскладывает образцы по пачкам и отправляет их одной вставкой. """
+    shards = {}
+    for status in samples:
+        brand = status.get("brand") if isinstance(status, dict) else None
+        if not brand:
+            abort(400)
+        shards.setdefault(telemetry_shard(brand), []).append(status)
+
+    batch = [{"data": data,
+              "operation": "telemetry_batch",
+              "car": shard,
+              "deliver_to": "control-drive",
+              "source": MODULE_NAME,
+              "id": uuid4().__str__()}
+             for shard, data in shards.items()]
+
+    try:
+        _requests_queue.put(batch)
+    except Exception as e:
+        print("[RECEIVER_CAR_DEBUG] malformed request", e)
+        abort(400)
+    return len(batch)
+
+
+# Пакетный приём телеметрии многих машин одним запросом
+@app.route('/telemetry', methods=['POST'])
+def telemetry_bulk():
+    try:
+        samples = read_samples()
+    except ValueError:
+        abort(400)
+
+    events = send_telemetry_batch(samples)
+    return jsonify({"samples": len(samples), "events": events})
+
+
+STREAM_READ_SIZE: int = 64 * 1024
+
+
+def iter_lines(stream):
+    """ Строки потока, прочитанного блоками: построчное чтение chunked-тела
+    в werkzeug идёт по одному байту. """
+    rest = b""
+    while True:
+        block = stream.read(STREAM_READ_SIZE)
+        if not block:
+            break
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+
+def expand_sample(sample) -> dict:
+    """ Компактный образец [id, brand, trip_time, speed, x, y, occupied_by,
+    has_air_conditioner, has_heater, has_navigator, tariff] в статус с теми
+    же полями, что и у Car.get_status. Образцы прежнего формата из шести
+    полей принимаются без остальных полей статуса. """
+    id, brand, trip_time, speed, x, y, *rest = sample
+    status = {"id": id,
+              "brand": brand,
+              "is_running": True,
+              "speed": speed,
+              "coordinates": [x, y],
+              "trip_time": trip_time}
+    status.update(zip(STREAM_SAMPLE_FIELDS, rest))
+    return status
+
+
+def wait_for_producer():
+    """ Ждёт, пока Kafka подтвердит отправленное. Продюсер сразу передаёт
+    пачки в librdkafka, поэтому отставание брокера видно по числу
+    неподтверждённых событий, а не по очереди модуля. Пока поток не
+    читается, TCP-окно заполняется и отправитель сам притормаживает. """
+    while _producer_stats.snapshot()["in_flight"] > STREAM_HIGH_WATER:
+        time.sleep(STREAM_PAUSE)
+
+
+# Долгоживущий поток телеметрии (chunked NDJSON): строка - компактный
+# образец, пустая строка - конец такта, накопленное отправляется пачкой
+@app.route('/telemetry/stream', methods=['POST'])
+def telemetry_stream():
+    received = 0
+    samples = []
+    try:
+        for line in iter_lines(request.stream):
+            line = line.strip()
+            if line:
+                samples.append(expand_sample(json.loads(line)))
+            if samples and (not line or len(samples) >= STREAM_BATCH_SIZE):
+                wait_for_producer()
+                send_telemetry_batch(samples)
+                received += len(samples)
+                samples = []
+    except (ValueError, TypeError):
+        abort(400)
+
+    if samples:
+        send_telemetry_batch(samples)
+        received += len(samples)
+    return jsonify({"samples": received})
+
+
 @app.route('/car/status/all', methods=['POST'])
 def cars():
     data = request.json
@@ -101,12 +244,14 @@ def handle_exception(e):
     }), e.code
 
 
-def start_web(requests_queue, response_queue):
+def start_web(requests_queue, response_queue, producer_stats):
     global _requests_queue
     global _response_queue
+    global _producer_stats
 
     _requests_queue = requests_queue
     _response_queue = response_queue
+    _producer_stats = producer_stats
 
     threading.Thread(target=lambda: app.run(
         host=HOST, port=PORT, debug=True, use_reloader=False
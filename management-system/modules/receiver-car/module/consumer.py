@@ -1,9 +1,8 @@
 import os
 import json
-import threading
 import multiprocessing
 
-from confluent_kafka import Consumer, OFFSET_BEGINNING
+from runtime.consumer import ConsumerRuntime, field_key
 
 from .producer import proceed_to_deliver
 
@@ -26,50 +25,10 @@ def handle_event(id, details_str):
           f"{source}->{deliver_to}: {operation}")
 
 
-def consumer_job(args, config):
-    consumer = Consumer(config)
-
-    def reset_offset(verifier_consumer, partitions):
-        if not args.reset:
-            return
-
-        for p in partitions:
-            p.offset = OFFSET_BEGINNING
-        verifier_consumer.assign(partitions)
-
-    topic = MODULE_NAME
-    consumer.subscribe([topic], on_assign=reset_offset)
-
-    try:
-        while True:
-            msg = consumer.poll(1.0)
-
-            if msg is None:
-                pass
-
-            elif msg.error():
-                print(f"[error] {msg.error()}")
-
-            else:
-                try:
-                    id = msg.key().decode('utf-8')
-                    details_str = msg.value().decode('utf-8')
-                    handle_event(id, details_str)
-                except Exception as e:
-                    print(f"[error] Malformed event received from " \
-                          f"topic {topic}: {msg.value()}. {e}")
-
-    except KeyboardInterrupt:
-        pass
-
-    finally:
-        consumer.close()
-
-
-def start_consumer(args, config, response_queue):
+def start_consumer(args, config, response_queue, settings):
     global _response_queue
     _response_queue = response_queue
 
     print(f'{MODULE_NAME}_consumer started')
-
-    threading.Thread(target=lambda: consumer_job(args, config)).start()
\ No newline at end of file
+    ConsumerRuntime(args, config, MODULE_NAME, handle_event, settings,
+                    key=field_key("car")).start()
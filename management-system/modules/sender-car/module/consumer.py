@@ -1,39 +1,53 @@
 import os
 import json
-import threading
-import requests
 
 from uuid import uuid4
-from confluent_kafka import Consumer, OFFSET_BEGINNING
+from runtime.consumer import ConsumerRuntime, field_key
+from runtime.http_client import client as http_client
 
+from .dispatcher import (CommandDispatcher, DEDUPE_WINDOW, DISPATCH_QUEUE,
+                         DISPATCH_WORKERS, PRIORITY_WORKERS)
 from .producer import proceed_to_deliver
 
 CARS_URL = 'http://cars:8000'
+# Идентификатор события передаётся машинам, чтобы ответ через receiver-car
+# пришёл с тем же id, что и исходный запрос
+CORRELATION_HEADER = 'X-Correlation-Id'
 
 MODULE_NAME: str = os.getenv("MODULE_NAME")
 
+# Пул отправки команд создаётся при старте консьюмера
+_dispatcher: CommandDispatcher = None
 
-def get_cars():
-    requests.get(f'{CARS_URL}/car/status/all')
+
+def get_cars(id):
+    http_client.get(f'{CARS_URL}/car/status/all',
+                    headers={CORRELATION_HEADER: id})
     return None
 
 
 def confirm_access(access):
     name = access["name"]
-    requests.post(f'{CARS_URL}/access/{name}', json=access)
+    http_client.post(f'{CARS_URL}/access/{name}', json=access)
     return None
 
 
-def get_status_car(car):
-    requests.get(f'{CARS_URL}/car/status/{car}')
+def get_status_car(id, car):
+    http_client.get(f'{CARS_URL}/car/status/{car}',
+                    headers={CORRELATION_HEADER: id})
     return None
 
 
 def stop_car(car):
-    requests.get(f'{CARS_URL}/emergency/{car}')
+    http_client.post(f'{CARS_URL}/emergency/{car}')
     return None
 
 
+def dispatch(key, function, *args, priority=False):
+    if not _dispatcher.submit(key, function, *args, priority=priority):
+        print(f"[info] duplicate command {key} merged")
+
+
 def handle_event(id, details_str):
     """ Обработчик входящих в модуль задач. """
     details = json.loads(details_str)
@@ -46,50 +60,30 @@ def handle_event(id, details_str):
     print(f"[info] handling event {id}, "
           f"{source}->{deliver_to}: {operation}")
 
+    # Ответы машин приходят с id запроса, поэтому запросы объединяются
+    # только при повторной доставке того же события; остановки одной
+    # машины объединяются в окне и идут приоритетной полосой
     if operation == "get_cars":
-        return get_cars()
+        return dispatch(("event", id), get_cars, id)
     if operation == "get_status":
-        return get_status_car(data)
+        return dispatch(("event", id), get_status_car, id, data)
     if operation == "confirm_access":
-        return confirm_access(details["access"])
+        return dispatch(("event", id), confirm_access, details["access"])
     if operation == "stop":
-        return stop_car(details["car"])
-
-def consumer_job(args, config):
-    consumer = Consumer(config)
-
-    def reset_offset(verifier_consumer, partitions):
-        if not args.reset:
-            return
-
-        for p in partitions:
-            p.offset = OFFSET_BEGINNING
-        verifier_consumer.assign(partitions)
-
-    topic = MODULE_NAME
-    consumer.subscribe([topic], on_assign=reset_offset)
-
-    try:
-        while True:
-            msg = consumer.poll(1.0)
-            if msg is None:
-                pass
-            elif msg.error():
-                print(f"[error] {msg.error()}")
-            else:
-                try:
-                    id = msg.key().decode('utf-8')
-                    details_str = msg.value().decode('utf-8')
-                    handle_event(id, details_str)
-                except Exception as e:
-                    print(f"[error] Malformed event received from " \
-                          f"topic {topic}: {msg.value()}. {e}")
-    except KeyboardInterrupt:
-        pass
-
-    finally:
-        consumer.close()
-
-def start_consumer(args, config):
+        return dispatch(("stop", details["car"]), stop_car, details["car"],
+                        priority=True)
+
+
+def start_consumer(args, config, settings):
     print(f'{MODULE_NAME}_consumer started')
-    threading.Thread(target=lambda: consumer_job(args, config)).start()
\ No newline at end of file
+
+    global _dispatcher
+    _dispatcher = CommandDispatcher(
+        workers=int(settings.get("dispatch.workers", DISPATCH_WORKERS)),
+        priority_workers=int(settings.get("dispatch.priority.workers", PRIORITY_WORKERS)),
+        queue_size=int(settings.get("dispatch.queue", DISPATCH_QUEUE)),
+        window=float(settings.get("dedupe.window", DEDUPE_WINDOW)),
+    )
+
+    ConsumerRuntime(args, config, MODULE_NAME, handle_event, settings,
+                    key=field_key("car")).start()
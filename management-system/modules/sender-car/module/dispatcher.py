@@ -0,0 +1,77 @@
+import time
+import queue
+import threading
+
+
+# Значения по умолчанию, переопределяются в секции [sender-car.runtime]
+DISPATCH_WORKERS: int = 8
+PRIORITY_WORKERS: int = 2
+DISPATCH_QUEUE: int = 1000
+# Окно объединения одинаковых команд, секунды
+DEDUPE_WINDOW: float = 2.0
+
+
+class CommandDispatcher:
+    """ Асинхронная отправка команд машинам.
+
+    Команды выполняет пул из workers потоков, очередь ограничена
+    queue_size: когда она заполнена, submit блокирует обработчик событий и
+    консьюмер перестаёт забирать новые. Экстренные остановки идут отдельной
+    полосой со своими потоками и не ждут медленных запросов основной очереди.
+
+    Команды с одинаковым ключом объединяются в одну, пока предыдущая не
+    выполнена или с её постановки прошло меньше window секунд.
+    """
+
+    def __init__(self, workers=DISPATCH_WORKERS, priority_workers=PRIORITY_WORKERS,
+                 queue_size=DISPATCH_QUEUE, window=DEDUPE_WINDOW):
+        self.window = window
+        self.merged = 0
+        self._lock = threading.Lock()
+        self._submitted: dict = {}
+        self._pending: set = set()
+        self._swept_at = time.monotonic()
+
+        self._lanes = {False: queue.Queue(queue_size), True: queue.Queue(queue_size)}
+        for priority, count in ((False, workers), (True, priority_workers)):
+            for _ in range(count):
+                threading.Thread(target=self._job, args=(self._lanes[priority],),
+                                 daemon=True).start()
+
+    def _claim(self, key, now) -> bool:
+        with self._lock:
+            if now - self._swept_at >= self.window:
+                self._submitted = {k: t for k, t in self._submitted.items()
+                                   if now - t < self.window}
+                self._swept_at = now
+
+            submitted = self._submitted.get(key)
+            if key in self._pending or (submitted is not None and
+                                        now - submitted < self.window):
+                self.merged += 1
+                return False
+
+            self._submitted[key] = now
+            self._pending.add(key)
+            return True
+
+    def submit(self, key, function, *args, priority=False) -> bool:
+        """ Ставит команду в очередь. Возвращает False, если команда
+        объединена с уже поставленной (key=None - без объединения). """
+        if key is not None and not self._claim(key, time.monotonic()):
+            return False
+
+        self._lanes[priority].put((key, function, args))
+        return True
+
+    def _job(self, lane):
+        while True:
+            key, function, args = lane.get()
+            try:
+                function(*args)
+            except Exception as e:
+                print(f"[error] command {function.__name__}{args} failed. {e}")
+            finally:
+                if key is not None:
+                    with self._lock:
+                        self._pending.discard(key)
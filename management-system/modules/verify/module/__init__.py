@@ -1,9 +1,15 @@
 import os
+import sys
 
 from argparse import ArgumentParser, FileType
 from configparser import ConfigParser
 from multiprocessing import Queue
 
+# Общие компоненты модулей (каталог shared смонтирован в /shared)
+sys.path.append(os.getenv("SHARED_PATH", "/shared"))
+
+from runtime.consumer import runtime_settings
+
 from .consumer import start_consumer
 from .producer import start_producer
 
@@ -24,8 +30,14 @@ def main():
     config = dict(config_parser["default"])
     config.update(config_parser[MODULE_NAME])
 
+    producer_config = dict(config)
+    if config_parser.has_section("producer"):
+        producer_config.update(config_parser["producer"])
+
+    settings = runtime_settings(config_parser, MODULE_NAME)
+
     requests_queue = Queue()
-    print(f"Running {MODULE_NAME}_consumer...")
-    start_consumer(args, config)
     print(f"Running {MODULE_NAME}_producer...")
-    start_producer(args, config, requests_queue)
\ No newline at end of file
+    start_producer(args, producer_config, requests_queue)
+    print(f"Running {MODULE_NAME}_consumer...")
+    start_consumer(args, config, settings)
\ No newline at end of file
@@ -0,0 +1,6 @@
+""" Общие компоненты модулей системы управления.
+
+Каталог shared монтируется в контейнеры модулей как /shared, модули
+подключают его через sys.path и импортируют нужные подмодули явно,
+чтобы не тянуть лишние зависимости (например, confluent_kafka).
+"""
@@ -0,0 +1,289 @@
+import json
+import queue
+import threading
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from zlib import crc32
+
+from confluent_kafka import Consumer, TopicPartition, OFFSET_BEGINNING
+
+
+# Значения по умолчанию, секции [runtime] и [<модуль>.runtime] в config.ini
+# их переопределяют
+DEFAULT_POOL: str = "thread"
+DEFAULT_WORKERS: int = 4
+DEFAULT_BATCH_SIZE: int = 100
+DEFAULT_LINGER_MS: int = 100
+# Сколько событий на одного обработчика может ждать обработки
+IN_FLIGHT_PER_WORKER: int = 1000
+
+
+def field_key(*fields):
+    """ Ключ упорядочивания по первому непустому полю события.
+
+    События без этих полей упорядочиваются по ключу сообщения Kafka.
+    """
+    def key(id, details_str):
+        details = json.loads(details_str)
+        for field in fields:
+            value = details.get(field)
+            if value:
+                return str(value)
+        return id
+
+    return key
+
+
+def message_key(id, details_str):
+    return id
+
+
+def handle_each(handle_event, events, topic=None):
+    """ Обработка пачки по одному событию, как в прежнем consumer_job. """
+    for id, details_str in events:
+        try:
+            handle_event(id, details_str)
+        except Exception as e:
+            print(f"[error] Malformed event received from "
+                  f"topic {topic}: {details_str}. {e}")
+
+
+class OffsetTracker:
+    """ Учёт обрабатываемых смещений по разделам.
+
+    Смещение раздела можно зафиксировать, только когда обработаны все
+    предшествующие ему события (непрерывный префикс).
+
+    Каждое назначение раздела получает своё поколение: add возвращает его,
+    done принимает его обратно. Завершения событий, прочитанных до отзыва
+    раздела, игнорируются, даже если раздел уже назначен снова.
+    """
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._generations = {}
+        self._pending = {}
+        self._done = {}
+        self._committable = {}
+        self.in_flight = 0
+
+    def add(self, topic, partition, offset) -> int:
+        with self._lock:
+            tp = (topic, partition)
+            self._pending.setdefault(tp, deque()).append(offset)
+            self._done.setdefault(tp, set())
+            self.in_flight += 1
+            return self._generations.get(tp, 0)
+
+    def done(self, topic, partition, offset, generation):
+        with self._lock:
+            tp = (topic, partition)
+            pending = self._pending.get(tp)
+            if pending is None or generation != self._generations.get(tp, 0):
+                # Раздел отозван, пока событие обрабатывалось
+                return
+
+            done = self._done[tp]
+            done.add(offset)
+            while pending and pending[0] in done:
+                done.discard(pending[0])
+                self._committable[tp] = pending.popleft() + 1
+
+            self.in_flight -= 1
+            self._lock.notify_all()
+
+    def drain(self) -> dict:
+        """ Возвращает смещения, готовые к фиксации, и очищает их. """
+        with self._lock:
+            committable, self._committable = self._committable, {}
+            return committable
+
+    def forget(self, partitions):
+        with self._lock:
+            for topic, partition in partitions:
+                tp = (topic, partition)
+                self._generations[tp] = self._generations.get(tp, 0) + 1
+                pending = self._pending.pop((topic, partition), ())
+                done = self._done.pop((topic, partition), ())
+                self._committable.pop((topic, partition), None)
+                self.in_flight -= len(pending) - len(done)
+            self._lock.notify_all()
+
+    def wait_below(self, limit, timeout):
+        with self._lock:
+            if self.in_flight >= limit:
+                self._lock.wait(timeout)
+            return self.in_flight < limit
+
+
+class Lane:
+    """ Последовательный обработчик: события одного ключа идут по порядку. """
+
+    def __init__(self, runtime):
+        self._runtime = runtime
+        self._tasks = queue.Queue()
+        threading.Thread(target=self._job, daemon=True).start()
+
+    def submit(self, events):
+        self._tasks.put(events)
+
+    def _job(self):
+        while True:
+            events = self._tasks.get()
+            try:
+                self._runtime.process(events)
+            finally:
+                for topic, partition, offset, generation, _, _ in events:
+                    self._runtime.tracker.done(topic, partition, offset,
+                                               generation)
+
+
+class ConsumerRuntime:
+    """ Чтение топика модуля в одном потоке и обработка пулом.
+
+    События распределяются по обработчикам (lane) по хэшу ключа, поэтому
+    события одного ключа (машины, клиента) выполняются по порядку, а разных
+    ключей — параллельно. Обработчики работают в потоках (pool=thread) или
+    передают работу в пул процессов (pool=process, обработчики должны
+    быть функциями уровня модуля).
+
+    Смещения сохраняются (enable.auto.offset.store=false) только для
+    непрерывного префикса обработанных событий и фиксируются автокоммитом.
+    """
+
+    def __init__(self, args, config, topic, handle_event, settings=None,
+                 handle_batch=None, key=message_key):
+        settings = settings or {}
+        self.topic = topic
+        self.handle_event = handle_event
+        self.handle_batch = handle_batch
+        self.key = key
+        self.tracker = OffsetTracker()
+
+        self.workers = int(settings.get("workers", DEFAULT_WORKERS))
+        self.batch_size = int(settings.get("batch.size", DEFAULT_BATCH_SIZE))
+        self.linger = int(settings.get("linger.ms", DEFAULT_LINGER_MS)) / 1000
+        self.max_in_flight = self.workers * IN_FLIGHT_PER_WORKER
+
+        self._executor = None
+        if settings.get("pool", DEFAULT_POOL) == "process":
+            self._executor = ProcessPoolExecutor(self.workers)
+
+        self._args = args
+        self._config = dict(config)
+        self._config["enable.auto.offset.store"] = "false"
+        self._lanes = [Lane(self) for _ in range(self.workers)]
+
+    def process(self, events):
+        batch = [(id, details_str) for *_, id, details_str in events]
+        try:
+            if self.handle_batch is None:
+                self._call(handle_each, self.handle_event, batch, self.topic)
+            else:
+                self._call(self.handle_batch, batch)
+        except Exception as e:
+            print(f"[error] Failed to handle batch of {len(batch)} "
+                  f"events from topic {self.topic}. {e}")
+
+    def _call(self, function, *args):
+        if self._executor is None:
+            return function(*args)
+        return self._executor.submit(function, *args).result()
+
+    def _lane_for(self, key):
+        if self.workers == 1:
+            return self._lanes[0]
+        return self._lanes[crc32(key.encode("utf-8")) % self.workers]
+
+    def dispatch(self, messages):
+        """ Раскладывает пачку сообщений по обработчикам. """
+        batches = {}
+        for msg in messages:
+            if msg.error():
+                print(f"[error] {msg.error()}")
+                continue
+
+            try:
+                id = msg.key().decode("utf-8")
+                details_str = msg.value().decode("utf-8")
+                lane = self._lane_for(self.key(id, details_str))
+            except Exception as e:
+                print(f"[error] Malformed event received from "
+                      f"topic {self.topic}: {msg.value()}. {e}")
+                self._skip(msg)
+                continue
+
+            generation = self.tracker.add(msg.topic(), msg.partition(),
+                                          msg.offset())
+            batches.setdefault(lane, []).append((
+                msg.topic(), msg.partition(), msg.offset(), generation,
+                id, details_str
+            ))
+
+        for lane, events in batches.items():
+            lane.submit(events)
+
+    def _skip(self, msg):
+        generation = self.tracker.add(msg.topic(), msg.partition(),
+                                      msg.offset())
+        self.tracker.done(msg.topic(), msg.partition(), msg.offset(),
+                          generation)
+
+    def _store_offsets(self, consumer):
+        committable = self.tracker.drain()
+        if not committable:
+            return
+
+        consumer.store_offsets(offsets=[
+            TopicPartition(topic, partition, offset)
+            for (topic, partition), offset in committable.items()
+        ])
+
+    def run(self):
+        consumer = Consumer(self._config)
+
+        def reset_offset(verifier_consumer, partitions):
+            if not self._args.reset:
+                return
+
+            for p in partitions:
+                p.offset = OFFSET_BEGINNING
+            verifier_consumer.assign(partitions)
+
+        def revoke(revoked_consumer, partitions):
+            self._store_offsets(revoked_consumer)
+            self.tracker.forget((p.topic, p.partition) for p in partitions)
+
+        consumer.subscribe([self.topic], on_assign=reset_offset,
+                           on_revoke=revoke)
+
+        try:
+            while True:
+                if not self.tracker.wait_below(self.max_in_flight, self.linger):
+                    self._store_offsets(consumer)
+                    continue
+
+                messages = consumer.consume(self.batch_size, self.linger)
+                if messages:
+                    self.dispatch(messages)
+                self._store_offsets(consumer)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._store_offsets(consumer)
+            consumer.close()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+
+    def start(self):
+        threading.Thread(target=self.run).start()
+
+
+def runtime_settings(config_parser, module_name) -> dict:
+    """ Настройки пула из секции [runtime] и [<модуль>.runtime]. """
+    settings = {}
+    for section in ("runtime", f"{module_name}.runtime"):
+        if config_parser.has_section(section):
+            settings.update(config_parser[section])
+    return settings
@@ -0,0 +1,189 @@
+import os
+import time
+import random
+import bisect
+import threading
+
+from urllib.parse import urlsplit
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+
+# Значения по умолчанию, переопределяются переменными окружения и секцией
+# [http] в config.ini
+DEFAULT_SETTINGS: dict = {
+    "connect.timeout": os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"),
+    "read.timeout": os.getenv("HTTP_READ_TIMEOUT", "10"),
+    "retries": os.getenv("HTTP_RETRIES", "2"),
+    "backoff": os.getenv("HTTP_BACKOFF", "0.2"),
+    "pool.size": os.getenv("HTTP_POOL_SIZE", "16"),
+    "stats.interval": os.getenv("HTTP_STATS_INTERVAL", "60"),
+}
+# Методы, которые безопасно повторять после отправки запроса
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "PUT", "DELETE", "OPTIONS"))
+RETRY_STATUSES = frozenset((502, 503, 504))
+# Границы корзин гистограммы задержек, мс
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """ Гистограмма задержек одного endpoint по фиксированным корзинам. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+
+    def observe(self, seconds, ok=True):
+        milliseconds = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(LATENCY_BUCKETS, milliseconds)] += 1
+            self.total += 1
+            self.latency_sum += milliseconds
+            if not ok:
+                self.errors += 1
+
+    def quantile(self, q) -> float:
+        """ Верхняя граница корзины, в которую попадает квантиль q (мс). """
+        with self._lock:
+            rank = q * self.total
+            seen = 0
+            for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), self.counts):
+                seen += count
+                if count and seen >= rank:
+                    return bound
+        return 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total, errors, latency_sum = self.total, self.errors, self.latency_sum
+        return {
+            "total": total,
+            "errors": errors,
+            "latency_avg_ms": latency_sum / total if total else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+        }
+
+
+def connect_failed(error) -> bool:
+    """ Запрос не был отправлен: соединение не установлено. """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class HttpClient:
+    """ HTTP-клиент межсервисных вызовов.
+
+    Одна сессия requests с пулом keep-alive соединений на каждый хост,
+    таймауты подключения и чтения по умолчанию, ограниченные повторы с
+    экспоненциальной задержкой и случайным разбросом, гистограммы задержек
+    по endpoint (метод, хост и первый сегмент пути или явная метка).
+
+    Неидемпотентные методы (POST) повторяются, только если запрос не дошёл
+    до сервера.
+    """
+
+    def __init__(self, settings=None):
+        self.histograms: dict = {}
+        self._lock = threading.Lock()
+        self._reporter = None
+        self.configure(settings or {})
+
+    def configure(self, settings):
+        merged = dict(DEFAULT_SETTINGS)
+        merged.update(settings)
+
+        self.timeout = (float(merged["connect.timeout"]), float(merged["read.timeout"]))
+        self.retries = int(merged["retries"])
+        self.backoff = float(merged["backoff"])
+        self.stats_interval = float(merged["stats.interval"])
+
+        pool_size = int(merged["pool.size"])
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        self.session = session
+
+    def histogram(self, endpoint) -> LatencyHistogram:
+        histogram = self.histograms.get(endpoint)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(endpoint, LatencyHistogram())
+                self._start_reporter()
+        return histogram
+
+    def _start_reporter(self):
+        if self._reporter is None and self.stats_interval:
+            self._reporter = threading.Thread(target=self._report_job, daemon=True)
+            self._reporter.start()
+
+    def _report_job(self):
+        while True:
+            time.sleep(self.stats_interval)
+            self.report()
+
+    def report(self):
+        for endpoint, histogram in sorted(self.histograms.items()):
+            stats = histogram.snapshot()
+            print(f"[info] http stats {endpoint}: total={stats['total']}, "
+                  f"errors={stats['errors']}, "
+                  f"avg={stats['latency_avg_ms']:.1f} ms, "
+                  f"p50<={stats['p50_ms']} ms, p99<={stats['p99_ms']} ms")
+
+    def _sleep(self, attempt):
+        # Полный разброс: случайная пауза до backoff * 2^attempt
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def request(self, method, url, endpoint=None, **kwargs) -> requests.Response:
+        method = method.upper()
+        if endpoint is None:
+            parts = urlsplit(url)
+            endpoint = f"{method} {parts.netloc}/{parts.path.strip('/').split('/')[0]}"
+        histogram = self.histogram(endpoint)
+        kwargs.setdefault("timeout", self.timeout)
+        idempotent = method in IDEMPOTENT_METHODS
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                histogram.observe(time.perf_counter() - started, ok=False)
+                if attempt >= self.retries or not (idempotent or connect_failed(e)):
+                    raise
+            else:
+                retry = idempotent and response.status_code in RETRY_STATUSES
+                histogram.observe(time.perf_counter() - started,
+                                  ok=response.status_code < 500)
+                if not retry or attempt >= self.retries:
+                    return response
+
+            self._sleep(attempt)
+            attempt += 1
+
+    def get(self, url, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+# Клиент модуля по умолчанию
+client = HttpClient()
+
+
+def configure(config_parser):
+    """ Настройки из секции [http] config.ini, если она есть. """
+    if config_parser.has_section("http"):
+        client.configure(dict(config_parser["http"]))
@@ -0,0 +1,158 @@
+import json
+import time
+import threading
+import multiprocessing
+
+from confluent_kafka import Producer
+
+
+# Значения по умолчанию, секция [producer] в config.ini их переопределяет
+DEFAULT_CONFIG: dict = {
+    "linger.ms": "5",
+    "batch.num.messages": "1000",
+}
+POLL_TIMEOUT: float = 0.1
+STATS_INTERVAL: float = 30.0
+
+
+class ProducerStats:
+    """ Счётчики пропускной способности и задержки доставки. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.produced = 0
+        self.delivered = 0
+        self.failed = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def record_produced(self, count=1):
+        with self._lock:
+            self.produced += count
+
+    def record_delivery(self, err, latency):
+        with self._lock:
+            if err:
+                self.failed += 1
+                return
+
+            self.delivered += 1
+            if latency is not None:
+                self.latency_sum += latency
+                self.latency_max = max(self.latency_max, latency)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            avg = self.latency_sum / self.delivered if self.delivered else 0.0
+            return {
+                "produced": self.produced,
+                "delivered": self.delivered,
+                "failed": self.failed,
+                "in_flight": self.produced - self.delivered - self.failed,
+                "throughput": self.delivered / elapsed,
+                "latency_avg_ms": avg * 1000,
+                "latency_max_ms": self.latency_max * 1000,
+            }
+
+
+class EventProducer:
+    """ Асинхронный продюсер событий модуля.
+
+    Сообщения отправляются без flush после каждого события: librdkafka
+    собирает их в пачки по linger.ms/batch.num.messages, а колбэки
+    доставки обрабатываются в отдельном фоновом потоке.
+
+    Идемпотентность и сжатие включаются в секции [producer] config.ini
+    (enable.idempotence=true, compression.type=lz4|zstd).
+    """
+
+    def __init__(self, config, topic=None, stats_interval=STATS_INTERVAL):
+        producer_config = dict(DEFAULT_CONFIG)
+        producer_config.update(config)
+
+        self.topic = topic
+        self.stats = ProducerStats()
+        self._producer = Producer(producer_config)
+        self._stats_interval = stats_interval
+        self._running = True
+        self._poll_thread = threading.Thread(target=self._poll_job, daemon=True)
+        self._poll_thread.start()
+
+    def _delivery_callback(self, err, msg):
+        if err:
+            print('[error] Message failed delivery: {}'.format(err))
+        self.stats.record_delivery(err, msg.latency())
+
+    def _poll_job(self):
+        reported_at = time.monotonic()
+        while self._running:
+            self._producer.poll(POLL_TIMEOUT)
+
+            if self._stats_interval and \
+                    time.monotonic() - reported_at >= self._stats_interval:
+                reported_at = time.monotonic()
+                self.report()
+
+    def report(self):
+        stats = self.stats.snapshot()
+        print(f"[info] producer stats: produced={stats['produced']}, "
+              f"delivered={stats['delivered']}, failed={stats['failed']}, "
+              f"in_flight={stats['in_flight']}, "
+              f"throughput={stats['throughput']:.1f} msg/s, "
+              f"latency avg={stats['latency_avg_ms']:.1f} ms "
+              f"max={stats['latency_max_ms']:.1f} ms")
+
+    def produce(self, details):
+        """ Ставит событие в очередь отправки, не дожидаясь доставки. """
+        topic = self.topic or details['deliver_to']
+        value = json.dumps(details)
+        while True:
+            try:
+                self._producer.produce(
+                    topic,
+                    value,
+                    details['id'],
+                    callback=self._delivery_callback
+                )
+                break
+            except BufferError:
+                # Локальная очередь librdkafka заполнена, ждём доставки
+                self._producer.poll(POLL_TIMEOUT)
+
+        self.stats.record_produced()
+
+    def produce_batch(self, batch):
+        for details in batch:
+            self.produce(details)
+
+    def flush(self, timeout=10.0) -> int:
+        return self._producer.flush(timeout)
+
+    def close(self, timeout=10.0):
+        self.flush(timeout)
+        self._running = False
+        self._poll_thread.join()
+
+
+def producer_job(producer: EventProducer, requests_queue: multiprocessing.Queue):
+    """ Отправляет события из очереди модуля, пачки передаются списком. """
+    while True:
+        event_details = requests_queue.get()
+        if isinstance(event_details, list):
+            producer.produce_batch(event_details)
+        else:
+            producer.produce(event_details)
+
+
+def start_producer(config, requests_queue, topic=None) -> EventProducer:
+    """ Запускает поток отправки событий из requests_queue.
+
+    Если topic не задан, событие отправляется в топик из поля deliver_to.
+    """
+    producer = EventProducer(config, topic)
+    threading.Thread(
+        target=lambda: producer_job(producer, requests_queue)
+    ).start()
+    return producer
@@ -1,4 +1,3 @@
-import requests
 import random
 import time
 import os
@@ -6,6 +5,7 @@ from flask import Flask, jsonify, request
 import threading
 from werkzeug.exceptions import HTTPException
 from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
+from runtime.http_client import client as http_client
 
 HOST = '0.0.0.0'
 PORT = 8000
@@ -18,6 +18,8 @@ jwt = JWTManager(app)
 MANAGMENT_URL = 'http://com-mobile:6066'
 PAYMENT_URL = 'http://payment_system:8000'
 CARS_URL = 'http://cars:8000'
+# Шлюз ждёт ответа из Kafka до 30 секунд, таймаут чтения должен быть больше
+GATEWAY_TIMEOUT = (3.05, 35)
 flag = True
 
 data = {
@@ -250,7 +252,7 @@ def get_car():
     - Сообщение об ошибке, если запрос не удался.
     """
     try:
-        response = requests.get(f'{MANAGMENT_URL}/cars')
+        response = http_client.get(f'{MANAGMENT_URL}/cars', timeout=GATEWAY_TIMEOUT)
         assert response.status_code == 200, "Ошибка при получении доступных автомобилей"
         print("Информация о доступных автомобилях:", response.json())
         return response.json()
@@ -267,7 +269,7 @@ def get_tariff():
     - Сообщение об ошибке, если запрос не удался.
     """
     try:
-        response = requests.get(f'{MANAGMENT_URL}/tariff')
+        response = http_client.get(f'{MANAGMENT_URL}/tariff', timeout=GATEWAY_TIMEOUT)
         assert response.status_code == 200, "Ошибка при получении доступных тарифов"
         print("Информация о доступных тарифах:", response.json())
         return response.json()
@@ -290,7 +292,8 @@ def select_auto_and_prepayment(name, experience, brand, tariff):
     - Сообщение об ошибке, если запрос не удался.
     """
     try:
-        response = requests.post(f'{MANAGMENT_URL}/select/car/{brand}', json={'client_name': name, 'experience': experience, 'tariff': tariff})
+        response = http_client.post(f'{MANAGMENT_URL}/select/car/{brand}', json={'client_name': name, 'experience': experience, 'tariff': tariff},
+                                    timeout=GATEWAY_TIMEOUT)
         assert response.status_code == 200, "Ошибка при выборе автомобиля и предоплате"
         print("Информация о предоплате:", response.json())
         return response.json()
@@ -310,7 +313,7 @@ def confirm_prepayment(prepayment_id):
     - Сообщение об ошибке, если запрос не удался.
     """
     try:
-        response = requests.post(f'{PAYMENT_URL}/prepayment/{prepayment_id}/confirm')
+        response = http_client.post(f'{PAYMENT_URL}/prepayment/{prepayment_id}/confirm')
         assert response.status_code == 200, "Ошибка при подтверждении предоплаты"
         print("Предоплата подтверждена:", response.json())
         return response
@@ -330,7 +333,7 @@ def confirm_payment(invoice_id: int):
     - Сообщение об ошибке, если запрос не удался.
     """
     try:
-        response = requests.post(f'{PAYMENT_URL}/invoices/{invoice_id}/confirm')
+        response = http_client.post(f'{PAYMENT_URL}/invoices/{invoice_id}/confirm')
         assert response.status_code == 200, "Ошибка при подтверждении оплаты"
         print("Оплата потверждена:", response.json())
         return response
@@ -350,7 +353,7 @@ def access(name):
     - Сообщение об ошибке, если запрос не удался.
     """
     try:
-        response = requests.post(f'{CARS_URL}/car/occupy/{name}')
+        response = http_client.post(f'{CARS_URL}/car/occupy/{name}', timeout=GATEWAY_TIMEOUT)
         assert response.status_code == 200, "Ошибка при проверке доступа"
         print(response.json()['message'])
         return response.json()
@@ -358,19 +361,19 @@ def access(name):
         print("Ошибка при проверке доступа:", e)
         return response.json()
 
-def start_travel(brand):
+def start_travel(car):
     """
     Начало поездки.
 
     Аргументы:
-    - brand: Марка автомобиля.
+    - car: Идентификатор автомобиля, выданный при аренде.
 
     Возвращает:
     - Информация о начале поездки.
     - Сообщение об ошибке, если запрос не удался.
     """
     try:
-        response = requests.post(f'{CARS_URL}/car/start/{brand}')
+        response = http_client.post(f'{CARS_URL}/car/start/{car}')
         assert response.status_code == 200, "Ошибка при начале поездки"
         print(response.json()['message'])
         return response.json()
@@ -378,19 +381,19 @@ def start_travel(brand):
         print("Ошибка при начале поездки:", e)
         return response.json()
 
-def stop_travel(brand):
+def stop_travel(car):
     """
     Остановка поездки.
 
     Аргументы:
-    - brand: Марка автомобиля.
+    - car: Идентификатор автомобиля, выданный при аренде.
 
     Возвращает:
     - Информация об остановке поездки.
     - Сообщение об ошибке, если запрос не удался.
     """
     try:
-        response = requests.post(f'{CARS_URL}/car/stop/{brand}')
+        response = http_client.post(f'{CARS_URL}/car/stop/{car}')
         assert response.status_code == 200, "Ошибка при остановке поездки"
         print(response.json()['message'])
         return response.json()
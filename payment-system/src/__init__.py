@@ -1,4 +1,12 @@
 import os
+import sys
+
+from configparser import ConfigParser
+
+# Общие компоненты модулей (каталог shared смонтирован в /shared)
+sys.path.append(os.getenv('SHARED_PATH', '/shared'))
+
+from runtime.http_client import configure as configure_http
 
 from .main import start_web
 
@@ -8,5 +16,11 @@ MODULE_NAME = os.getenv('MODULE_NAME')
 
 def main():
     print(f'[DEBUG] {MODULE_NAME} started...')
+
+    # Путь к config.ini передаётся первым аргументом
+    config_parser = ConfigParser()
+    config_parser.read(sys.argv[1:2])
+    configure_http(config_parser)
+
     print(f'Running {MODULE_NAME}_api...')
     start_web()
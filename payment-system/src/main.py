@@ -1,11 +1,17 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 import os
-import requests
+import json
+import time
 import threading
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from enum import Enum
+from functools import wraps
+from sqlalchemy import delete, insert, inspect, or_, select
+from sqlalchemy.exc import IntegrityError
 from werkzeug.exceptions import HTTPException
+from runtime.http_client import client as http_client
 
 MANAGMENT_URL = 'http://bank-pay:6065' 
 
@@ -13,9 +19,38 @@ HOST = '0.0.0.0'
 PORT = 8000
 MODULE_NAME = os.getenv('MODULE_NAME')
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///payments.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('PAYMENT_DATABASE_URI', 'sqlite:///payments.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
+# Сколько клиентов (нормализованное имя -> id) держится в памяти
+CLIENT_CACHE_SIZE = int(os.getenv('CLIENT_CACHE_SIZE', 10000))
+# Доставка вебхуков в bank-pay: сообщений за проход, период опроса и
+# предельная пауза между повторами, секунды
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 1.0))
+OUTBOX_MAX_BACKOFF = 60.0
+outbox_wakeup = threading.Event()
+# Предельное число записей в одном запросе /bulk
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 10000))
+# Архивирование оплаченных счетов: период запуска (секунды) и размер порции
+ARCHIVE_INTERVAL = float(os.getenv('ARCHIVE_INTERVAL', 60))
+ARCHIVE_CHUNK_SIZE = int(os.getenv('ARCHIVE_CHUNK_SIZE', 1000))
+# Чек оплаченного счёта не меняется, его можно кэшировать
+RECEIPT_MAX_AGE = 86400
+# Размер страницы списков по умолчанию и предельный, строк за выборку при выгрузке
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 1000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Ключи идемпотентности: заголовок, срок хранения ответа (секунды) и
+# область ключей отдельных элементов /bulk
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_TTL = float(os.getenv('IDEMPOTENCY_TTL', 86400))
+# Аренда ключа выполняющимся запросом (секунды): если запрос не завершился
+# за это время (процесс упал), повтор занимает ключ заново
+IDEMPOTENCY_LEASE = float(os.getenv('IDEMPOTENCY_LEASE', 60))
+IDEMPOTENCY_KEY_LENGTH = 200
+BULK_ITEM_SCOPE = '/bulk/items'
 
 
 class PaymentStatus(Enum):
@@ -24,10 +59,48 @@ class PaymentStatus(Enum):
     FAILED = "failed"
 
 
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш ограниченного размера.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+# Кэш клиентов: нормализованное имя -> (id, имя)
+client_cache = LRUCache(CLIENT_CACHE_SIZE)
+
+
+def normalize_name(name):
+    """
+    Нормализованное имя клиента: без крайних пробелов и без учёта регистра.
+    """
+    return ' '.join(name.split()).casefold()
+
+
 # Модель для хранения клиентов
 class Client(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
+    # Уникальный ключ поиска клиента. В базах, перенесённых миграцией,
+    # у повторяющихся имён он заполнен только у первого клиента
+    name_normalized = db.Column(db.String(100), unique=True, index=True)
     invoices = db.relationship('Invoice', backref='client', lazy=True)
     prepayments = db.relationship('Prepayment', backref='client', lazy=True)
 
@@ -40,17 +113,22 @@ class Invoice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
-    status = db.Column(db.Enum(PaymentStatus), default=PaymentStatus.PENDING)
+    status = db.Column(db.Enum(PaymentStatus), default=PaymentStatus.PENDING, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_invoice_client_id_id', 'client_id', 'id'),)
 
 
 # Модель для хранения архивированных счетов
 class ArchivedInvoice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    # ID исходного счёта, по нему чек находится и после архивирования.
+    # У счетов, архивированных до миграции 2, не заполнен
+    invoice_id = db.Column(db.Integer, unique=True, index=True)
     client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.Enum(PaymentStatus), default=PaymentStatus.PAID)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_archived_invoice_client_id_id', 'client_id', 'id'),)
 
 
 # Модель для хранения предоплат
@@ -60,6 +138,107 @@ class Prepayment(db.Model):
     amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.Enum(PaymentStatus), default=PaymentStatus.PENDING)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_prepayment_client_id_id', 'client_id', 'id'),)
+
+
+def add_column(connection, table, column, ddl):
+    """
+    Добавляет колонку, если её ещё нет (create_all не меняет существующие таблицы).
+    """
+    columns = [existing['name'] for existing in inspect(connection).get_columns(table)]
+    if column not in columns:
+        connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}')
+
+
+def add_client_name_normalized(connection):
+    """
+    Миграция 1: колонка name_normalized с уникальным индексом.
+    """
+    add_column(connection, 'client', 'name_normalized', 'VARCHAR(100)')
+
+    # Нормализация в Python: lower() в SQLite не учитывает кириллицу
+    seen = set()
+    rows = connection.exec_driver_sql(
+        'SELECT id, name FROM client WHERE name_normalized IS NULL ORDER BY id').fetchall()
+    taken = {row[0] for row in connection.exec_driver_sql(
+        'SELECT name_normalized FROM client WHERE name_normalized IS NOT NULL')}
+    for client_id, name in rows:
+        normalized = normalize_name(name)
+        if normalized in seen or normalized in taken:
+            continue
+        seen.add(normalized)
+        connection.exec_driver_sql('UPDATE client SET name_normalized = ? WHERE id = ?',
+                                   (normalized, client_id))
+    connection.exec_driver_sql('CREATE UNIQUE INDEX IF NOT EXISTS ix_client_name_normalized '
+                               'ON client (name_normalized)')
+
+
+def add_archived_invoice_id(connection):
+    """
+    Миграция 2: ID исходного счёта в архиве и индекс счетов по статусу.
+    """
+    add_column(connection, 'archived_invoice', 'invoice_id', 'INTEGER')
+    connection.exec_driver_sql('CREATE UNIQUE INDEX IF NOT EXISTS ix_archived_invoice_invoice_id '
+                               'ON archived_invoice (invoice_id)')
+    connection.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_invoice_status ON invoice (status)')
+
+
+def add_client_listing_indexes(connection):
+    """
+    Миграция 3: индексы (client_id, id) для постраничных списков клиента.
+    """
+    for table in ('invoice', 'archived_invoice', 'prepayment'):
+        connection.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS ix_{table}_client_id_id '
+                                   f'ON {table} (client_id, id)')
+
+
+def add_idempotency_lease(connection):
+    """
+    Миграция 4: срок аренды ключа идемпотентности выполняющимся запросом.
+    """
+    add_column(connection, 'idempotency_key', 'locked_until', 'DATETIME')
+
+
+# Миграции схемы по порядку, номер применённой хранится в PRAGMA user_version
+MIGRATIONS = [add_client_name_normalized, add_archived_invoice_id, add_client_listing_indexes,
+              add_idempotency_lease]
+
+
+def migrate():
+    """
+    Применяет миграции, которых ещё нет в базе.
+    """
+    with db.engine.begin() as connection:
+        version = connection.exec_driver_sql('PRAGMA user_version').scalar()
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            print(f'[info] applying migration {number}: {migration.__name__}')
+            migration(connection)
+            connection.exec_driver_sql(f'PRAGMA user_version = {number}')
+
+
+# Модель для хранения неотправленных вебхуков (outbox)
+class OutboxMessage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(200), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+# Модель для хранения ответов по ключам идемпотентности. Ключ действует
+# в пределах пути запроса; status_code пуст, пока запрос выполняется,
+# locked_until - до какого момента ключ арендован этим запросом
+class IdempotencyKey(db.Model):
+    key = db.Column(db.String(IDEMPOTENCY_KEY_LENGTH), primary_key=True)
+    path = db.Column(db.String(200), primary_key=True)
+    status_code = db.Column(db.Integer)
+    response = db.Column(db.Text)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    locked_until = db.Column(db.DateTime)
+
+
+# Модели записей, создаваемых через /bulk
+BULK_MODELS = {'invoice': Invoice, 'prepayment': Prepayment}
 
 
 # Инициализация базы данных
@@ -69,10 +248,385 @@ def create_tables():
     Инициализация базы данных перед первым запросом.
     """
     db.create_all()
+    migrate()
+
+
+def get_or_create_client(name):
+    """
+    Находит клиента по нормализованному имени или создаёт нового.
+
+    Новый клиент добавляется в точке сохранения текущей транзакции: если
+    параллельный запрос успел создать клиента с тем же именем, возвращается
+    уже существующий. Фиксирует транзакцию вызывающий код.
+
+    Args:
+        name (str): Имя клиента.
+
+    Returns:
+        tuple: (id, имя, создан ли клиент).
+    """
+    normalized = normalize_name(name)
+    cached = client_cache.get(normalized)
+    if cached is not None:
+        return cached + (False,)
+
+    client = Client.query.filter_by(name_normalized=normalized).first()
+    if client is None:
+        try:
+            with db.session.begin_nested():
+                client = Client(name=name, name_normalized=normalized)
+                db.session.add(client)
+            return client.id, client.name, True
+        except IntegrityError:
+            client = Client.query.filter_by(name_normalized=normalized).one()
+
+    client_cache.put(normalized, (client.id, client.name))
+    return client.id, client.name, False
+
+
+def resolve_clients(names):
+    """
+    Находит или создаёт клиентов для всех имён в текущей транзакции.
+
+    Известные клиенты берутся из кэша и одним запросом по индексу
+    name_normalized, недостающие создаются через get_or_create_client.
+
+    Args:
+        names (list): Имена клиентов.
+
+    Returns:
+        tuple: (нормализованное имя -> (id, имя), нормализованные имена созданных клиентов).
+    """
+    resolved, missing = {}, {}
+    for name in names:
+        normalized = normalize_name(name)
+        if normalized in resolved or normalized in missing:
+            continue
+        cached = client_cache.get(normalized)
+        if cached is not None:
+            resolved[normalized] = cached
+        else:
+            missing[normalized] = name
+
+    created = []
+    if missing:
+        for client in Client.query.filter(Client.name_normalized.in_(list(missing))):
+            resolved[client.name_normalized] = (client.id, client.name)
+            client_cache.put(client.name_normalized, (client.id, client.name))
+        for normalized, name in missing.items():
+            if normalized not in resolved:
+                client_id, client_name, was_created = get_or_create_client(name)
+                resolved[normalized] = (client_id, client_name)
+                if was_created:
+                    created.append(normalized)
+    return resolved, created
+
+
+def claim_idempotency_key(key, path):
+    """
+    Занимает ключ идемпотентности отдельной транзакцией.
+
+    Ключ выдаётся в аренду на IDEMPOTENCY_LEASE секунд. Ключ без ответа,
+    аренда которого истекла (запрос не завершился), занимается заново
+    условным UPDATE, поэтому из параллельных повторов его получает один.
+
+    Returns:
+        tuple: (запись ключа, None), если ключ уже использован или занят,
+            иначе (None, срок аренды).
+    """
+    now = datetime.utcnow()
+    locked_until = now + timedelta(seconds=IDEMPOTENCY_LEASE)
+    record = db.session.get(IdempotencyKey, (key, path))
+    if record is not None:
+        if record.expires_at > now:
+            if record.status_code is not None:
+                return record, None
+            reclaimed = IdempotencyKey.query.filter(
+                IdempotencyKey.key == key, IdempotencyKey.path == path,
+                IdempotencyKey.status_code.is_(None),
+                or_(IdempotencyKey.locked_until.is_(None), IdempotencyKey.locked_until <= now)
+            ).update({'locked_until': locked_until}, synchronize_session=False)
+            db.session.commit()
+            if not reclaimed:
+                return db.session.get(IdempotencyKey, (key, path)), None
+            print(f'[info] idempotency key {key} lease expired, reclaimed')
+            return None, locked_until
+        db.session.delete(record)
+        db.session.flush()
+
+    db.session.add(IdempotencyKey(key=key, path=path, locked_until=locked_until,
+                                  expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL)))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return db.session.get(IdempotencyKey, (key, path)), None
+    return None, locked_until
+
+
+def idempotent(view):
+    """
+    Декоратор POST-обработчиков: повтор запроса с тем же заголовком
+    Idempotency-Key получает сохранённый ответ без обращения к данным.
+
+    Ключ занимается до выполнения обработчика, ответ (кроме 5xx)
+    сохраняется на IDEMPOTENCY_TTL секунд. Пока первый запрос выполняется
+    и его аренда не истекла, повтор получает 409; после ответа 5xx ключ
+    освобождается. Запрос, потерявший аренду, свой ответ не сохраняет.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > IDEMPOTENCY_KEY_LENGTH:
+            return jsonify({'error': 'Idempotency key is too long'}), 400
+
+        record, lease = claim_idempotency_key(key, request.path)
+        if record is not None:
+            if record.status_code is None:
+                return jsonify({'error': 'Request with this idempotency key is in progress'}), 409
+            response = app.response_class(record.response, status=record.status_code,
+                                          mimetype='application/json')
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(key=key, path=request.path, status_code=None,
+                                           locked_until=lease).delete()
+            db.session.commit()
+            raise
+        db.session.rollback()
+        record = db.session.get(IdempotencyKey, (key, request.path))
+        if record is None or record.status_code is not None or record.locked_until != lease:
+            # Ключ удалён или занят повтором после истечения аренды
+            print(f'[error] idempotency key {key} lease lost, response not stored')
+            return response
+        if response.status_code >= 500:
+            db.session.delete(record)
+        else:
+            record.status_code = response.status_code
+            record.response = response.get_data(as_text=True)
+            record.locked_until = None
+        db.session.commit()
+        return response
+
+    return wrapper
+
+
+def bulk_results(keys):
+    """
+    Сохранённые результаты элементов /bulk по их ключам идемпотентности.
+    Просроченные ключи удаляются в текущей транзакции.
+
+    Returns:
+        dict: Ключ -> элемент ответа.
+    """
+    if not keys:
+        return {}
+
+    now = datetime.utcnow()
+    records = IdempotencyKey.query.filter(IdempotencyKey.path == BULK_ITEM_SCOPE,
+                                          IdempotencyKey.key.in_(keys)).all()
+    stored = {}
+    for record in records:
+        if record.expires_at > now:
+            stored[record.key] = json.loads(record.response)
+        else:
+            db.session.delete(record)
+    db.session.flush()
+    return stored
+
+
+def purge_idempotency_keys():
+    """
+    Удаляет просроченные ключи идемпотентности.
+
+    Returns:
+        int: Количество удалённых ключей.
+    """
+    purged = IdempotencyKey.query.filter(IdempotencyKey.expires_at <= datetime.utcnow()).delete()
+    db.session.commit()
+    return purged
+
+
+def stream_rows(statement, to_dict):
+    """
+    Выгрузка строк в NDJSON с курсора на стороне сервера порциями по
+    EXPORT_CHUNK_SIZE строк, память не зависит от размера выгрузки.
+    """
+    engine = db.engine
+
+    def generate():
+        with engine.connect() as connection:
+            result = connection.execution_options(yield_per=EXPORT_CHUNK_SIZE).execute(statement)
+            for row in result:
+                yield json.dumps(to_dict(row)) + '\n'
+
+    return Response(generate(), mimetype=NDJSON_MIMETYPE)
+
+
+def list_by_client(model, client_id, to_dict):
+    """
+    Список записей клиента с постраничной выборкой по ключу.
+
+    Параметры запроса: after_id - ID последней полученной записи, limit -
+    размер страницы (по умолчанию PAGE_SIZE). Если страница заполнена,
+    ID для следующей возвращается в заголовке X-Next-After-Id. С
+    format=ndjson все записи после after_id выгружаются потоком.
+
+    Args:
+        model: Модель записей (Invoice, ArchivedInvoice, Prepayment).
+        client_id (int): ID клиента.
+        to_dict: Преобразование строки в словарь ответа.
+
+    Returns:
+        Response: JSON-список или поток NDJSON.
+    """
+    table = model.__table__
+    after_id = request.args.get('after_id', 0, type=int)
+    statement = (select(table)
+                 .where(table.c.client_id == client_id, table.c.id > after_id)
+                 .order_by(table.c.id))
+    if request.args.get('format') == 'ndjson':
+        return stream_rows(statement, to_dict)
+
+    limit = max(1, min(request.args.get('limit', PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    rows = db.session.execute(statement.limit(limit)).all()
+    response = jsonify([to_dict(row) for row in rows])
+    if len(rows) == limit:
+        response.headers['X-Next-After-Id'] = str(rows[-1].id)
+    return response
+
+
+def enqueue_webhook(path, payload):
+    """
+    Добавляет вебхук bank-pay в outbox текущей транзакции.
+
+    Args:
+        path (str): Путь относительно адреса bank-pay.
+        payload (dict): Тело запроса.
+    """
+    db.session.add(OutboxMessage(path=path, payload=payload))
+
+
+def deliver_outbox():
+    """
+    Отправляет пачку готовых к отправке вебхуков.
+
+    Запись в базу начинается после всех запросов: удаление доставленных
+    и перенос повторов фиксируются одним коммитом. Ответ 4xx считается окончательным,
+    повтор назначается при ошибке соединения или 5xx.
+
+    Returns:
+        int: Количество обработанных сообщений.
+    """
+    now = datetime.utcnow()
+    messages = (OutboxMessage.query
+                .filter(OutboxMessage.next_attempt_at <= now)
+                .order_by(OutboxMessage.id)
+                .limit(OUTBOX_BATCH_SIZE)
+                .all())
+
+    delivered = []
+    for message in messages:
+        try:
+            response = http_client.post(f'{MANAGMENT_URL}{message.path}', json=message.payload)
+            if response.status_code >= 500:
+                raise RuntimeError(f'status {response.status_code}')
+            if response.status_code >= 400:
+                print(f'[error] webhook {message.path} rejected: {response.status_code}')
+            delivered.append(True)
+        except Exception as e:
+            print(f'[error] webhook {message.path} failed (attempt {message.attempts + 1}): {e}')
+            delivered.append(False)
+
+    for message, ok in zip(messages, delivered):
+        if ok:
+            db.session.delete(message)
+        else:
+            message.attempts += 1
+            delay = min(OUTBOX_POLL_INTERVAL * 2 ** message.attempts, OUTBOX_MAX_BACKOFF)
+            message.next_attempt_at = now + timedelta(seconds=delay)
+    db.session.commit()
+    return len(messages)
+
+
+def archive_settled(chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    Переносит оплаченные счета в архив порциями.
+
+    Каждая порция - одна транзакция из INSERT ... SELECT в архив и DELETE
+    из таблицы счетов по одному списку ID.
+
+    Returns:
+        int: Количество перенесённых счетов.
+    """
+    invoice = Invoice.__table__
+    moved = 0
+    while True:
+        with db.engine.begin() as connection:
+            ids = connection.execute(
+                select(invoice.c.id)
+                .where(invoice.c.status == PaymentStatus.PAID)
+                .order_by(invoice.c.id)
+                .limit(chunk_size)).scalars().all()
+            if not ids:
+                return moved
+
+            connection.execute(insert(ArchivedInvoice.__table__).from_select(
+                ['invoice_id', 'client_id', 'amount', 'status', 'created_at'],
+                select(invoice.c.id, invoice.c.client_id, invoice.c.amount,
+                       invoice.c.status, invoice.c.created_at)
+                .where(invoice.c.id.in_(ids))))
+            connection.execute(delete(invoice).where(invoice.c.id.in_(ids)))
+        moved += len(ids)
+
+
+def maintenance_job():
+    """
+    Фоновое обслуживание раз в ARCHIVE_INTERVAL секунд: архивирование
+    оплаченных счетов и удаление просроченных ключей идемпотентности.
+    """
+    while True:
+        time.sleep(ARCHIVE_INTERVAL)
+        try:
+            with app.app_context():
+                moved = archive_settled()
+            if moved:
+                print(f'[info] archived {moved} settled invoices')
+        except Exception as e:
+            print(f'[error] invoice archival failed: {e}')
+        try:
+            with app.app_context():
+                purged = purge_idempotency_keys()
+            if purged:
+                print(f'[info] purged {purged} expired idempotency keys')
+        except Exception as e:
+            print(f'[error] idempotency key purge failed: {e}')
+
+
+def outbox_job():
+    """
+    Фоновая доставка outbox: по сигналу после коммита или раз в период опроса.
+    """
+    while True:
+        outbox_wakeup.wait(OUTBOX_POLL_INTERVAL)
+        outbox_wakeup.clear()
+        try:
+            with app.app_context():
+                while deliver_outbox() == OUTBOX_BATCH_SIZE:
+                    pass
+        except Exception as e:
+            print(f'[error] outbox delivery failed: {e}')
 
 
 # Создание клиента
 @app.route('/clients', methods=['POST'])
+@idempotent
 def create_or_exists_client():
     """
     Создание нового клиента или возврат существующего клиента по имени.
@@ -83,15 +637,12 @@ def create_or_exists_client():
     try:
         data = request.json
         name = data.get('name')
-        assert name, "Client name is required"
-        clients = Client.query.filter(Client.name.ilike(f'%{name}%')).all()
-        if clients:
-            return jsonify([client.to_dict() for client in clients]), 200
-        else:
-            client = Client(name=name)
-            db.session.add(client)
+        assert name and name.strip(), "Client name is required"
+        client_id, client_name, created = get_or_create_client(name)
+        if created:
             db.session.commit()
-            return jsonify([{'id': client.id, 'name': client.name}]), 201
+            client_cache.put(normalize_name(name), (client_id, client_name))
+        return jsonify([{'id': client_id, 'name': client_name}]), 201 if created else 200
     except AssertionError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -112,11 +663,14 @@ def get_client(client_id):
     try:
         client = Client.query.get_or_404(client_id)
         return jsonify({'id': client.id, 'name': client.name})
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Отправка счёта на оплату
 @app.route('/invoices', methods=['POST'])
+@idempotent
 def create_invoice():
     """
     Создание нового счёта для клиента.
@@ -142,18 +696,21 @@ def create_invoice():
 @app.route('/clients/<int:client_id>/invoices', methods=['GET'])
 def get_invoices_by_client(client_id: int):
     """
-    Получение всех счетов для клиента по его ID.
+    Получение счетов клиента по его ID постранично (after_id, limit)
+    или выгрузка всех потоком NDJSON (format=ndjson).
 
     Args:
         client_id (int): ID клиента.
 
     Returns:
-        JSON: Список счетов клиента.
+        JSON: Страница счетов клиента или поток NDJSON.
     """
     try:
         client = Client.query.get_or_404(client_id)
-        invoices = Invoice.query.filter_by(client_id=client.id).all()
-        return jsonify([{'id': invoice.id, 'amount': invoice.amount, 'status': invoice.status.value} for invoice in invoices])
+        return list_by_client(Invoice, client.id, lambda invoice: {
+            'id': invoice.id, 'amount': invoice.amount, 'status': invoice.status.value})
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -172,11 +729,14 @@ def get_invoice(invoice_id: int):
     try:
         invoice = Invoice.query.get_or_404(invoice_id)
         return jsonify({'id': invoice.id, 'amount': invoice.amount, 'status': invoice.status.value, 'client_id': invoice.client_id})
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Подтверждение оплаты
 @app.route('/invoices/<int:invoice_id>/confirm', methods=['POST'])
+@idempotent
 def confirm_payment(invoice_id: int):
     """
     Подтверждение оплаты счёта.
@@ -191,9 +751,12 @@ def confirm_payment(invoice_id: int):
         invoice = Invoice.query.get_or_404(invoice_id)
         client = Client.query.get(invoice.client_id)
         invoice.status = PaymentStatus.PAID
+        enqueue_webhook(f'/confirm_payment/{client.name}', {'id': invoice.id, 'status': invoice.status.value})
         db.session.commit()
-        requests.post(f'{MANAGMENT_URL}/confirm_payment/{client.name}', json={'id': invoice.id, 'status': invoice.status.value})
+        outbox_wakeup.set()
         return jsonify({'id': invoice.id, 'status': invoice.status.value})
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -201,7 +764,8 @@ def confirm_payment(invoice_id: int):
 @app.route('/invoices/<int:invoice_id>/receipt', methods=['GET'])
 def send_receipt(invoice_id: int):
     """
-    Отправка чека и архивирование счёта.
+    Отправка чека. Только чтение: счёт ищется в таблице счетов, затем в
+    архиве; архивирует оплаченные счета фоновая задача.
 
     Args:
         invoice_id (int): ID счёта.
@@ -210,22 +774,27 @@ def send_receipt(invoice_id: int):
         JSON: Информация о чеке.
     """
     try:
-        invoice = Invoice.query.get_or_404(invoice_id)
+        invoice = db.session.get(Invoice, invoice_id)
+        if invoice is None:
+            invoice = ArchivedInvoice.query.filter_by(invoice_id=invoice_id).first_or_404()
         receipt = {
-            'id': invoice.id,
+            'id': invoice_id,
             'amount': invoice.amount,
             'status': invoice.status.value,
             'created_at': invoice.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'client_id': invoice.client_id
         }
-        archived_invoice = ArchivedInvoice(
-            client_id=invoice.client_id,
-            amount=invoice.amount,
-            created_at=invoice.created_at)
-        db.session.add(archived_invoice)
-        db.session.delete(invoice)
-        db.session.commit()
-        return jsonify({'message': 'Receipt sent', 'receipt': receipt})
+        response = jsonify({'message': 'Receipt sent', 'receipt': receipt})
+        # Чек оплаченного счёта неизменен, чек неоплаченного - проверяется заново
+        response.set_etag(f'receipt-{invoice_id}-{invoice.status.value}')
+        if invoice.status == PaymentStatus.PAID:
+            response.cache_control.public = True
+            response.cache_control.max_age = RECEIPT_MAX_AGE
+        else:
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -233,28 +802,32 @@ def send_receipt(invoice_id: int):
 @app.route('/clients/<int:client_id>/archived_invoices', methods=['GET'])
 def get_archived_invoices_by_client(client_id: int):
     """
-    Получение всех архивированных счетов для клиента по его ID.
+    Получение архивированных счетов клиента по его ID постранично (after_id, limit)
+    или выгрузка всех потоком NDJSON (format=ndjson).
 
     Args:
         client_id (int): ID клиента.
 
     Returns:
-        JSON: Список архивированных счетов клиента.
+        JSON: Страница архивированных счетов клиента или поток NDJSON.
     """
     try:
         client = Client.query.get_or_404(client_id)
-        archived_invoices = ArchivedInvoice.query.filter_by(client_id=client.id).all()
-        return jsonify([{
+        return list_by_client(ArchivedInvoice, client.id, lambda archived_invoice: {
             'id': archived_invoice.id,
+            'invoice_id': archived_invoice.invoice_id,
             'amount': archived_invoice.amount,
             'status': archived_invoice.status.value,
             'created_at': archived_invoice.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        } for archived_invoice in archived_invoices])
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Создание предоплаты
 @app.route('/clients/<int:client_id>/prepayment', methods=['POST'])
+@idempotent
 def create_prepayment(client_id: int):
     """
     Создание новой предоплаты для клиента.
@@ -278,8 +851,80 @@ def create_prepayment(client_id: int):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Пакетное создание счетов и предоплат
+@app.route('/bulk', methods=['POST'])
+@idempotent
+def create_bulk():
+    """
+    Создание счетов и предоплат пачкой в одной транзакции.
+
+    Тело запроса: {'items': [{'client_name', 'amount', 'kind'}]}, где kind -
+    invoice или prepayment. Клиенты находятся или создаются по имени.
+    Элемент с полем idempotency_key создаётся один раз: при повторе
+    возвращается сохранённый результат, ключ записывается в той же
+    транзакции, что и сама запись.
+
+    Returns:
+        JSON: Созданные записи в порядке элементов запроса.
+    """
+    try:
+        items = (request.json or {}).get('items')
+        assert isinstance(items, list) and items, "Items are required"
+        assert len(items) <= BULK_MAX_ITEMS, f"At most {BULK_MAX_ITEMS} items per request"
+        for item in items:
+            assert isinstance(item, dict) and item.get('client_name') and str(item['client_name']).strip(), "Client name is required"
+            assert item.get('amount') is not None, "Amount is required"
+            assert item.get('kind') in BULK_MODELS, "Kind must be invoice or prepayment"
+            key = item.get('idempotency_key')
+            assert key is None or (isinstance(key, str) and 0 < len(key) <= IDEMPOTENCY_KEY_LENGTH), "Invalid idempotency key"
+
+        keys = [item.get('idempotency_key') for item in items]
+        stored = bulk_results([key for key in keys if key])
+        # Элементы к созданию: без ключа или с новым ключом (первое вхождение)
+        first, new = {}, []
+        for index, key in enumerate(keys):
+            if key in stored or key in first:
+                continue
+            if key:
+                first[key] = index
+            new.append(index)
+
+        clients, created = resolve_clients([items[index]['client_name'] for index in new])
+        records = [
+            BULK_MODELS[items[index]['kind']](client_id=clients[normalize_name(items[index]['client_name'])][0],
+                                              amount=items[index]['amount'],
+                                              status=PaymentStatus.PENDING)
+            for index in new
+        ]
+        db.session.add_all(records)
+        db.session.flush()
+        results = {index: {'id': record.id, 'amount': record.amount, 'status': record.status.value,
+                           'client_id': record.client_id, 'kind': items[index]['kind']}
+                   for index, record in zip(new, records)}
+
+        expires_at = datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL)
+        db.session.add_all([
+            IdempotencyKey(key=key, path=BULK_ITEM_SCOPE, status_code=201,
+                           response=json.dumps(results[index]), expires_at=expires_at)
+            for key, index in first.items()
+        ])
+        result = [results[index] if index in results else
+                  stored[key] if key in stored else results[first[key]]
+                  for index, key in enumerate(keys)]
+        db.session.commit()
+
+        for normalized in created:
+            client_cache.put(normalized, clients[normalized])
+        return jsonify({'items': result}), 201
+    except AssertionError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Подтверждение предоплаты
 @app.route('/prepayment/<int:prepayment_id>/confirm', methods=['POST'])
+@idempotent
 def confirm_prepayment(prepayment_id: int):
     """
     Подтверждение предоплаты.
@@ -294,9 +939,12 @@ def confirm_prepayment(prepayment_id: int):
         prepayment = Prepayment.query.get_or_404(prepayment_id)
         client = Client.query.get(prepayment.client_id)
         prepayment.status = PaymentStatus.PAID
+        enqueue_webhook(f'/confirm_prepayment/{client.name}', {'id': prepayment.id, 'status': prepayment.status.value})
         db.session.commit()
-        requests.post(f'{MANAGMENT_URL}/confirm_prepayment/{client.name}', json={'id': prepayment.id, 'status': prepayment.status.value})
+        outbox_wakeup.set()
         return jsonify({'id': prepayment.id, 'status': prepayment.status.value})
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -304,18 +952,21 @@ def confirm_prepayment(prepayment_id: int):
 @app.route('/clients/<int:client_id>/prepayments', methods=['GET'])
 def get_prepayments_by_client(client_id: int):
     """
-    Получение всех предоплат для клиента по его ID.
+    Получение предоплат клиента по его ID постранично (after_id, limit)
+    или выгрузка всех потоком NDJSON (format=ndjson).
 
     Args:
         client_id (int): ID клиента.
 
     Returns:
-        JSON: Список предоплат клиента.
+        JSON: Страница предоплат клиента или поток NDJSON.
     """
     try:
         client = Client.query.get_or_404(client_id)
-        prepayments = Prepayment.query.filter_by(client_id=client.id).all()
-        return jsonify([{'id': prepayment.id, 'amount': prepayment.amount, 'status': prepayment.status.value} for prepayment in prepayments])
+        return list_by_client(Prepayment, client.id, lambda prepayment: {
+            'id': prepayment.id, 'amount': prepayment.amount, 'status': prepayment.status.value})
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -338,8 +989,12 @@ def handle_exception(e):
 
 def start_web():
     """
-    Запуск веб-сервера в отдельном потоке.
+    Запуск веб-сервера, доставки outbox и обслуживания в отдельных потоках.
     """
+    with app.app_context():
+        create_tables()
+    threading.Thread(target=outbox_job, daemon=True).start()
+    threading.Thread(target=maintenance_job, daemon=True).start()
     threading.Thread(target=lambda: app.run(
         host=HOST, port=PORT, debug=True, use_reloader=False
     )).start()
\ No newline at end of file
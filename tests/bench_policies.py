@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+monitor_path: str = os.path.join(__location__,
+                                 os.pardir,
+                                 'management-system', 'modules', 'monitor', 'module')
+
+sys.path.insert(1, monitor_path)
+from policies import policies, check_operation
+
+
+ROUNDS: int = 200_000
+
+
+def legacy_check_operation(id, details) -> bool:
+    """ Прежняя реализация: линейный поиск словаря в кортеже политик. """
+    src: str = details.get("source")
+    dst: str = details.get("deliver_to")
+
+    if not all((src, dst)):
+        return False
+
+    return {"src": src, "dst": dst} in policies
+
+
+def sample_events() -> list:
+    events = [{
+        'source': policy['src'],
+        'deliver_to': policy['dst'],
+        'operation': 'telemetry'
+    } for policy in policies]
+
+    # Запрещённые маршруты проходят полный просмотр таблицы
+    events.append({'source': 'manage-drive', 'deliver_to': 'sender-car',
+                   'operation': 'stop'})
+    events.append({'source': 'com-mobile', 'deliver_to': 'verify',
+                   'operation': 'get_cars'})
+    return events
+
+
+def measure(check, events) -> float:
+    """ Возвращает число проверок в секунду. """
+    started = time.perf_counter()
+    for i in range(ROUNDS):
+        check(i, events[i % len(events)])
+    return ROUNDS / (time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    events = sample_events()
+
+    for event in events:
+        assert legacy_check_operation(0, event) == check_operation(0, event)
+
+    legacy = measure(legacy_check_operation, events)
+    compiled = measure(check_operation, events)
+
+    print(f'legacy:   {legacy:>12,.0f} checks/s')
+    print(f'compiled: {compiled:>12,.0f} checks/s')
+    print(f'speedup:  {compiled / legacy:>12.1f}x')
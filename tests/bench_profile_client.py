@@ -0,0 +1,106 @@
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+
+from contextlib import redirect_stdout
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+profile_client_path: str = os.path.join(__location__,
+                                        os.pardir,
+                                        'management-system', 'modules', 'profile-client')
+shared_path: str = os.path.join(__location__,
+                                os.pardir,
+                                'management-system', 'shared')
+
+sys.path.insert(1, profile_client_path)
+sys.path.insert(1, shared_path)
+
+from sqlalchemy import create_engine
+from module import db
+from module.consumer import process_event
+
+
+CLIENTS: int = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+EVENTS: int = 200
+CHUNK: int = 50_000
+
+# Схема таблицы до миграции: без индексов по client_name, car и
+# selection_id (колонка selection_id нужна запросам текущего кода)
+LEGACY_SCHEMA = """
+CREATE TABLE clients (
+    id INTEGER NOT NULL PRIMARY KEY,
+    client_name VARCHAR(100) NOT NULL,
+    experience INTEGER NOT NULL,
+    car VARCHAR(100),
+    selection_id VARCHAR(100),
+    prepayment INTEGER,
+    prepayment_status VARCHAR(100),
+    tariff VARCHAR(100),
+    elapsed_time FLOAT
+)
+"""
+
+
+def fill(engine):
+    """ Заполняет таблицу клиентами, у каждого десятого есть машина. """
+    with engine.begin() as connection:
+        connection.exec_driver_sql(LEGACY_SCHEMA)
+        for start in range(0, CLIENTS, CHUNK):
+            rows = [(
+                f'client-{i}', 1 + i % 10,
+                f'car-{i}' if i % 10 == 0 else None,
+                'paid', 'min'
+            ) for i in range(start, min(start + CHUNK, CLIENTS))]
+            connection.exec_driver_sql(
+                "INSERT INTO clients (client_name, experience, car, "
+                "prepayment_status, tariff) VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def sample_events() -> list:
+    events = []
+    for n in range(EVENTS):
+        i = (n * 7919 * 10) % CLIENTS // 10 * 10
+        events.append({'operation': 'access', 'name': f'client-{i}'})
+        events.append({'operation': 'answer_status', 'data': {
+            'brand': f'car-{i}', 'has_air_conditioner': True,
+            'has_heater': False, 'has_navigator': True
+        }})
+    return events
+
+
+def measure(events) -> float:
+    """ Возвращает среднюю задержку обработки события в миллисекундах. """
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        for n, details in enumerate(events):
+            with db.session_scope() as session:
+                process_event(session, str(n), json.loads(json.dumps(details)))
+    return (time.perf_counter() - started) / len(events) * 1000
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f'sqlite:///{directory}/clients.db')
+        db.Session.configure(bind=engine)
+
+        started = time.perf_counter()
+        fill(engine)
+        print(f'filled {CLIENTS:,} clients in {time.perf_counter() - started:.1f} s')
+
+        events = sample_events()
+        before = measure(events)
+
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            db.migrate(connection)
+        print(f'migration took {time.perf_counter() - started:.1f} s')
+
+        after = measure(events)
+
+        print(f'before: {before:>10.3f} ms/event')
+        print(f'after:  {after:>10.3f} ms/event')
+        print(f'speedup: {before / after:>9.1f}x')
@@ -0,0 +1,103 @@
+import io
+import os
+import sys
+import time
+import queue
+import logging
+import threading
+
+from contextlib import redirect_stdout
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+receiver_car_path: str = os.path.join(__location__,
+                                      os.pardir,
+                                      'management-system', 'modules', 'receiver-car')
+shared_path: str = os.path.join(__location__,
+                                os.pardir,
+                                'management-system', 'shared')
+cars_path: str = os.path.join(__location__, os.pardir, 'cars')
+
+sys.path.insert(1, receiver_car_path)
+sys.path.insert(1, shared_path)
+sys.path.insert(1, cars_path)
+os.environ.setdefault('MODULE_PORT', '0')
+os.environ.setdefault('MODULE_NAME', 'receiver-car')
+
+import requests
+from werkzeug.serving import make_server
+
+from module import api
+from src.fleet import Fleet
+from src.main import Car
+from src.simulator import TelemetryStream, encode_samples
+
+
+CARS: int = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+TICKS: int = 20
+REQUESTS: int = 2_000
+
+
+class CountingQueue(queue.Queue):
+    """ Очередь к продюсеру, которую разбирает поток-счётчик. """
+
+    def __init__(self):
+        super().__init__()
+        self.samples = 0
+        threading.Thread(target=self._drain, daemon=True).start()
+
+    def _drain(self):
+        while True:
+            details = self.get()
+            for event in details if isinstance(details, list) else [details]:
+                data = event['data']
+                self.samples += len(data) if isinstance(data, list) else 1
+
+
+def start_receiver():
+    server = make_server('127.0.0.1', 0, api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def bench_per_request(url, fleet) -> float:
+    """ Прежний способ: отдельный POST без сессии на каждый образец. """
+    started = time.perf_counter()
+    for n in range(REQUESTS):
+        car = fleet.cars[n % len(fleet)]
+        requests.post(f'{url}/telemetry/{car.brand}', json={'status': car.get_status()})
+    return REQUESTS / (time.perf_counter() - started)
+
+
+def bench_stream(url, fleet) -> float:
+    stream = TelemetryStream(url)
+    indexes = fleet.running_indexes()
+
+    started = time.perf_counter()
+    thread = stream.start()
+    for _ in range(TICKS):
+        fleet.step()
+        stream.put(encode_samples(fleet, indexes, time.time()))
+    stream.close()
+    thread.join()
+    return TICKS * len(indexes) / (time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    fleet = Fleet(seed=1)
+    for n in range(CARS):
+        Car(f'brand-{n}', id=f'car-{n}', fleet=fleet).start()
+
+    api._requests_queue = CountingQueue()
+    server, url = start_receiver()
+
+    with redirect_stdout(io.StringIO()):
+        per_request = bench_per_request(url, fleet)
+        stream = bench_stream(url, fleet)
+    server.shutdown()
+
+    print(f'cars: {CARS:,}, samples received: {api._requests_queue.samples:,}')
+    print(f'per-request POST: {per_request:>12,.0f} samples/s')
+    print(f'NDJSON stream:    {stream:>12,.0f} samples/s')
+    print(f'speedup: {stream / per_request:>16.1f}x')
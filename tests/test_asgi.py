@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import asyncio
+import threading
+import unittest
+import importlib
+
+from unittest import mock
+from importlib.util import module_from_spec, spec_from_file_location
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+com_mobile_path: str = os.path.join(__location__,
+                                    os.pardir,
+                                    'management-system', 'modules', 'com-mobile', 'module')
+shared_path: str = os.path.join(__location__,
+                                os.pardir,
+                                'management-system', 'shared')
+
+sys.path.insert(1, shared_path)
+os.environ.setdefault('MODULE_PORT', '6000')
+
+# Пакет module есть у каждого модуля, шлюз грузится под своим именем
+spec = spec_from_file_location('com_mobile', os.path.join(com_mobile_path, '__init__.py'),
+                               submodule_search_locations=[com_mobile_path])
+sys.modules['com_mobile'] = module_from_spec(spec)
+spec.loader.exec_module(sys.modules['com_mobile'])
+
+asgi = importlib.import_module('com_mobile.asgi')
+
+
+class ReplyingQueue:
+    """ Очередь событий, на которые сразу отвечает «консьюмер». """
+
+    def __init__(self, data):
+        self.data = data
+        self.events = []
+
+    def put(self, details):
+        self.events.append(details)
+        threading.Timer(0.01, asgi.pending_requests.complete,
+                        (details['id'], {'id': details['id'], 'data': self.data})).start()
+
+
+def call(method, path, body=b''):
+    """ Один запрос к ASGI-приложению: (код ответа, тело JSON). """
+    messages = []
+    scope = {'type': 'http', 'method': method, 'path': path}
+    chunks = [{'type': 'http.request', 'body': body[:3], 'more_body': True},
+              {'type': 'http.request', 'body': body[3:], 'more_body': False}]
+
+    async def receive():
+        return chunks.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    start, response = messages
+    return start['status'], json.loads(response['body'])
+
+
+class TestAsgiApp(unittest.TestCase):
+    def setUp(self):
+        self.queue = ReplyingQueue(['min', 'hour'])
+        asgi.set_requests_queue(self.queue)
+        patcher = mock.patch('builtins.print')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reply_from_consumer(self):
+        self.assertEqual(call('GET', '/tariff'), (200, ['min', 'hour']))
+        self.assertEqual(self.queue.events[0]['operation'], 'get_tariff')
+        self.assertEqual(self.queue.events[0]['deliver_to'], 'profile-client')
+        self.assertEqual(len(asgi.pending_requests), 0)
+
+    def test_select_car_body(self):
+        body = json.dumps({'client_name': 'Ivan', 'experience': 3, 'tariff': 'min'}).encode()
+        self.assertEqual(call('POST', '/select/car/Toyota', body)[0], 200)
+        self.assertEqual(self.queue.events[0]['data'], ['Ivan', 3, 'min', 'Toyota'])
+
+    def test_errors(self):
+        self.assertEqual(call('GET', '/missing'), (404, {'status': 404, 'name': 'Not Found'}))
+        self.assertEqual(call('POST', '/cars')[0], 405)
+        self.assertEqual(call('POST', '/select/car/Toyota', b'not json')[0], 400)
+        self.assertEqual(self.queue.events, [])
+
+    def test_timeout(self):
+        asgi.set_requests_queue(mock.Mock())
+        with mock.patch.object(asgi, 'MAX_WAIT_TIME', 0.01):
+            self.assertEqual(call('GET', '/cars'), (200, None))
+        self.assertEqual(len(asgi.pending_requests), 0)
+
+    def test_lifespan(self):
+        sent = []
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(asgi.app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,82 @@
+import os
+import sys
+import unittest
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+manage_drive_path: str = os.path.join(__location__,
+                                      os.pardir,
+                                      'management-system', 'modules', 'manage-drive', 'module')
+
+sys.path.insert(1, manage_drive_path)
+from availability import FreeCars
+
+
+def status(id, brand, occupied_by=None, is_running=False):
+    return {'id': id, 'brand': brand, 'occupied_by': occupied_by, 'is_running': is_running}
+
+
+class TestFreeCars(unittest.TestCase):
+    def setUp(self):
+        self.free_cars = FreeCars()
+        self.free_cars.load([status('car-1', 'Toyota'), status('car-2', 'Toyota'),
+                             status('car-3', 'Ford', 'client', True)])
+
+    def test_snapshot(self):
+        self.assertTrue(self.free_cars.is_warm())
+        self.assertEqual(sorted(self.free_cars.brands()), ['Toyota', 'Toyota'])
+
+    def test_cold_until_loaded(self):
+        self.assertFalse(FreeCars().is_warm())
+
+    def test_resync_keeps_recent_events(self):
+        since = self.free_cars.mark()
+        self.free_cars.reserve('Toyota', 'car-1')
+        self.free_cars.returned(status('car-3', 'Ford'))
+
+        # Снимок прочитан до выдачи car-1 и возврата car-3
+        self.free_cars.load([status('car-1', 'Toyota'), status('car-2', 'Toyota', 'client', True),
+                             status('car-3', 'Ford', 'client', True), status('car-4', 'Lada')], since)
+        self.assertTrue(self.free_cars.is_warm())
+        self.assertEqual(sorted(self.free_cars.brands()), ['Ford', 'Lada'])
+
+    def test_incremental_updates(self):
+        self.assertEqual(self.free_cars.reserve('Toyota'), 'car-1')
+        self.assertEqual(self.free_cars.brands(), ['Toyota'])
+
+        self.free_cars.occupied([status('car-1', 'Toyota', is_running=True),
+                                 status('car-2', 'Toyota', is_running=True)])
+        self.assertEqual(self.free_cars.brands(), [])
+
+        self.free_cars.returned(status('car-3', 'Ford', 'client', True))
+        self.assertEqual(self.free_cars.brands(), ['Ford'])
+
+    def test_reserve_selected_car(self):
+        # Машина выбрана при запросе статуса, доступ подтверждает её же
+        self.assertEqual(self.free_cars.reserve('Toyota'), 'car-1')
+        self.assertEqual(self.free_cars.reserve('Toyota', 'car-1'), 'car-1')
+        self.assertEqual(self.free_cars.brands(), ['Toyota'])
+
+        self.assertEqual(self.free_cars.reserve('car-2', 'car-2'), 'car-2')
+        self.assertIsNone(self.free_cars.reserve('Toyota'))
+        self.assertIsNone(self.free_cars.reserve('Lada'))
+
+    def test_late_telemetry_after_return(self):
+        self.free_cars.reserve('Toyota', 'car-1')
+        self.free_cars.occupied([status('car-1', 'Toyota', 'client', True)])
+        self.free_cars.returned(status('car-1', 'Toyota'))
+
+        # Образец поездки прочитан уже после возврата
+        self.free_cars.occupied([status('car-1', 'Toyota', 'client', True)])
+        self.assertEqual(sorted(self.free_cars.brands()), ['Toyota', 'Toyota'])
+
+        # Следующая поездка снова убирает машину из свободных
+        self.assertEqual(self.free_cars.reserve('Toyota', 'car-1'), 'car-1')
+        self.free_cars.returned(status('car-1', 'Toyota'))
+        self.free_cars.reserve('Toyota', 'car-1')
+        self.free_cars.occupied([status('car-1', 'Toyota', 'client', True)])
+        self.assertEqual(self.free_cars.brands(), ['Toyota'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+import unittest
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+sender_car_path: str = os.path.join(__location__,
+                                    os.pardir,
+                                    'management-system', 'modules', 'sender-car', 'module')
+
+sys.path.insert(1, sender_car_path)
+from dispatcher import CommandDispatcher
+
+
+class TestCommandDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.stopped = threading.Event()
+        self.dispatcher = CommandDispatcher(workers=2, priority_workers=1, window=60)
+
+    def tearDown(self):
+        self.release.set()
+
+    def slow(self):
+        self.release.wait(5)
+
+    def test_stop_not_blocked_by_slow_commands(self):
+        for n in range(4):
+            self.dispatcher.submit(('event', n), self.slow)
+        self.dispatcher.submit(('stop', 'car-1'), self.stopped.set, priority=True)
+        self.assertTrue(self.stopped.wait(1))
+
+    def test_duplicates_merged(self):
+        self.assertTrue(self.dispatcher.submit(('stop', 'car-1'), self.slow, priority=True))
+        self.assertFalse(self.dispatcher.submit(('stop', 'car-1'), self.slow, priority=True))
+        self.assertTrue(self.dispatcher.submit(('stop', 'car-2'), self.slow, priority=True))
+        self.assertTrue(self.dispatcher.submit(None, self.slow))
+        self.assertTrue(self.dispatcher.submit(None, self.slow))
+        self.assertEqual(self.dispatcher.merged, 1)
+
+    def test_merged_until_window_passes(self):
+        dispatcher = CommandDispatcher(workers=1, priority_workers=1, window=0)
+        done = threading.Event()
+        self.assertTrue(dispatcher.submit(('stop', 'car-1'), self.slow, priority=True))
+        # Пока первая остановка выполняется, повтор объединяется
+        self.assertFalse(dispatcher.submit(('stop', 'car-1'), done.set, priority=True))
+        self.release.set()
+        for _ in range(100):
+            if dispatcher.submit(('stop', 'car-1'), done.set, priority=True):
+                break
+            self.stopped.wait(0.01)
+        self.assertTrue(done.wait(1))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+from unittest import mock
+
+import numpy as np
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+shared_path: str = os.path.join(__location__,
+                                os.pardir,
+                                'management-system', 'shared')
+cars_path: str = os.path.join(__location__, os.pardir, 'cars')
+
+sys.path.insert(1, shared_path)
+sys.path.insert(1, cars_path)
+from src.fleet import Fleet
+from src.main import Car
+
+# Пакет src экспортирует функцию main, модуль берётся из sys.modules
+cars_main = sys.modules['src.main']
+simulator = sys.modules['src.simulator']
+
+
+class TestFleet(unittest.TestCase):
+    def setUp(self):
+        self.fleet = Fleet(capacity=2, seed=1)
+
+    def test_indexes(self):
+        first = Car('Toyota', id='car-1', fleet=self.fleet)
+        second = Car('toyota', id='car-2', fleet=self.fleet)
+        Car('Ford', id='car-3', fleet=self.fleet)
+
+        self.assertIs(self.fleet.get('car-2'), second)
+        self.assertIsNone(self.fleet.get('missing'))
+        self.assertEqual(self.fleet.ids_by_brand, {'toyota': ['car-1', 'car-2'], 'ford': ['car-3']})
+        self.assertEqual(self.fleet.find_by_brand('TOYOTA'), [first, second])
+        with self.assertRaises(ValueError):
+            Car('Honda', id='car-1', fleet=self.fleet)
+
+    def test_generated_ids_skip_taken(self):
+        Car('Toyota', id='toyota-2', fleet=self.fleet)
+        self.assertEqual(Car('Toyota', fleet=self.fleet).id, 'toyota-3')
+        self.assertEqual(Car('Ford', fleet=self.fleet).id, 'ford-1')
+
+    def test_state_survives_growth(self):
+        cars = [Car('Lada', fleet=self.fleet) for _ in range(5)]
+        cars[0].coordinates = (1.5, -2.0)
+        cars[0].speed = 42
+        for car in cars[1:]:
+            car.update_coordinates(0, 0)
+
+        self.assertGreaterEqual(self.fleet.capacity, 5)
+        self.assertEqual(len(self.fleet), 5)
+        self.assertEqual(cars[0].coordinates, (1.5, -2.0))
+        self.assertEqual(cars[0].speed, 42)
+
+    def test_step_moves_running_cars(self):
+        cars = [Car('Lada', fleet=self.fleet) for _ in range(3)]
+        cars[1].start()
+        self.assertIsNotNone(cars[1].start_time)
+        self.assertIsNone(cars[0].start_time)
+
+        indexes = self.fleet.step()
+        self.assertEqual(indexes.tolist(), [cars[1].index])
+        self.assertTrue(10 <= cars[1].speed <= 100)
+        self.assertEqual(cars[0].speed, 0)
+        self.assertEqual(cars[0].coordinates, (0.0, 0.0))
+
+        cars[1].stop()
+        self.assertEqual(self.fleet.step().tolist(), [])
+        self.assertEqual(cars[1].speed, 0)
+
+
+class TestCars(unittest.TestCase):
+    def test_load_explicit_ids_first(self):
+        cars = [{'brand': 'Volga'}, {'id': 'volga-1', 'brand': 'Volga'}, {'id': 'volga-1', 'brand': 'Volga'}]
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as file:
+            json.dump(cars, file)
+        try:
+            with mock.patch('builtins.print'):
+                loaded = cars_main.load_cars_from_json(file.name)
+        finally:
+            os.unlink(file.name)
+
+        self.assertEqual([car.id for car in loaded], ['volga-2', 'volga-1'])
+
+    def test_find_car(self):
+        first, second = Car('Moskvich'), Car('Moskvich')
+        first.occupy('client', 'min')
+
+        self.assertIs(cars_main.find_car(second.id), second)
+        self.assertIs(cars_main.find_car(first.id), first)
+        # Занятый автомобиль заменяется свободным той же марки
+        self.assertIs(cars_main.find_car(first.id, free=True), second)
+
+        cars_main.legacy_lookup_logged = False
+        with mock.patch('builtins.print') as log:
+            self.assertIs(cars_main.find_car('moskvich'), first)
+            self.assertIs(cars_main.find_car('Moskvich', free=True), second)
+            self.assertIsNone(cars_main.find_car('Zaporozhets'))
+        self.assertEqual(log.call_count, 1)
+
+
+class TestSimulator(unittest.TestCase):
+    def setUp(self):
+        self.fleet = Fleet(seed=2)
+        self.cars = [Car('Lada', fleet=self.fleet) for _ in range(5)]
+        for car in self.cars[:3]:
+            car.start()
+
+    def test_encode_samples(self):
+        self.fleet.step()
+        indexes = self.fleet.running_indexes()
+        lines = simulator.encode_samples(self.fleet, indexes, self.cars[0].start_time + 1).decode().split('\n')
+
+        self.assertEqual(lines[-2:], ['', ''])
+        samples = [json.loads(line) for line in lines[:-2]]
+        self.assertEqual([sample[0] for sample in samples], [car.id for car in self.cars[:3]])
+        self.assertEqual(samples[0][1:4], ['Lada', 1.0, self.cars[0].speed])
+        self.assertEqual(samples[0][6:], [None, False, False, False, None])
+
+        self.cars[1].occupy('client', 'min')
+        sample = json.loads(simulator.encode_samples(self.fleet, indexes[1:2], 0).decode().split('\n')[0])
+        self.assertEqual(sample[6:], ['client', False, False, False, 'min'])
+
+    def test_batch_transport(self):
+        fleet_simulator = simulator.FleetSimulator('http://receiver', self.fleet, batch_size=2,
+                                                   transport='batch')
+        with mock.patch.object(simulator.http_client, 'post') as post:
+            self.assertEqual(fleet_simulator.step(), 3)
+            fleet_simulator._executor.shutdown(wait=True)
+
+        batches = [call.kwargs['json'] for call in post.call_args_list]
+        self.assertEqual(sorted(len(batch) for batch in batches), [1, 2])
+        self.assertEqual(sorted(status['id'] for batch in batches for status in batch),
+                         [car.id for car in self.cars[:3]])
+        self.assertTrue(all(status['is_running'] for batch in batches for status in batch))
+        self.assertTrue(np.all(self.fleet.speed[[car.index for car in self.cars[3:]]] == 0))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,61 @@
+import os
+import sys
+import socket
+import unittest
+
+import requests
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+shared_path: str = os.path.join(__location__,
+                                os.pardir,
+                                'management-system', 'shared')
+
+sys.path.insert(1, shared_path)
+from runtime.http_client import HttpClient, LatencyHistogram
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_quantiles(self):
+        histogram = LatencyHistogram()
+        for _ in range(98):
+            histogram.observe(0.004)
+        histogram.observe(0.2)
+        histogram.observe(3, ok=False)
+
+        stats = histogram.snapshot()
+        self.assertEqual(stats['total'], 100)
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['p50_ms'], 5)
+        self.assertEqual(stats['p99_ms'], 250)
+        self.assertEqual(histogram.quantile(1.0), 5000)
+
+
+class TestHttpClient(unittest.TestCase):
+    def setUp(self):
+        self.client = HttpClient({'retries': '2', 'backoff': '0', 'stats.interval': '0'})
+        self.url = f'http://127.0.0.1:{unused_port()}/cars/status'
+
+    def test_retries_refused_connection(self):
+        for method in ('GET', 'POST'):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.client.request(method, self.url)
+
+        # Первая попытка и два повтора на каждый метод
+        self.assertEqual(self.client.histograms[f'GET {self.url[7:-7]}'].total, 3)
+        self.assertEqual(self.client.histograms[f'POST {self.url[7:-7]}'].total, 3)
+
+    def test_endpoint_label(self):
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.get(self.url, endpoint='cars')
+        self.assertEqual(list(self.client.histograms), ['cars'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,312 @@
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import unittest
+
+from unittest import mock
+
+from importlib.util import module_from_spec, spec_from_file_location
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+shared_path: str = os.path.join(__location__,
+                                os.pardir,
+                                'management-system', 'shared')
+payment_main_path: str = os.path.join(__location__,
+                                      os.pardir,
+                                      'payment-system', 'src', 'main.py')
+
+sys.path.insert(1, shared_path)
+_database = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+_database.close()
+os.environ['PAYMENT_DATABASE_URI'] = f'sqlite:///{_database.name}'
+
+# Старая схема: клиенты без нормализованного имени, с повторами
+with sqlite3.connect(_database.name) as connection:
+    connection.execute('CREATE TABLE client (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL)')
+    connection.executemany('INSERT INTO client (name) VALUES (?)',
+                           [('Иван',), ('иван ',), ('Ivanov',)])
+
+spec = spec_from_file_location('payment_main', payment_main_path)
+payment = module_from_spec(spec)
+spec.loader.exec_module(payment)
+
+
+def tearDownModule():
+    os.unlink(_database.name)
+
+
+class TestClients(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = payment.app.test_client()
+
+    def post_client(self, name):
+        response = self.client.post('/clients', json={'name': name})
+        return response.status_code, response.get_json()
+
+    def test_migrated_duplicates(self):
+        status, body = self.post_client('ИВАН')
+        self.assertEqual((status, body), (200, [{'id': 1, 'name': 'Иван'}]))
+        with sqlite3.connect(_database.name) as connection:
+            self.assertEqual(connection.execute('PRAGMA user_version').fetchone()[0],
+                             len(payment.MIGRATIONS))
+
+    def test_exact_match(self):
+        status, body = self.post_client('Ivan')
+        self.assertEqual(status, 201)
+        self.assertEqual(body[0]['name'], 'Ivan')
+        self.assertNotEqual(body[0]['id'], 3)
+
+        # Повторный запрос берёт клиента из кэша
+        self.assertEqual(self.post_client(' ivan'), (200, body))
+        self.assertEqual(payment.client_cache.get('ivan'), (body[0]['id'], 'Ivan'))
+
+    def test_name_required(self):
+        self.assertEqual(self.post_client(' ')[0], 400)
+
+
+class TestBulk(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = payment.app.test_client()
+
+    def test_bulk(self):
+        items = [{'client_name': 'Bulk A', 'amount': 10, 'kind': 'invoice'},
+                 {'client_name': 'Иван', 'amount': 20, 'kind': 'prepayment'},
+                 {'client_name': 'bulk a', 'amount': 30, 'kind': 'prepayment'}]
+        response = self.client.post('/bulk', json={'items': items})
+        self.assertEqual(response.status_code, 201)
+        result = response.get_json()['items']
+
+        self.assertEqual([item['kind'] for item in result], ['invoice', 'prepayment', 'prepayment'])
+        self.assertEqual([item['amount'] for item in result], [10, 20, 30])
+        self.assertEqual(result[1]['client_id'], 1)
+        self.assertEqual(result[0]['client_id'], result[2]['client_id'])
+        self.assertEqual(self.client.get(f"/invoices/{result[0]['id']}").get_json()['amount'], 10)
+        self.assertEqual(payment.client_cache.get('bulk a'), (result[0]['client_id'], 'Bulk A'))
+
+    def test_invalid_item_rejects_batch(self):
+        items = [{'client_name': 'Bulk B', 'amount': 10, 'kind': 'invoice'},
+                 {'client_name': 'Bulk B', 'amount': 10, 'kind': 'refund'}]
+        self.assertEqual(self.client.post('/bulk', json={'items': items}).status_code, 400)
+        self.assertIsNone(payment.client_cache.get('bulk b'))
+
+
+class TestArchive(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = payment.app.test_client()
+
+    def test_archive_settled(self):
+        items = [{'client_name': 'Archive', 'amount': amount, 'kind': 'invoice'}
+                 for amount in (1, 2, 3)]
+        ids = [item['id'] for item in
+               self.client.post('/bulk', json={'items': items}).get_json()['items']]
+        for invoice_id in ids[:2]:
+            self.client.post(f'/invoices/{invoice_id}/confirm')
+
+        pending = self.client.get(f'/invoices/{ids[2]}/receipt')
+        self.assertEqual(pending.headers['Cache-Control'], 'no-cache')
+
+        with payment.app.app_context():
+            self.assertEqual(payment.archive_settled(chunk_size=1), 2)
+            self.assertEqual(payment.archive_settled(), 0)
+
+        # Архивный счёт в рабочей таблице не найден
+        self.assertEqual(self.client.get(f'/invoices/{ids[0]}').status_code, 404)
+        self.assertEqual(self.client.get(f'/invoices/{ids[2]}').get_json()['amount'], 3)
+
+        # Подтверждение архивного счёта - 404 и при повторах с тем же ключом
+        for _ in range(2):
+            response = self.client.post(f'/invoices/{ids[0]}/confirm',
+                                        headers={'Idempotency-Key': 'confirm-archived'})
+            self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.post('/prepayment/999999/confirm').status_code, 404)
+        for listing in ('invoices', 'archived_invoices', 'prepayments'):
+            self.assertEqual(self.client.get(f'/clients/999999/{listing}').status_code, 404)
+        self.assertEqual(self.client.get('/clients/999999').status_code, 404)
+
+        # Чек читается из архива по исходному ID и не меняет данные
+        for _ in range(2):
+            response = self.client.get(f'/invoices/{ids[1]}/receipt')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['receipt']['id'], ids[1])
+            self.assertEqual(response.get_json()['receipt']['status'], 'paid')
+        self.assertIn('max-age', response.headers['Cache-Control'])
+
+        cached = self.client.get(f'/invoices/{ids[1]}/receipt',
+                                 headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get('/invoices/999999/receipt').status_code, 404)
+
+
+class TestListings(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = payment.app.test_client()
+        items = [{'client_name': 'Pages', 'amount': amount, 'kind': 'prepayment'}
+                 for amount in range(5)]
+        result = cls.client.post('/bulk', json={'items': items}).get_json()['items']
+        cls.client_id = result[0]['client_id']
+        cls.ids = [item['id'] for item in result]
+
+    def test_keyset_pages(self):
+        url = f'/clients/{self.client_id}/prepayments'
+        ids, after_id = [], 0
+        while after_id is not None:
+            response = self.client.get(url, query_string={'after_id': after_id, 'limit': 2})
+            ids += [item['id'] for item in response.get_json()]
+            after_id = response.headers.get('X-Next-After-Id')
+        self.assertEqual(ids, self.ids)
+        self.assertEqual(len(self.client.get(url).get_json()), 5)
+
+    def test_ndjson_export(self):
+        response = self.client.get(f'/clients/{self.client_id}/prepayments',
+                                   query_string={'format': 'ndjson', 'after_id': self.ids[1]})
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([row['id'] for row in rows], self.ids[2:])
+        self.assertEqual([row['amount'] for row in rows], [2, 3, 4])
+
+
+class TestIdempotency(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = payment.app.test_client()
+
+    def count(self, model):
+        with payment.app.app_context():
+            return model.query.count()
+
+    def test_replayed_response(self):
+        client_id = self.client.post('/clients', json={'name': 'Replay'}).get_json()[0]['id']
+        invoices = self.count(payment.Invoice)
+
+        headers = {'Idempotency-Key': 'event-1'}
+        first = self.client.post('/invoices', json={'client_id': client_id, 'amount': 5}, headers=headers)
+        replay = self.client.post('/invoices', json={'client_id': client_id, 'amount': 5}, headers=headers)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((replay.status_code, replay.get_json()), (201, first.get_json()))
+        self.assertEqual(replay.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.count(payment.Invoice), invoices + 1)
+
+        # Ключ действует в пределах пути
+        other = self.client.post(f'/clients/{client_id}/prepayment', json={'amount': 5}, headers=headers)
+        self.assertNotIn('Idempotent-Replayed', other.headers)
+
+    def test_bulk_item_keys(self):
+        items = [{'client_name': 'Replay bulk', 'amount': 1, 'kind': 'invoice', 'idempotency_key': 'a'},
+                 {'client_name': 'Replay bulk', 'amount': 2, 'kind': 'prepayment'}]
+        first = self.client.post('/bulk', json={'items': items}).get_json()['items']
+        invoices = self.count(payment.Invoice)
+
+        items.append({'client_name': 'Replay bulk', 'amount': 1, 'kind': 'invoice', 'idempotency_key': 'a'})
+        second = self.client.post('/bulk', json={'items': items}).get_json()['items']
+        self.assertEqual(second[0], first[0])
+        self.assertEqual(second[2], first[0])
+        self.assertNotEqual(second[1]['id'], first[1]['id'])
+        self.assertEqual(self.count(payment.Invoice), invoices)
+
+    def test_expired_lease_reclaimed(self):
+        client_id = self.client.post('/clients', json={'name': 'Lease'}).get_json()[0]['id']
+        headers = {'Idempotency-Key': 'crashed'}
+        now = payment.datetime.utcnow()
+        with payment.app.app_context():
+            # Запрос занял ключ и не завершился
+            payment.db.session.add(payment.IdempotencyKey(
+                key='crashed', path='/invoices', locked_until=now + payment.timedelta(seconds=60),
+                expires_at=now + payment.timedelta(seconds=600)))
+            payment.db.session.commit()
+
+        body = {'client_id': client_id, 'amount': 7}
+        self.assertEqual(self.client.post('/invoices', json=body, headers=headers).status_code, 409)
+
+        with payment.app.app_context():
+            payment.IdempotencyKey.query.filter_by(key='crashed').update({'locked_until': now})
+            payment.db.session.commit()
+        with mock.patch('builtins.print'):
+            first = self.client.post('/invoices', json=body, headers=headers)
+        replay = self.client.post('/invoices', json=body, headers=headers)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((replay.status_code, replay.get_json()), (201, first.get_json()))
+
+    def test_lost_lease_not_stored(self):
+        client_id = self.client.post('/clients', json={'name': 'Lost lease'}).get_json()[0]['id']
+        view = payment.app.view_functions['create_invoice'].__wrapped__
+
+        def purge_and_create(*args, **kwargs):
+            # Пока запрос выполнялся, ключ удалён обслуживанием
+            payment.IdempotencyKey.query.filter_by(key='purged').delete()
+            payment.db.session.commit()
+            return view(*args, **kwargs)
+
+        with mock.patch.dict(payment.app.view_functions,
+                             {'create_invoice': payment.idempotent(purge_and_create)}), \
+                mock.patch('builtins.print') as log:
+            response = self.client.post('/invoices', json={'client_id': client_id, 'amount': 3},
+                                        headers={'Idempotency-Key': 'purged'})
+        self.assertEqual(response.status_code, 201)
+        log.assert_called_once_with('[error] idempotency key purged lease lost, response not stored')
+        with payment.app.app_context():
+            self.assertIsNone(payment.db.session.get(payment.IdempotencyKey, ('purged', '/invoices')))
+
+    def test_expired_keys(self):
+        with payment.app.app_context():
+            payment.db.session.add(payment.IdempotencyKey(
+                key='old', path='/clients', status_code=200, response='[]',
+                expires_at=payment.datetime.utcnow()))
+            payment.db.session.commit()
+            self.assertEqual(payment.purge_idempotency_keys(), 1)
+
+
+class TestOutbox(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = payment.app.test_client()
+
+    def setUp(self):
+        with payment.app.app_context():
+            payment.OutboxMessage.query.delete()
+            payment.db.session.commit()
+
+    def outbox(self):
+        with payment.app.app_context():
+            return [(message.path, message.attempts)
+                    for message in payment.OutboxMessage.query.order_by(payment.OutboxMessage.id)]
+
+    def deliver(self, status_code=200):
+        with payment.app.app_context(), \
+                mock.patch.object(payment.http_client, 'post',
+                                  return_value=mock.Mock(status_code=status_code)) as post:
+            payment.deliver_outbox()
+        return post
+
+    def test_confirm_writes_outbox(self):
+        client_id = self.client.post('/clients', json={'name': 'Outbox'}).get_json()[0]['id']
+        invoice_id = self.client.post('/invoices', json={'client_id': client_id, 'amount': 10}).get_json()['id']
+
+        with mock.patch.object(payment.http_client, 'post') as post:
+            response = self.client.post(f'/invoices/{invoice_id}/confirm')
+        self.assertEqual(response.get_json(), {'id': invoice_id, 'status': 'paid'})
+        post.assert_not_called()
+        self.assertEqual(self.outbox(), [('/confirm_payment/Outbox', 0)])
+
+        # bank-pay недоступен: сообщение остаётся и ждёт повтора
+        self.deliver(503)
+        self.assertEqual(self.outbox(), [('/confirm_payment/Outbox', 1)])
+        self.assertEqual(self.deliver().call_count, 0)
+
+        with payment.app.app_context():
+            payment.OutboxMessage.query.update({'next_attempt_at': payment.datetime.utcnow()})
+            payment.db.session.commit()
+        post = self.deliver()
+        post.assert_called_once_with(f'{payment.MANAGMENT_URL}/confirm_payment/Outbox',
+                                     json={'id': invoice_id, 'status': 'paid'})
+        self.assertEqual(self.outbox(), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
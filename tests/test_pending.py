@@ -0,0 +1,68 @@
+import os
+import sys
+import asyncio
+import threading
+import unittest
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+com_mobile_path: str = os.path.join(__location__,
+                                    os.pardir,
+                                    'management-system', 'modules', 'com-mobile', 'module')
+
+sys.path.insert(1, com_mobile_path)
+from pending import PendingRequests
+
+
+class TestPendingRequests(unittest.TestCase):
+    def setUp(self):
+        self.pending = PendingRequests()
+
+    def test_complete_from_other_thread(self):
+        self.pending.register('event-1')
+        self.assertEqual(len(self.pending), 1)
+
+        threading.Timer(0.01, self.pending.complete, ('event-1', {'data': 1})).start()
+        self.assertEqual(self.pending.wait('event-1', 1), {'data': 1})
+        self.assertEqual(len(self.pending), 0)
+
+    def test_timeout_discards_request(self):
+        self.pending.register('event-1')
+        self.assertIsNone(self.pending.wait('event-1', 0.01))
+        self.assertEqual(len(self.pending), 0)
+
+        # Ответ пришёл после таймаута
+        self.assertFalse(self.pending.complete('event-1', {'data': 1}))
+
+    def test_orphaned_replies_dropped(self):
+        self.assertFalse(self.pending.complete('unknown', {'data': 1}))
+        self.assertIsNone(self.pending.wait('unknown', 0.01))
+
+        self.pending.register('event-1')
+        self.assertTrue(self.pending.complete('event-1', {'data': 1}))
+        self.assertFalse(self.pending.complete('event-1', {'data': 2}))
+        self.assertEqual(self.pending.wait('event-1', 0), {'data': 1})
+
+    def test_discard(self):
+        future = self.pending.register('event-1')
+        self.pending.discard('event-1')
+        self.pending.discard('event-1')
+
+        self.assertEqual(len(self.pending), 0)
+        self.assertFalse(self.pending.complete('event-1', {'data': 1}))
+        self.assertFalse(future.done())
+
+    def test_wait_async(self):
+        async def scenario():
+            self.pending.register('event-1')
+            self.pending.register('event-2')
+            threading.Timer(0.01, self.pending.complete, ('event-1', {'data': 1})).start()
+            return await asyncio.gather(self.pending.wait_async('event-1', 1),
+                                        self.pending.wait_async('event-2', 0.05))
+
+        self.assertEqual(asyncio.run(scenario()), [{'data': 1}, None])
+        self.assertEqual(len(self.pending), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
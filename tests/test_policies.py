@@ -13,7 +13,7 @@ if not os.path.exists:
     exit(1)
 else:
     sys.path.insert(1, monitor_path)
-    from policies import policies, check_operation
+    from policies import policies, check_operation, compile_policies, is_allowed
 
 
 length: int = len(policies)
@@ -209,6 +209,27 @@ class TestOperation(unittest.TestCase):
 
             self.assertEqual(result, op[2])
 
+    def test_operation_rules(self):
+        index = compile_policies((
+            {'src': 'verify', 'dst': 'auth', 'operation': 'get_cars'},
+            {'src': 'verify', 'dst': 'auth', 'operation': 'get_status'},
+            {'src': 'auth', 'dst': 'sender-car', 'operation': 'stop'},
+            {'src': 'auth', 'dst': 'sender-car'}
+        ))
+
+        ops = (
+            ('verify', 'auth', 'get_cars', True),
+            ('verify', 'auth', 'get_status', True),
+            ('verify', 'auth', 'confirm_access', False),
+            ('verify', 'auth', None, False),
+            ('auth', 'sender-car', 'stop', True),
+            ('auth', 'sender-car', 'get_cars', True),
+            ('auth', 'verify', 'get_cars', False)
+        )
+
+        for op in ops:
+            self.assertEqual(is_allowed(index, op[0], op[1], op[2]), op[3])
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
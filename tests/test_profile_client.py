@@ -0,0 +1,147 @@
+import os
+import sys
+import unittest
+import importlib
+
+from unittest import mock
+from importlib.util import module_from_spec, spec_from_file_location
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+profile_client_path: str = os.path.join(__location__,
+                                        os.pardir,
+                                        'management-system', 'modules',
+                                        'profile-client', 'module')
+shared_path: str = os.path.join(__location__,
+                                os.pardir,
+                                'management-system', 'shared')
+
+sys.path.insert(1, shared_path)
+
+# Пакет module есть у каждого модуля, профиль клиента грузится под своим именем
+spec = spec_from_file_location('profile_client', os.path.join(profile_client_path, '__init__.py'),
+                               submodule_search_locations=[profile_client_path])
+sys.modules['profile_client'] = module_from_spec(spec)
+spec.loader.exec_module(sys.modules['profile_client'])
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+db = importlib.import_module('profile_client.db')
+consumer = importlib.import_module('profile_client.consumer')
+
+
+# Схема таблицы до миграции: без индексов по client_name и car
+LEGACY_SCHEMA = """
+CREATE TABLE clients (
+    id INTEGER NOT NULL PRIMARY KEY,
+    client_name VARCHAR(100) NOT NULL,
+    experience INTEGER NOT NULL,
+    car VARCHAR(100),
+    prepayment INTEGER,
+    prepayment_status VARCHAR(100),
+    tariff VARCHAR(100),
+    elapsed_time FLOAT
+)
+"""
+
+
+def legacy_engine(rows):
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.exec_driver_sql(LEGACY_SCHEMA)
+        connection.exec_driver_sql(
+            "INSERT INTO clients (client_name, experience, car) VALUES (?, ?, ?)", rows)
+    return engine
+
+
+class TestMigration(unittest.TestCase):
+    def version(self, engine):
+        with engine.connect() as connection:
+            return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+    def test_duplicates_abort(self):
+        engine = legacy_engine([('Ivan', 1, 'Toyota'), ('Ivan', 2, None),
+                                ('Petr', 3, 'Ford'), ('Anna', 4, 'Ford')])
+        with mock.patch('builtins.print') as report, self.assertRaises(db.DuplicateClientsError):
+            with engine.begin() as connection:
+                db.migrate(connection)
+
+        lines = [call.args[0] for call in report.call_args_list if call.args[0].startswith('[error]')]
+        self.assertEqual(lines, ["[error] duplicate client 'Ivan': records [1, 2]",
+                                 "[error] duplicate car 'Ford': held by records [3, 4]"])
+        with engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql("SELECT COUNT(*) FROM clients").scalar(), 4)
+        self.assertEqual(self.version(engine), 0)
+
+    def test_clean_table(self):
+        engine = legacy_engine([('Ivan', 1, ''), ('Petr', 3, 'Ford')])
+        with mock.patch('builtins.print'), engine.begin() as connection:
+            db.migrate(connection)
+
+        self.assertEqual(self.version(engine), len(db.MIGRATIONS))
+        with engine.connect() as connection:
+            self.assertIsNone(connection.exec_driver_sql(
+                "SELECT car FROM clients WHERE client_name = 'Ivan'").scalar())
+
+
+class TestSelectCar(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        db.Base.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+
+    def tearDown(self):
+        self.session.close()
+
+    def process(self, id, details):
+        with mock.patch('builtins.print'):
+            result = consumer.process_event(self.session, id, details)
+        self.session.flush()
+        return result
+
+    def select(self, id, name, brand):
+        return self.process(id, {'operation': 'select_car', 'data': [name, 1, 'min', brand]})
+
+    def answer(self, id, car_id, brand='Toyota'):
+        status = {'id': car_id, 'brand': brand, 'has_air_conditioner': True,
+                  'has_heater': False, 'has_navigator': False}
+        return self.process(id, {'operation': 'answer_status', 'data': status})
+
+    def test_two_cars_of_one_brand(self):
+        for id, name in (('select-1', 'Ivan'), ('select-2', 'Petr')):
+            send, details = self.select(id, name, 'Toyota')
+            self.assertIs(send, consumer.send_to_manage_drive)
+            self.assertEqual((details['operation'], details['data']), ('get_status', 'Toyota'))
+
+        # Статусы приходят с id событий выбора и закрепляют разные машины
+        self.assertEqual(self.answer('select-2', 'toyota-2')[1]['data'], ['Petr', 7])
+        self.assertEqual(self.answer('select-1', 'toyota-1')[1]['data'], ['Ivan', 7])
+        self.assertEqual(db.find_client(self.session, 'Ivan').car, 'toyota-1')
+        self.assertEqual(db.find_client(self.session, 'Petr').car, 'toyota-2')
+
+        access = consumer.access(self.session, 'Ivan')
+        self.assertIsNone(access)
+        consumer.confirm_prepayment(self.session, 'Ivan', 'paid')
+        with mock.patch('builtins.print'):
+            access = consumer.access(self.session, 'Ivan')
+        self.assertEqual((access['car'], access['car_id']), ('toyota-1', 'toyota-1'))
+
+    def test_car_taken(self):
+        self.select('select-1', 'Ivan', 'Toyota')
+        self.answer('select-1', 'toyota-1')
+
+        self.select('select-2', 'Petr', 'Toyota')
+        send, details = self.answer('select-2', 'toyota-1')
+        self.assertIs(send, consumer.send_to_com_mobile)
+        self.assertEqual(details['operation'], 'select_refused')
+        self.assertEqual(details['data'], {'access': False, 'reason': 'car_taken', 'car': 'toyota-1'})
+        self.assertIsNone(db.find_client(self.session, 'Petr').car)
+
+        # Тот же клиент выбирает ту же машину повторно
+        self.select('select-3', 'Ivan', 'Toyota')
+        self.assertEqual(self.answer('select-3', 'toyota-1')[1]['operation'], 'get_prepayment_id')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
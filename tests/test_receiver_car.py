@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import time
+import queue
+import threading
+import unittest
+import importlib
+
+from unittest import mock
+from importlib.util import module_from_spec, spec_from_file_location
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+receiver_car_path: str = os.path.join(__location__,
+                                      os.pardir,
+                                      'management-system', 'modules', 'receiver-car', 'module')
+shared_path: str = os.path.join(__location__,
+                                os.pardir,
+                                'management-system', 'shared')
+
+sys.path.insert(1, shared_path)
+os.environ.setdefault('MODULE_PORT', '6000')
+
+# Пакет module есть у каждого модуля, приёмник грузится под своим именем
+spec = spec_from_file_location('receiver_car', os.path.join(receiver_car_path, '__init__.py'),
+                               submodule_search_locations=[receiver_car_path])
+sys.modules['receiver_car'] = module_from_spec(spec)
+spec.loader.exec_module(sys.modules['receiver_car'])
+
+api = importlib.import_module('receiver_car.api')
+
+from runtime.producer import ProducerStats
+
+
+class TestTelemetryStream(unittest.TestCase):
+    def test_expand_sample(self):
+        status = api.expand_sample(['lada-1', 'Lada', 1.5, 60, 1.0, 2.0,
+                                    'client', True, False, True, 'min'])
+        self.assertEqual(status, {'id': 'lada-1', 'brand': 'Lada', 'is_running': True,
+                                  'speed': 60, 'coordinates': [1.0, 2.0], 'trip_time': 1.5,
+                                  'occupied_by': 'client', 'has_air_conditioner': True,
+                                  'has_heater': False, 'has_navigator': True, 'tariff': 'min'})
+
+        # Прежний формат из шести полей
+        legacy = api.expand_sample(['lada-1', 'Lada', 1.5, 60, 1.0, 2.0])
+        self.assertEqual(set(legacy), {'id', 'brand', 'is_running', 'speed', 'coordinates', 'trip_time'})
+        with self.assertRaises(ValueError):
+            api.expand_sample(['lada-1', 'Lada'])
+
+    def test_stream_keeps_status_fields(self):
+        requests_queue = queue.Queue()
+        lines = [json.dumps(['lada-1', 'Lada', 1.5, 60, 1.0, 2.0, 'client', True, False, True, 'min']),
+                 json.dumps(['lada-2', 'Lada', 0.5, 30, 0.0, 0.0]), '']
+        with mock.patch.object(api, '_requests_queue', requests_queue), \
+                mock.patch.object(api, '_producer_stats', ProducerStats()):
+            response = api.app.test_client().post('/telemetry/stream',
+                                                  data='\n'.join(lines) + '\n',
+                                                  content_type=api.NDJSON_MIMETYPE)
+        self.assertEqual(response.get_json(), {'samples': 2})
+
+        samples = [sample for event in requests_queue.get_nowait() for sample in event['data']]
+        first = next(sample for sample in samples if sample['id'] == 'lada-1')
+        self.assertEqual((first['occupied_by'], first['tariff'], first['has_navigator']),
+                         ('client', 'min', True))
+
+    def test_wait_for_kafka(self):
+        stats = ProducerStats()
+        stats.record_produced(api.STREAM_HIGH_WATER + 1)
+        # Подтверждение доставки приходит из потока опроса продюсера
+        threading.Timer(0.05, stats.record_delivery, (None, 0.01)).start()
+
+        started = time.monotonic()
+        with mock.patch.object(api, '_producer_stats', stats):
+            api.wait_for_producer()
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+        self.assertEqual(stats.snapshot()['in_flight'], api.STREAM_HIGH_WATER)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,139 @@
+import os
+import sys
+import threading
+import unittest
+
+from unittest import mock
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+control_drive_path: str = os.path.join(__location__,
+                                       os.pardir,
+                                       'management-system', 'modules', 'control-drive')
+shared_path: str = os.path.join(__location__,
+                                os.pardir,
+                                'management-system', 'shared')
+
+sys.path.insert(1, control_drive_path)
+sys.path.insert(1, shared_path)
+import numpy as np
+
+from module.rules import RuleEngine, load_rules
+from module.windows import TelemetryWindows
+
+
+RULES = {
+    'speed_limit': 200,
+    'max_trip_time': 3600,
+    'grid_cell_size': 10,
+    'geofences': [
+        {'name': 'airport', 'polygon': [[40, 40], [60, 40], [60, 55], [40, 55]]},
+        {'name': 'school', 'polygon': [[0, 0], [10, 0], [5, 10]], 'max_speed': 40},
+    ]
+}
+
+
+def sample(speed=50, x=-100.0, y=-100.0, trip_time=10):
+    return {'brand': 'car', 'speed': speed, 'coordinates': [x, y], 'trip_time': trip_time}
+
+
+class TestRuleEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = RuleEngine(RULES)
+
+    def test_thresholds(self):
+        hits = self.engine.evaluate([sample(), sample(speed=250), sample(trip_time=4000)])
+        self.assertEqual(hits, {1: 'speed_limit', 2: 'max_trip_time'})
+
+    def test_forbidden_zone(self):
+        hits = self.engine.evaluate([sample(x=50, y=50), sample(x=39, y=50), sample(x=61, y=41)])
+        self.assertEqual(hits, {0: 'geofence:airport'})
+
+    def test_speed_zone(self):
+        hits = self.engine.evaluate([sample(speed=30, x=5, y=3), sample(speed=60, x=5, y=3),
+                                     sample(speed=60, x=9, y=9)])
+        self.assertEqual(hits, {1: 'geofence:school'})
+
+    def test_grid_lists_only_overlapping_fences(self):
+        self.assertEqual(self.engine.index.cells.get((4, 4)), [0])
+        self.assertEqual(self.engine.index.cells.get((0, 0)), [1])
+        self.assertIsNone(self.engine.index.cells.get((2, 2)))
+
+    def test_empty_batch(self):
+        self.assertEqual(self.engine.evaluate([]), {})
+
+    def test_malformed_fence_skipped(self):
+        rules = dict(RULES, geofences=[{'name': 'broken', 'polygon': [[0, 0], [1, 1]]},
+                                       {'polygon': [[0, 0], [1, 0], [0, 1]]},
+                                       {'name': 'bad speed', 'polygon': [[0, 0], [1, 0], [0, 1]],
+                                        'max_speed': 'fast'},
+                                       RULES['geofences'][0]])
+        with mock.patch('builtins.print') as report:
+            engine = RuleEngine(rules)
+        self.assertEqual(report.call_count, 3)
+        self.assertEqual([fence.name for fence in engine.geofences], ['airport'])
+        self.assertEqual(engine.evaluate([sample(x=50, y=50)]), {0: 'geofence:airport'})
+
+    def test_default_rules_pass_simulated_cars(self):
+        engine = load_rules(os.path.join(control_drive_path, 'config', 'rules.json'))
+        self.assertEqual(engine.geofences, [])
+        self.assertIsNone(engine.windows)
+        samples = [sample(speed=speed, x=-15, y=-10, trip_time=t)
+                   for t, speed in enumerate([10, 100, 10, 100, 10, 100, 10])]
+        self.assertEqual(engine.evaluate(samples), {})
+
+        example = load_rules(os.path.join(control_drive_path, 'config', 'rules.example.json'))
+        self.assertEqual([fence.name for fence in example.geofences], ['airport', 'school'])
+
+
+class TestTelemetryWindows(unittest.TestCase):
+    def test_rolling_aggregates(self):
+        windows = TelemetryWindows(size=4)
+        for t, speed, x in [(0, 10, 0), (1, 20, 3), (2, 90, 7), (3, 30, 7), (4, 40, 8)]:
+            rows = windows.update(['a'], np.array([t]), np.array([speed]),
+                                  np.array([x]), np.array([0]))
+
+        aggregates = windows.aggregates(rows)
+        # Первый образец вытеснен из окна на 4 образца
+        self.assertAlmostEqual(aggregates['average_speed'][0], 45)
+        self.assertEqual(aggregates['max_speed'][0], 90)
+        self.assertAlmostEqual(aggregates['distance'][0], 5)
+        self.assertEqual(aggregates['spikes'][0], 2)
+        self.assertEqual(aggregates['span'][0], 3)
+
+    def test_new_trip_resets_window(self):
+        windows = TelemetryWindows(size=4)
+        windows.update(['a', 'a'], np.array([5, 6]), np.array([10, 10]),
+                       np.array([0, 1]), np.array([0, 0]))
+        rows = windows.update(['a'], np.array([0]), np.array([10]),
+                              np.array([0]), np.array([0]))
+        self.assertEqual(windows.count[rows][0], 1)
+        self.assertEqual(windows.distance[rows][0], 0)
+
+    def test_check_runs_under_lock(self):
+        windows = TelemetryWindows(size=4)
+        released = threading.Event()
+
+        def check(rows):
+            # Другой обработчик не может освободить окно, пока идёт проверка
+            threading.Thread(target=lambda: (windows.release('a'), released.set())).start()
+            self.assertFalse(released.wait(0.05))
+            return windows.aggregates(rows)['max_speed'].tolist()
+
+        result = windows.update(['a'], np.array([0]), np.array([50]),
+                                np.array([0]), np.array([0]), check=check)
+        self.assertEqual(result, [50])
+        self.assertTrue(released.wait(1))
+        self.assertNotIn('a', windows.rows)
+
+    def test_sustained_overspeed(self):
+        engine = RuleEngine({'windows': {'sustained_overspeed': {'speed': 100, 'duration': 3}}})
+        speeds = [120, 130, 90, 120, 125, 130, 140]
+        hits = [engine.evaluate([sample(speed=speed, trip_time=t)])
+                for t, speed in enumerate(speeds)]
+        self.assertEqual([bool(hit) for hit in hits],
+                         [False, False, False, False, False, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import threading
+import unittest
+
+from argparse import Namespace
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+shared_path: str = os.path.join(__location__,
+                                os.pardir,
+                                'management-system', 'shared')
+
+sys.path.insert(1, shared_path)
+from runtime.consumer import ConsumerRuntime, OffsetTracker, field_key
+
+
+class FakeMessage:
+    def __init__(self, offset, key, value, partition=0):
+        self._offset = offset
+        self._key = key
+        self._value = value
+        self._partition = partition
+
+    def error(self):
+        return None
+
+    def topic(self):
+        return 'test'
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+    def key(self):
+        return self._key.encode('utf-8')
+
+    def value(self):
+        return self._value.encode('utf-8')
+
+
+class TestOffsetTracker(unittest.TestCase):
+    def test_prefix(self):
+        tracker = OffsetTracker()
+        for offset in range(5):
+            tracker.add('test', 0, offset)
+
+        tracker.done('test', 0, 1, 0)
+        tracker.done('test', 0, 2, 0)
+        self.assertEqual(tracker.drain(), {})
+
+        tracker.done('test', 0, 0, 0)
+        self.assertEqual(tracker.drain(), {('test', 0): 3})
+
+        tracker.done('test', 0, 4, 0)
+        self.assertEqual(tracker.drain(), {})
+        self.assertEqual(tracker.in_flight, 1)
+
+        tracker.done('test', 0, 3, 0)
+        self.assertEqual(tracker.drain(), {('test', 0): 5})
+        self.assertEqual(tracker.in_flight, 0)
+
+    def test_forget(self):
+        tracker = OffsetTracker()
+        for offset in range(3):
+            tracker.add('test', 0, offset)
+        tracker.done('test', 0, 2, 0)
+
+        tracker.forget([('test', 0)])
+        tracker.done('test', 0, 0, 0)
+
+        self.assertEqual(tracker.drain(), {})
+        self.assertEqual(tracker.in_flight, 0)
+
+    def test_stale_done_after_reassign(self):
+        tracker = OffsetTracker()
+        old = [tracker.add('test', 0, offset) for offset in range(2)]
+        tracker.forget([('test', 0)])
+
+        # Раздел снова назначен, события перечитаны с того же смещения
+        new = [tracker.add('test', 0, offset) for offset in range(2)]
+        self.assertNotEqual(old, new)
+
+        for offset, generation in enumerate(old):
+            tracker.done('test', 0, offset, generation)
+        self.assertEqual(tracker.drain(), {})
+        self.assertEqual(tracker.in_flight, 2)
+
+        for offset, generation in enumerate(new):
+            tracker.done('test', 0, offset, generation)
+        self.assertEqual(tracker.drain(), {('test', 0): 2})
+        self.assertEqual(tracker.in_flight, 0)
+
+
+class TestConsumerRuntime(unittest.TestCase):
+    def test_per_key_order(self):
+        handled = []
+        lock = threading.Lock()
+
+        def handle_event(id, details_str):
+            # Первое событие каждого ключа обрабатывается дольше остальных
+            if id.endswith('-0'):
+                time.sleep(0.05)
+            with lock:
+                handled.append(id)
+
+        runtime = ConsumerRuntime(
+            Namespace(reset=False), {}, 'test', handle_event,
+            {'workers': '4'}, key=field_key('car')
+        )
+
+        messages = []
+        for i in range(20):
+            car = f'car{i % 4}'
+            messages.append(FakeMessage(
+                i, f'{car}-{i // 4}', f'{{"car": "{car}"}}'
+            ))
+        runtime.dispatch(messages)
+
+        deadline = time.time() + 5
+        while runtime.tracker.in_flight and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(len(handled), 20)
+        for car in range(4):
+            ids = [id for id in handled if id.startswith(f'car{car}-')]
+            self.assertEqual(ids, [f'car{car}-{n}' for n in range(5)])
+        self.assertEqual(runtime.tracker.drain(), {('test', 0): 20})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
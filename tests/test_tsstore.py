@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import unittest
+
+
+__location__: str = os.path.dirname(os.path.abspath(__file__))
+manage_drive_path: str = os.path.join(__location__,
+                                      os.pardir,
+                                      'management-system', 'modules', 'manage-drive', 'module')
+
+sys.path.insert(1, manage_drive_path)
+import tsstore
+from tsstore import TelemetryStore
+
+
+def sample(car, speed, x, y):
+    return {'id': car, 'brand': 'Toyota', 'speed': speed, 'coordinates': [x, y]}
+
+
+class TestTelemetryStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.block_rows = tsstore.BLOCK_ROWS
+        tsstore.BLOCK_ROWS = 4
+
+    def tearDown(self):
+        tsstore.BLOCK_ROWS = self.block_rows
+        self.directory.cleanup()
+
+    def fill(self, store):
+        for t in range(10):
+            store.append([sample('a', 10 + t, t, 0), sample('b', 50, 100, 100 + t)], now=t)
+
+    def test_trajectory_across_segments(self):
+        store = TelemetryStore(self.directory.name, segment_rows=6)
+        self.fill(store)
+        self.assertEqual(len(store.segments), 4)
+
+        trajectory = store.trajectory('a', 3, 6)
+        self.assertEqual(trajectory['t'].tolist(), [3, 4, 5, 6])
+        self.assertEqual(trajectory['x'].tolist(), [3, 4, 5, 6])
+        self.assertEqual(len(store.trajectory('missing', 0, 10)), 0)
+
+    def test_bbox_uses_last_position(self):
+        store = TelemetryStore(self.directory.name, segment_rows=6)
+        self.fill(store)
+
+        self.assertEqual(set(store.in_bbox(4, -1, 6, 1, t=5)), {'a'})
+        self.assertEqual(store.in_bbox(0, 0, 200, 200, t=9)['b'], (9.0, 50.0, 100.0, 109.0))
+        self.assertEqual(store.in_bbox(4, -1, 6, 1, t=9), {})
+
+    def test_reopen(self):
+        store = TelemetryStore(self.directory.name, segment_rows=6)
+        self.fill(store)
+        store.flush()
+
+        reopened = TelemetryStore(self.directory.name, segment_rows=6)
+        self.assertEqual(reopened.trajectory('b', 0, 9)['y'].tolist(),
+                         [100 + t for t in range(10)])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)